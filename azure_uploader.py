@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from chunk_store import read_optimized_profiles
+
+# Azure AI Search REST-API
+API_VERSION = "2024-07-01"
+INPUT_DIR = "Optimized_Chunks"
+EMBEDDINGS_DIR = "Embeddings"
+
+# Grenzen pro Batch (Azure erlaubt 1000 Dokumente bzw. 16 MB pro Anfrage)
+MAX_DOCS = 1000
+MAX_BYTES = 15 * 1024 * 1024
+MAX_TOKENS = 200_000
+
+CONCURRENCY = 4  # Gleichzeitige Anfragen
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0  # Sekunden, verdoppelt sich pro Versuch
+BACKOFF_MAX = 60.0
+TIMEOUT = 60.0
+
+# Statuscodes, bei denen ein erneuter Versuch sinnvoll ist
+RETRY_STATUS = {429, 503}
+RETRY_DOC_STATUS = {409, 422, 429, 503}
+
+# Metadatenfelder, die zusätzlich an jedem Chunk-Dokument gespeichert werden (für Filter)
+METADATA_FIELDS = ["fullName", "location", "availibility", "workHoursPerWeek", "travelArrangement",
+                   "preferredWorkingAreas"]
+
+
+def lade_embeddings(embeddings_dir=EMBEDDINGS_DIR):
+    """
+    Lädt vorhandene Vektoren aus embeddings.py.
+
+    :return: Dictionary {Chunk-ID: Vektor als Liste} oder leeres Dictionary.
+    """
+    import embeddings
+
+    vectors, entries = embeddings.lade_cache(embeddings_dir)
+    if vectors is None:
+        return {}
+    result = {}
+    for row, entry in enumerate(entries):
+        vector = vectors[row].tolist()
+        result[entry["id"]] = vector
+        # Duplikatgruppen (embeddings.py --dedup): alle Mitglieder teilen den Vektor der Gruppe
+        for chunk_id, _ in entry.get("members", ()):
+            result[chunk_id] = vector
+    return result
+
+
+def erzeuge_dokumente(source=INPUT_DIR, vektoren=None):
+    """
+    Wandelt optimierte Chunks in Suchdokumente um.
+
+    :param source: Ordner Optimized_Chunks oder Chunk-Store-Datei.
+    :param vektoren: Optional {Chunk-ID: Vektor}, wird als contentVector übernommen.
+    :return: Generator von Dokumenten (Dictionary mit id, profile_id, type, content, Metadaten).
+    """
+    for profile_id, metadata, chunks in read_optimized_profiles(source):
+        felder = {}
+        for field in METADATA_FIELDS:
+            if field in metadata:
+                value = metadata[field]
+                felder[field] = [str(v) for v in value] if isinstance(value, list) else str(value)
+        for chunk in chunks:
+            dokument = {"id": chunk["id"], "profile_id": str(profile_id), "type": chunk.get("type", ""),
+                        "content": chunk.get("content", ""), **felder}
+            if vektoren and chunk["id"] in vektoren:
+                dokument["contentVector"] = vektoren[chunk["id"]]
+            yield dokument
+
+
+def bilde_batches(dokumente, max_docs=MAX_DOCS, max_bytes=MAX_BYTES, max_tokens=MAX_TOKENS):
+    """
+    Teilt Dokumente in Batches, die Anzahl, JSON-Größe und Tokenanzahl begrenzen.
+
+    Ein einzelnes Dokument über einer Grenze bildet einen eigenen Batch.
+
+    :return: Liste von Batches (Listen von Dokumenten).
+    """
+    from token_counter import count_tokens_batch
+
+    dokumente = list(dokumente)
+    tokens = count_tokens_batch([dokument.get("content", "") for dokument in dokumente])
+    batches = []
+    batch, groesse, token_summe = [], 0, 0
+    for dokument, anzahl in zip(dokumente, tokens):
+        dokument_bytes = len(json.dumps(dokument, ensure_ascii=False).encode("utf-8")) + 1
+        if batch and (len(batch) >= max_docs or groesse + dokument_bytes > max_bytes
+                      or token_summe + anzahl > max_tokens):
+            batches.append(batch)
+            batch, groesse, token_summe = [], 0, 0
+        batch.append(dokument)
+        groesse += dokument_bytes
+        token_summe += anzahl
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _retry_after(response):
+    """Wartezeit aus Retry-After bzw. retry-after-ms in Sekunden oder None."""
+    for header, faktor in (("retry-after-ms", 0.001), ("x-ms-retry-after-ms", 0.001), ("retry-after", 1.0)):
+        wert = response.headers.get(header)
+        if wert:
+            try:
+                return float(wert) * faktor
+            except ValueError:
+                continue  # HTTP-Datum wird nicht ausgewertet, dann exponentielles Backoff
+    return None
+
+
+class AzureSearchUploader:
+    """
+    Asynchroner Client für den Dokument-Endpunkt eines Azure-AI-Search-Index.
+
+    Alle Anfragen laufen über einen gemeinsamen httpx.AsyncClient (Connection-Pool,
+    Keep-Alive). Höchstens `concurrency` Batches sind gleichzeitig unterwegs. Bei 429/503
+    und Verbindungsfehlern wird mit exponentiellem Backoff bzw. nach Retry-After erneut
+    gesendet; bei 207 werden nur die fehlgeschlagenen Dokumente wiederholt. Uploads
+    verwenden mergeOrUpload mit der Chunk-ID als Schlüssel und sind damit idempotent.
+
+    Für Tests kann ein lokaler Endpunkt (siehe starte_mock_server) oder ein
+    httpx-Transport (z.B. httpx.MockTransport) übergeben werden.
+    """
+
+    def __init__(self, endpoint, index_name, api_key=None, api_version=API_VERSION, concurrency=CONCURRENCY,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, timeout=TIMEOUT, transport=None):
+        self.endpoint = endpoint.rstrip("/")
+        self.index_name = index_name
+        self.api_key = api_key
+        self.api_version = api_version
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.transport = transport
+        self.client = None
+        self.statistik = {"requests": 0, "retries": 0, "succeeded": 0, "failed": 0, "throttled": 0}
+
+    async def __aenter__(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["api-key"] = self.api_key
+        self.client = httpx.AsyncClient(
+            base_url=self.endpoint, headers=headers, timeout=self.timeout, transport=self.transport,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.client = None
+
+    def _wartezeit(self, versuch, response=None):
+        wartezeit = _retry_after(response) if response is not None else None
+        if wartezeit is None:
+            wartezeit = min(BACKOFF_MAX, self.backoff_base * 2 ** versuch) * random.uniform(0.5, 1.0)
+        return wartezeit
+
+    async def _sende(self, aktionen):
+        """
+        Sendet einen Batch mit Wiederholungen.
+
+        :param aktionen: Liste von Dokumenten mit "@search.action".
+        :return: Liste der IDs, die endgültig fehlgeschlagen sind (nicht wiederholbare Fehler,
+                 ausgeschöpfte Wiederholungen und abgelehnte Batches).
+        """
+        pfad = f"/indexes/{self.index_name}/docs/index"
+        offen = aktionen
+        fehlgeschlagen = []
+        for versuch in range(self.max_retries + 1):
+            if versuch:
+                self.statistik["retries"] += 1
+            self.statistik["requests"] += 1
+            try:
+                response = await self.client.post(pfad, params={"api-version": self.api_version},
+                                                  json={"value": offen})
+            except httpx.TransportError:
+                if versuch == self.max_retries:
+                    break
+                await asyncio.sleep(self._wartezeit(versuch))
+                continue
+
+            if response.status_code in RETRY_STATUS:
+                self.statistik["throttled"] += 1
+                if versuch == self.max_retries:
+                    break
+                await asyncio.sleep(self._wartezeit(versuch, response))
+                continue
+            if response.status_code not in (200, 207):
+                # Abgelehnter Batch (z.B. 400/413): alle Dokumente gelten als fehlgeschlagen
+                print(f"Batch mit {len(offen)} Dokumenten abgelehnt: HTTP {response.status_code}")
+                break
+
+            # Ergebnis pro Dokument auswerten, nur wiederholbare Fehler erneut senden
+            ergebnisse = {r.get("key"): r for r in response.json().get("value", [])}
+            wiederholen = []
+            for aktion in offen:
+                ergebnis = ergebnisse.get(aktion["id"], {"status": response.status_code == 200})
+                if ergebnis.get("status"):
+                    self.statistik["succeeded"] += 1
+                elif ergebnis.get("statusCode") in RETRY_DOC_STATUS and versuch < self.max_retries:
+                    wiederholen.append(aktion)
+                else:
+                    self.statistik["failed"] += 1
+                    fehlgeschlagen.append(aktion["id"])
+            if not wiederholen:
+                return fehlgeschlagen
+            offen = wiederholen
+            await asyncio.sleep(self._wartezeit(versuch, response))
+
+        self.statistik["failed"] += len(offen)
+        return fehlgeschlagen + [aktion["id"] for aktion in offen]
+
+    async def _sende_alle(self, batches):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def sende(batch):
+            async with semaphore:
+                try:
+                    return await self._sende(batch)
+                except (httpx.HTTPError, ValueError) as e:
+                    # Ein fehlerhafter Batch darf die Ergebnisse der übrigen nicht verwerfen
+                    print(f"Batch mit {len(batch)} Dokumenten fehlgeschlagen: {e}")
+                    self.statistik["failed"] += len(batch)
+                    return [aktion["id"] for aktion in batch]
+
+        ergebnisse = await asyncio.gather(*(sende(batch) for batch in batches))
+        return [chunk_id for fehlgeschlagen in ergebnisse for chunk_id in fehlgeschlagen]
+
+    async def upload(self, dokumente, max_docs=MAX_DOCS, max_bytes=MAX_BYTES, max_tokens=MAX_TOKENS):
+        """
+        Lädt Dokumente per mergeOrUpload hoch.
+
+        :return: Liste der IDs, die nicht hochgeladen werden konnten.
+        """
+        aktionen = [{"@search.action": "mergeOrUpload", **dokument} for dokument in dokumente]
+        return await self._sende_alle(bilde_batches(aktionen, max_docs, max_bytes, max_tokens))
+
+    async def delete(self, ids, max_docs=MAX_DOCS):
+        """
+        Löscht Dokumente anhand ihrer IDs.
+
+        :return: Liste der IDs, die nicht gelöscht werden konnten.
+        """
+        aktionen = [{"@search.action": "delete", "id": chunk_id} for chunk_id in ids]
+        batches = [aktionen[i:i + max_docs] for i in range(0, len(aktionen), max_docs)]
+        return await self._sende_alle(batches)
+
+
+def konfiguration_aus_umgebung():
+    """Liest Endpunkt, Indexname und API-Key aus AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_INDEX, AZURE_SEARCH_API_KEY."""
+    return {
+        "endpoint": os.environ.get("AZURE_SEARCH_ENDPOINT"),
+        "index_name": os.environ.get("AZURE_SEARCH_INDEX", "consultant-chunks"),
+        "api_key": os.environ.get("AZURE_SEARCH_API_KEY"),
+    }
+
+
+async def lade_hoch(source=INPUT_DIR, endpoint=None, index_name=None, api_key=None, embeddings_dir=None,
+                    concurrency=CONCURRENCY, transport=None):
+    """
+    Lädt alle optimierten Chunks in den Suchindex hoch.
+
+    :param embeddings_dir: Ordner mit Embeddings; vorhandene Vektoren werden als contentVector mitgesendet.
+    :return: Tupel (Statistik, fehlgeschlagene IDs).
+    """
+    vektoren = lade_embeddings(embeddings_dir) if embeddings_dir else None
+    dokumente = list(erzeuge_dokumente(source, vektoren))
+    async with AzureSearchUploader(endpoint, index_name, api_key, concurrency=concurrency,
+                                   transport=transport) as uploader:
+        start = time.perf_counter()
+        fehlgeschlagen = await uploader.upload(dokumente)
+        uploader.statistik["seconds"] = round(time.perf_counter() - start, 3)
+        uploader.statistik["documents"] = len(dokumente)
+    return uploader.statistik, fehlgeschlagen
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """Nachbildung von POST /indexes/<Index>/docs/index für lokale Tests."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        laenge = int(self.headers.get("Content-Length", 0))
+        aktionen = json.loads(self.rfile.read(laenge)).get("value", [])
+        with server.lock:
+            server.anfragen += 1
+            drosseln = server.throttle_every and server.anfragen % server.throttle_every == 0
+            if not drosseln:
+                for aktion in aktionen:
+                    if aktion["id"] in server.fail_ids:
+                        continue
+                    if aktion.get("@search.action") == "delete":
+                        server.dokumente.pop(aktion["id"], None)
+                    else:
+                        dokument = {k: v for k, v in aktion.items() if k != "@search.action"}
+                        server.dokumente.setdefault(aktion["id"], {}).update(dokument)
+        if drosseln:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.01")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        # Dokumente aus fail_ids werden dauerhaft abgelehnt (400 im 207-Ergebnis)
+        ergebnisse = [{"key": a["id"], "status": a["id"] not in server.fail_ids,
+                       "statusCode": 400 if a["id"] in server.fail_ids else 200} for a in aktionen]
+        antwort = json.dumps({"value": ergebnisse}).encode("utf-8")
+        self.send_response(207 if any(not e["status"] for e in ergebnisse) else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(antwort)))
+        self.end_headers()
+        self.wfile.write(antwort)
+
+
+def starte_mock_server(port=0, throttle_every=0, fail_ids=()):
+    """
+    Startet einen lokalen Mock des Azure-AI-Search-Dokument-Endpunkts in einem Hintergrund-Thread.
+
+    :param throttle_every: Jede n-te Anfrage mit 429 und Retry-After beantworten (0 = nie).
+    :param fail_ids: IDs, die dauerhaft mit 400 abgelehnt werden (Teilergebnis mit 207).
+    :return: Tupel (Server, Basis-URL); server.dokumente enthält den Indexinhalt, server.shutdown() beendet ihn.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MockHandler)
+    server.dokumente = {}
+    server.anfragen = 0
+    server.throttle_every = throttle_every
+    server.fail_ids = set(fail_ids)
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    konfiguration = konfiguration_aus_umgebung()
+    parser = argparse.ArgumentParser(description="Optimierte Chunks in Azure AI Search hochladen")
+    parser.add_argument("--input", default=INPUT_DIR, help="Ordner mit optimierten Chunks oder Chunk-Store-Datei")
+    parser.add_argument("--endpoint", default=konfiguration["endpoint"], help="Endpunkt des Suchdienstes")
+    parser.add_argument("--index", default=konfiguration["index_name"], help="Name des Suchindex")
+    parser.add_argument("--embeddings", default=None, help="Ordner mit Embeddings (optional)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Gleichzeitige Anfragen")
+    parser.add_argument("--mock", action="store_true", help="Gegen einen lokalen Mock-Endpunkt hochladen")
+    args = parser.parse_args(argv)
+
+    mock_server = None
+    if args.mock:
+        mock_server, args.endpoint = starte_mock_server(throttle_every=5)
+    if not args.endpoint:
+        parser.error("Kein Endpunkt angegeben (--endpoint oder AZURE_SEARCH_ENDPOINT).")
+
+    statistik, fehlgeschlagen = asyncio.run(lade_hoch(args.input, args.endpoint, args.index, konfiguration["api_key"],
+                                                      args.embeddings, args.concurrency))
+    print(f"Upload abgeschlossen: {json.dumps(statistik)}")
+    if fehlgeschlagen:
+        print(f"{len(fehlgeschlagen)} Dokumente fehlgeschlagen, z.B.: {', '.join(fehlgeschlagen[:10])}")
+    if mock_server is not None:
+        print(f"Mock-Index enthält {len(mock_server.dokumente)} Dokumente.")
+        mock_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
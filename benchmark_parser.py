@@ -0,0 +1,62 @@
+import argparse
+import time
+
+import profile_parser
+from synthetic_corpus import synthetischer_profiltext
+
+# Textgrößen in MB, jeweils verdoppelt, um lineares Verhalten sichtbar zu machen
+GROESSEN_MB = [1, 2, 4, 8, 16]
+WIEDERHOLUNGEN = 3
+
+
+def zweistufig(text):
+    """Bisheriger Ablauf: Abschnitte per finditer, danach Einträge pro Abschnitt."""
+    abschnitte = profile_parser.abschnitte_analysieren(text, profile_parser.BEKANNTE_ABSCHNITTE)
+    return profile_parser.abschnitte_zu_json(abschnitte)
+
+
+def einstufig(text):
+    """Neuer Ablauf: ein Scan der Überschriften, Einträge direkt aus den Abschnittsbereichen."""
+    return profile_parser.analysiere_profil(text)[1]
+
+
+def messe(funktion, text, wiederholungen=WIEDERHOLUNGEN):
+    """Beste Laufzeit in Sekunden aus mehreren Wiederholungen."""
+    zeiten = []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        funktion(text)
+        zeiten.append(time.perf_counter() - start)
+    return min(zeiten)
+
+
+def benchmark(groessen_mb=GROESSEN_MB, wiederholungen=WIEDERHOLUNGEN):
+    """
+    Misst beide Parser für wachsende Textgrößen und gibt Durchsatz und Zeit pro MB aus.
+
+    :return: Liste von Dictionaries mit Größe und Laufzeiten.
+    """
+    ergebnisse = []
+    print(f"{'MB':>6} {'einstufig s':>12} {'s/MB':>8} {'MB/s':>8} {'zweistufig s':>13} {'s/MB':>8}")
+    for groesse_mb in groessen_mb:
+        text = synthetischer_profiltext(groesse_mb * 1024 * 1024)
+        if einstufig(text) != zweistufig(text):
+            raise ValueError(f"Ergebnisse der Parser weichen bei {groesse_mb} MB voneinander ab.")
+        mb = len(text.encode("utf-8")) / (1024 * 1024)
+        neu = messe(einstufig, text, wiederholungen)
+        alt = messe(zweistufig, text, wiederholungen)
+        ergebnisse.append({"mb": mb, "einstufig_s": neu, "zweistufig_s": alt})
+        print(f"{mb:6.1f} {neu:12.3f} {neu / mb:8.3f} {mb / neu:8.1f} {alt:13.3f} {alt / mb:8.3f}")
+    return ergebnisse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des Profil-Parsers auf synthetischen Texten")
+    parser.add_argument("--sizes", type=int, nargs="+", default=GROESSEN_MB, help="Textgrößen in MB")
+    parser.add_argument("--repeat", type=int, default=WIEDERHOLUNGEN, help="Wiederholungen pro Messung")
+    args = parser.parse_args(argv)
+    benchmark(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
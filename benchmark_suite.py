@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # z.B. unter Windows, dann ohne Speichermessung
+    resource = None
+
+import synthetic_corpus
+
+# Consultant-Anzahlen für einen Standardlauf
+SKALEN = [100, 1000]
+REPORT_FILE = "benchmark_report.json"
+STUFEN = ("parse", "merge", "chunk", "optimize", "markdown", "pipeline", "pipeline_incremental")
+
+
+def _peak_rss_mb():
+    """Maximaler Speicherverbrauch (RSS) des Prozesses und seiner beendeten Kindprozesse in MB."""
+    if resource is None:
+        return None
+    eigen = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kinder = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    teiler = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max(eigen, kinder) / teiler, 1)
+
+
+def _dateien(verzeichnis, endung):
+    if not os.path.exists(verzeichnis):
+        return []
+    return [os.path.join(verzeichnis, f) for f in sorted(os.listdir(verzeichnis)) if f.endswith(endung)]
+
+
+def _groesse(pfade):
+    return sum(os.path.getsize(p) for p in pfade)
+
+
+def _aufgaben(stufe, basis, workers):
+    """
+    Liefert die Aufrufe einer Stufe als Liste von (Funktion, Argumente) sowie die Eingabedateien.
+
+    Die Module werden erst hier importiert, damit jede Stufe in einem frischen Prozess
+    ihre eigenen Importe und ihren eigenen Speicherbedarf misst.
+    """
+    chunked = os.path.join(basis, "Chunked")
+    merged = os.path.join(basis, "Merged")
+    profile_chunks_dir = os.path.join(basis, "Profile_Chunks")
+
+    if stufe == "parse":
+        import profile_parser
+        consultants = profile_parser.finde_consultants(chunked)
+        aufgaben = [(profile_parser.textdateien_verarbeiten,
+                     (dateien, os.path.join(chunked, f"{name}_zusammengefasst.txt"),
+                      os.path.join(chunked, f"{name}.json"), profile_parser.BEKANNTE_ABSCHNITTE))
+                    for name, dateien in consultants.items()]
+        return aufgaben, [p for dateien in consultants.values() for p in dateien]
+
+    if stufe == "merge":
+        import merge_jsons
+        # Zuordnung wie im Betrieb über ordne_autility_zu (in finde_paare), sie wird mitgemessen
+        autility_dir = os.path.join(basis, "Autility-JSON")
+        eingaben = _dateien(chunked, ".json") + _dateien(autility_dir, ".json")
+        return [(merge_jsons.merge_all_json_files, (chunked, autility_dir, merged))], eingaben
+
+    if stufe == "chunk":
+        import profile_chunks
+        os.makedirs(profile_chunks_dir, exist_ok=True)
+        eingaben = _dateien(merged, ".json")
+        return [(profile_chunks.chunk_consultant_profile, (p, profile_chunks_dir)) for p in eingaben], eingaben
+
+    if stufe == "optimize":
+        import profile_chunks_optimized
+        ausgabe = os.path.join(basis, "Optimized_Chunks")
+        os.makedirs(ausgabe, exist_ok=True)
+        eingaben = _dateien(profile_chunks_dir, ".json")
+        return [(profile_chunks_optimized.optimize_profile_chunks, (p, ausgabe)) for p in eingaben], eingaben
+
+    if stufe == "markdown":
+        import json_to_markdown_parser
+        ausgabe = os.path.join(basis, "Markdown_Profiles")
+        os.makedirs(ausgabe, exist_ok=True)
+        eingaben = _dateien(merged, ".json")
+        return [(json_to_markdown_parser.convert_file, (p, ausgabe)) for p in eingaben], eingaben
+
+    if stufe in ("pipeline", "pipeline_incremental"):
+        import pipeline
+        eingaben = _dateien(chunked, ".txt") + _dateien(os.path.join(basis, "Autility-JSON"), ".json")
+        return [(pipeline.run_pipeline, (basis, stufe == "pipeline", workers))], eingaben
+
+    raise ValueError(f"Unbekannte Stufe '{stufe}', erlaubt sind: {', '.join(STUFEN)}")
+
+
+def miss_stufe(stufe, basis, workers=1):
+    """
+    Führt eine Stufe über den ganzen Korpus aus und misst Laufzeit, CPU-Zeit und Speicher.
+
+    Die Ausgaben der Skripte pro Datei werden während der Messung verworfen.
+
+    :return: Dictionary mit den Messwerten.
+    """
+    aufgaben, eingaben = _aufgaben(stufe, basis, workers)
+    bytes_gelesen = _groesse(eingaben)
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        for funktion, argumente in aufgaben:
+            funktion(*argumente)
+        sekunden = time.perf_counter() - start
+        cpu_sekunden = time.process_time() - cpu_start
+
+    return {
+        "seconds": round(sekunden, 4),
+        "cpu_seconds": round(cpu_sekunden, 4),
+        "calls": len(aufgaben),
+        "files": len(eingaben),
+        "files_per_sec": round(len(eingaben) / sekunden, 1) if sekunden else None,
+        "bytes_read": bytes_gelesen,
+        "mb_per_sec": round(bytes_gelesen / 1024 / 1024 / sekunden, 2) if sekunden else None,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def miss_stufe_isoliert(stufe, basis, workers=1):
+    """Misst eine Stufe in einem neu gestarteten Prozess, damit der Spitzenspeicher pro Stufe gilt."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(miss_stufe, stufe, basis, workers).result()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(skalen=SKALEN, stufen=STUFEN, workers=1, arbeitsverzeichnis=None, seed=42, isoliert=True):
+    """
+    Erzeugt für jede Skala einen synthetischen Korpus und misst alle Stufen nacheinander.
+
+    Die Einzelstufen bauen aufeinander auf (parse -> merge -> chunk -> optimize -> markdown);
+    danach läuft die gesamte Pipeline einmal vollständig und einmal ohne Änderungen.
+
+    :return: Report als Dictionary.
+    """
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": workers,
+        "runs": [],
+    }
+    messen = miss_stufe_isoliert if isoliert else miss_stufe
+
+    for anzahl in skalen:
+        basis = tempfile.mkdtemp(prefix=f"benchmark_{anzahl}_", dir=arbeitsverzeichnis)
+        try:
+            start = time.perf_counter()
+            korpus = synthetic_corpus.erzeuge_korpus(basis, anzahl, seed)
+            lauf = {**korpus, "generate_seconds": round(time.perf_counter() - start, 3), "stages": {}}
+            print(f"\n{anzahl} Consultants ({korpus['files']} Dateien, {korpus['bytes'] / 1024 / 1024:.1f} MB)")
+            for stufe in stufen:
+                messung = messen(stufe, basis, workers)
+                lauf["stages"][stufe] = messung
+                print(f"  {stufe:<22} {messung['seconds']:9.3f} s  {messung['files_per_sec'] or 0:10.1f} Dateien/s"
+                      f"  {messung['peak_rss_mb'] or 0:8.1f} MB RSS")
+            report["runs"].append(lauf)
+        finally:
+            shutil.rmtree(basis, ignore_errors=True)
+    return report
+
+
+def vergleiche(report, baseline):
+    """Gibt die relative Laufzeitänderung pro Skala und Stufe gegenüber einem älteren Report aus."""
+    alte_laeufe = {lauf["consultants"]: lauf for lauf in baseline.get("runs", [])}
+    print(f"\nVergleich mit {baseline.get('git_commit') or 'Baseline'} vom {baseline.get('created')}:")
+    for lauf in report["runs"]:
+        alt = alte_laeufe.get(lauf["consultants"])
+        if alt is None:
+            continue
+        for stufe, messung in lauf["stages"].items():
+            alte_messung = alt["stages"].get(stufe)
+            if not alte_messung or not alte_messung["seconds"]:
+                continue
+            aenderung = (messung["seconds"] / alte_messung["seconds"] - 1) * 100
+            print(f"  {lauf['consultants']:>7} {stufe:<22} {alte_messung['seconds']:9.3f} s -> "
+                  f"{messung['seconds']:9.3f} s ({aenderung:+.1f} %)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der Pipeline-Stufen auf einem synthetischen Korpus")
+    parser.add_argument("--consultants", type=int, nargs="+", default=SKALEN,
+                        help="Korpusgrößen (Anzahl Consultants), z.B. 100 1000 10000 100000")
+    parser.add_argument("--stages", nargs="+", choices=STUFEN, default=list(STUFEN), help="Zu messende Stufen")
+    parser.add_argument("--workers", type=int, default=1, help="Worker-Prozesse für die Pipeline-Messung")
+    parser.add_argument("--workdir", default=None, help="Verzeichnis für die temporären Korpora")
+    parser.add_argument("--seed", type=int, default=42, help="Seed für den Korpus")
+    parser.add_argument("--report", default=REPORT_FILE, help="Pfad des JSON-Reports")
+    parser.add_argument("--baseline", default=None, help="Älterer Report zum Vergleich")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Stufen im aktuellen Prozess messen (schneller, Spitzenspeicher dann kumulativ)")
+    args = parser.parse_args(argv)
+
+    ergebnis = benchmark(args.consultants, args.stages, args.workers, args.workdir, args.seed,
+                         isoliert=not args.in_process)
+    with open(args.report, "w", encoding="utf-8") as report_datei:
+        json.dump(ergebnis, report_datei, indent=4, ensure_ascii=False)
+    print(f"\nReport gespeichert unter: {args.report}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_datei:
+            vergleiche(ergebnis, json.load(baseline_datei))
+
+
+if __name__ == "__main__":
+    main()
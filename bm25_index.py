@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+from array import array
+from collections import Counter
+
+from chunk_store import read_optimized_profiles
+from umlauts import normalisiere
+
+# Eingabe- und Ausgabeordner
+OPTIMIZED_CHUNKS_DIR = "Optimized_Chunks"
+INDEX_DIR = "BM25_Index"
+
+META_FILE = "bm25_meta.json"
+POSTINGS_FILE = "bm25_postings.bin"
+
+# BM25-Parameter
+K1 = 1.2
+B = 0.75
+RRF_K = 60  # Konstante der Reciprocal Rank Fusion
+MAX_DELETED_RATIO = 0.2  # Ab diesem Anteil gelöschter Dokumente werden die Postings kompaktiert
+
+# Tokens nach Umlaut-Faltung und Kleinschreibung; erhält Bezeichner wie c++, c#, node.js, s/4hana
+TOKEN_REGEX = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./][a-z0-9+#]+)*")
+
+# Häufige deutsche und englische Füllwörter (bereits gefaltet)
+STOPWORDS = {
+    "und", "oder", "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "eines", "einem",
+    "mit", "von", "vom", "zu", "zur", "zum", "im", "in", "an", "am", "auf", "aus", "bei", "fuer",
+    "als", "ist", "sind", "wurde", "wurden", "sowie", "the", "and", "of", "for", "to", "a", "an",
+    "n/a",
+}
+
+
+def tokenisiere(text):
+    """Zerlegt einen Text in Such-Tokens mit derselben Umlaut-Faltung wie rename_umlauts_*."""
+    return [token for token in TOKEN_REGEX.findall(normalisiere(text)) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Kompakter, inkrementell erweiterbarer BM25-Index über den Chunk-Inhalten.
+
+    Die Postings je Term liegen in zwei Arrays (Dokumentpositionen als uint32,
+    Termhäufigkeiten als uint16). Entfernte Dokumente werden zunächst nur markiert und
+    beim Kompaktieren aus den Postings gelöscht.
+    """
+
+    def __init__(self):
+        self.doc_ids = []            # Position -> Chunk-ID (None = gelöscht)
+        self.profile_ids = []        # Position -> Profil-ID
+        self.doc_lengths = array("I")
+        self.positions = {}          # Chunk-ID -> Position
+        self.hashes = {}             # Chunk-ID -> Inhalts-Hash
+        self.postings = {}           # Term -> (array("I") Positionen, array("H") Häufigkeiten)
+        self.total_length = 0
+        self.deleted = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, chunk_id, text, profile_id=None, digest=None):
+        """Fügt einen Chunk hinzu; ein vorhandener Chunk mit derselben ID wird ersetzt."""
+        if chunk_id in self.positions:
+            self.remove(chunk_id)
+        tokens = tokenisiere(text)
+        position = len(self.doc_ids)
+        self.doc_ids.append(chunk_id)
+        self.profile_ids.append(profile_id)
+        self.doc_lengths.append(len(tokens))
+        self.positions[chunk_id] = position
+        self.hashes[chunk_id] = digest
+        self.total_length += len(tokens)
+        for term, frequency in Counter(tokens).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("H"))
+            entry[0].append(position)
+            entry[1].append(min(frequency, 0xFFFF))
+
+    def remove(self, chunk_id):
+        """Markiert einen Chunk als gelöscht."""
+        position = self.positions.pop(chunk_id, None)
+        if position is None:
+            return
+        self.hashes.pop(chunk_id, None)
+        self.doc_ids[position] = None
+        self.total_length -= self.doc_lengths[position]
+        self.deleted += 1
+        if self.deleted > MAX_DELETED_RATIO * max(1, len(self.doc_ids)):
+            self.compact()
+
+    def compact(self):
+        """Entfernt gelöschte Dokumente aus den Postings und vergibt die Positionen neu."""
+        mapping = {}
+        doc_ids, profile_ids, doc_lengths = [], [], array("I")
+        for old, chunk_id in enumerate(self.doc_ids):
+            if chunk_id is None:
+                continue
+            mapping[old] = len(doc_ids)
+            doc_ids.append(chunk_id)
+            profile_ids.append(self.profile_ids[old])
+            doc_lengths.append(self.doc_lengths[old])
+
+        postings = {}
+        for term, (docs, frequencies) in self.postings.items():
+            new_docs, new_frequencies = array("I"), array("H")
+            for doc, frequency in zip(docs, frequencies):
+                new = mapping.get(doc)
+                if new is not None:
+                    new_docs.append(new)
+                    new_frequencies.append(frequency)
+            if new_docs:
+                postings[term] = (new_docs, new_frequencies)
+
+        self.doc_ids, self.profile_ids, self.doc_lengths = doc_ids, profile_ids, doc_lengths
+        self.positions = {chunk_id: position for position, chunk_id in enumerate(doc_ids)}
+        self.postings = postings
+        self.deleted = 0
+
+    def search(self, query, k=10, profile_ids=None):
+        """
+        BM25-Suche.
+
+        :param profile_ids: Optional nur Chunks dieser Consultants berücksichtigen.
+        :return: Liste von Tupeln (Chunk-ID, Score), absteigend sortiert.
+        """
+        live = len(self.positions)
+        if not live:
+            return []
+        allowed = set(profile_ids) if profile_ids is not None else None
+        avg_length = self.total_length / live or 1.0
+        scores = {}
+        for term in set(tokenisiere(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            docs, frequencies = entry
+            idf = math.log(1 + (live - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc, frequency in zip(docs, frequencies):
+                if self.doc_ids[doc] is None:
+                    continue
+                if allowed is not None and self.profile_ids[doc] not in allowed:
+                    continue
+                norm = K1 * (1 - B + B * self.doc_lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc], score) for doc, score in best]
+
+    def save(self, directory=INDEX_DIR):
+        """Speichert den Index kompaktiert als JSON-Metadaten und binäre Postings."""
+        if self.deleted:
+            self.compact()
+        os.makedirs(directory, exist_ok=True)
+        terms = {}
+        postings_path = os.path.join(directory, POSTINGS_FILE)
+        with open(postings_path + ".tmp", "wb") as file:
+            offset = 0
+            for term, (docs, frequencies) in self.postings.items():
+                terms[term] = [offset, len(docs)]
+                docs.tofile(file)
+                frequencies.tofile(file)
+                offset += len(docs)
+        meta = {
+            "doc_ids": self.doc_ids,
+            "profile_ids": self.profile_ids,
+            "doc_lengths": self.doc_lengths.tolist(),
+            "hashes": self.hashes,
+            "terms": terms,
+        }
+        meta_path = os.path.join(directory, META_FILE)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(meta, file, ensure_ascii=False)
+        os.replace(postings_path + ".tmp", postings_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, directory=INDEX_DIR):
+        """Lädt einen gespeicherten Index."""
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        index = cls()
+        index.doc_ids = meta["doc_ids"]
+        index.profile_ids = meta["profile_ids"]
+        index.doc_lengths = array("I", meta["doc_lengths"])
+        index.positions = {chunk_id: position for position, chunk_id in enumerate(index.doc_ids)}
+        index.hashes = meta["hashes"]
+        index.total_length = sum(index.doc_lengths)
+        with open(os.path.join(directory, POSTINGS_FILE), "rb") as file:
+            for term, (_, count) in sorted(meta["terms"].items(), key=lambda item: item[1][0]):
+                docs, frequencies = array("I"), array("H")
+                docs.fromfile(file, count)
+                frequencies.fromfile(file, count)
+                index.postings[term] = (docs, frequencies)
+        return index
+
+
+def _lade_chunks(optimized_dir):
+    """Liest alle optimierten Chunks als Liste von (Chunk-ID, Inhalt, Profil-ID)."""
+    chunks = []
+    for profile_id, _, profile_chunks in read_optimized_profiles(optimized_dir):
+        for chunk in profile_chunks:
+            chunks.append((chunk["id"], chunk.get("content", ""), profile_id))
+    return chunks
+
+
+def baue_bm25_index(optimized_dir=OPTIMIZED_CHUNKS_DIR, index_dir=INDEX_DIR):
+    """
+    Baut den BM25-Index auf oder aktualisiert ihn inkrementell anhand der Inhalts-Hashes.
+
+    :return: Der aktualisierte BM25Index.
+    """
+    index = BM25Index.load(index_dir) if os.path.exists(os.path.join(index_dir, META_FILE)) else BM25Index()
+    chunks = _lade_chunks(optimized_dir)
+    current = set()
+    added = 0
+    for chunk_id, content, profile_id in chunks:
+        current.add(chunk_id)
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if index.hashes.get(chunk_id) != digest or chunk_id not in index.positions:
+            index.add(chunk_id, content, profile_id, digest)
+            added += 1
+    removed = [chunk_id for chunk_id in index.positions if chunk_id not in current]
+    for chunk_id in removed:
+        index.remove(chunk_id)
+    index.save(index_dir)
+    print(f"BM25-Index gespeichert unter: {index_dir} "
+          f"({len(index)} Chunks, {added} hinzugefügt/aktualisiert, {len(removed)} entfernt)")
+    return index
+
+
+def rrf(rankings, k=RRF_K):
+    """
+    Reciprocal Rank Fusion mehrerer Ranglisten von Chunk-IDs.
+
+    :return: Liste von Tupeln (Chunk-ID, Score), absteigend sortiert.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def hybride_suche(query, bm25_index, vector_index, model=None, k=10, candidates=50, profile_ids=None,
+                  query_vector=None):
+    """
+    Fragt den BM25-Index und den Vektorindex in einem Aufruf ab und fusioniert die Ergebnisse per RRF.
+
+    :param model: Embedding-Modell für die Anfrage (nicht nötig, wenn query_vector übergeben wird).
+    :param candidates: Anzahl der Kandidaten je Verfahren vor der Fusion.
+    :param profile_ids: Optional nur Chunks dieser Consultants berücksichtigen (z.B. aus metadata_index).
+    :return: Liste von Dictionaries mit id, score, bm25_rank, vector_rank, profile_id und metadata.
+    """
+    if query_vector is None:
+        query_vector = model.encode([query], normalize_embeddings=True, convert_to_numpy=True,
+                                    show_progress_bar=False)
+    dense = vector_index.search(query_vector, candidates, profile_ids)[0]
+    sparse = bm25_index.search(query, candidates, profile_ids)
+
+    dense_ranks = {hit["id"]: rank for rank, hit in enumerate(dense, start=1)}
+    # Dichte Treffer bringen ihre Profil-ID mit (bei Duplikatgruppen die des Mitglieds)
+    dense_profiles = {hit["id"]: hit["profile_id"] for hit in dense}
+    sparse_ranks = {chunk_id: rank for rank, (chunk_id, _) in enumerate(sparse, start=1)}
+    fused = rrf([[hit["id"] for hit in dense], [chunk_id for chunk_id, _ in sparse]])[:k]
+
+    results = []
+    for chunk_id, score in fused:
+        profile_id = dense_profiles.get(chunk_id)
+        if profile_id is None:
+            position = bm25_index.positions.get(chunk_id)
+            profile_id = bm25_index.profile_ids[position] if position is not None else None
+        results.append({
+            "id": chunk_id,
+            "score": score,
+            "bm25_rank": sparse_ranks.get(chunk_id),
+            "vector_rank": dense_ranks.get(chunk_id),
+            "profile_id": profile_id,
+            "metadata": vector_index.metadata.get(profile_id, {}),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BM25-Index aufbauen und hybride Suche ausführen")
+    parser.add_argument("--chunks", default=OPTIMIZED_CHUNKS_DIR, help="Ordner mit optimierten Chunks oder Chunk-Store-Datei")
+    parser.add_argument("--output", default=INDEX_DIR, help="Ordner für den BM25-Index")
+    parser.add_argument("--query", help="Anfragetext; ohne Angabe wird nur der Index aufgebaut")
+    parser.add_argument("--sparse-only", action="store_true", help="Nur BM25 ohne Vektorindex abfragen")
+    parser.add_argument("-k", type=int, default=10, help="Anzahl der Treffer")
+    args = parser.parse_args(argv)
+
+    if not args.query:
+        baue_bm25_index(args.chunks, args.output)
+    elif args.sparse_only:
+        for chunk_id, score in BM25Index.load(args.output).search(args.query, args.k):
+            print(f"{score:.4f}  {chunk_id}")
+    else:
+        import embeddings
+        from vector_index import VectorIndex
+
+        hits = hybride_suche(args.query, BM25Index.load(args.output), VectorIndex.load(),
+                             embeddings.lade_modell(), args.k)
+        for hit in hits:
+            print(f"{hit['score']:.4f}  {hit['id']}  {hit['metadata'].get('fullName', hit['profile_id'])}")
+
+
+if __name__ == "__main__":
+    main()
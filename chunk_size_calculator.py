@@ -1,25 +1,34 @@
-import tiktoken
+import argparse
 import json
 import os
 
-# OpenAI Tokenizer für GPT-3.5/4
-encoding = tiktoken.get_encoding("cl100k_base")
+from token_counter import count_tokens_batch
 
 # Verzeichnis mit JSON-Chunks
 PROFILE_CHUNKS_DIR = "Profile_Chunks"
 
-def count_tokens(text):
-    """Berechnet die Anzahl der Tokens im Text."""
-    return len(encoding.encode(text))
-
-# Überprüfe die Tokenanzahl pro Chunk
-for filename in os.listdir(PROFILE_CHUNKS_DIR):
-    if filename.endswith(".json"):
-        with open(os.path.join(PROFILE_CHUNKS_DIR, filename), "r", encoding="utf-8") as file:
-            profile_data = json.load(file)
-            chunks = profile_data.get("chunks", [])
-            
-            for chunk in chunks:
-                content = chunk.get("content", "")
-                token_count = count_tokens(content)
-                print(f"Chunk: {chunk.get('source', 'unknown')} → {chunk.get('type', 'unknown')} → {token_count} Tokens")
+
+def pruefe_tokenanzahl(profile_chunks_dir=PROFILE_CHUNKS_DIR):
+    """Überprüft die Tokenanzahl pro Chunk."""
+    for filename in os.listdir(profile_chunks_dir):
+        if filename.endswith(".json"):
+            with open(os.path.join(profile_chunks_dir, filename), "r", encoding="utf-8") as file:
+                profile_data = json.load(file)
+                chunks = profile_data.get("chunks", [])
+
+                # Alle Chunks eines Profils gesammelt zählen (gecachte Texte werden nicht erneut encodiert)
+                token_counts = count_tokens_batch([chunk.get("content", "") for chunk in chunks])
+                for chunk, token_count in zip(chunks, token_counts):
+                    print(f"Chunk: {chunk.get('source', 'unknown')} → {chunk.get('type', 'unknown')} → {token_count} Tokens")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tokenanzahl pro Chunk ausgeben")
+    parser.add_argument("--input", default=PROFILE_CHUNKS_DIR, help="Ordner mit den JSON-Chunks")
+    args = parser.parse_args(argv)
+    pruefe_tokenanzahl(args.input)
+
+
+if __name__ == "__main__":
+    main()
+
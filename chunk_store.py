@@ -0,0 +1,259 @@
+import json
+import mmap
+import os
+import struct
+
+# Speicherformate: eine JSON-Zeile pro Datensatz oder Länge (uint32, little endian) + JSON
+FORMATS = ("jsonl", "binary")
+STORE_FILES = {
+    "jsonl": "Optimized_Chunks.jsonl",
+    "binary": "Optimized_Chunks.bin",
+}
+INDEX_SUFFIX = ".idx.json"
+MAX_STALE_RATIO = 0.5  # Ab diesem Anteil veralteter Bytes wird die Datei beim Schließen kompaktiert
+
+_LENGTH = struct.Struct("<I")
+
+
+def _index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def _encode_record(record, store_format):
+    """Serialisiert einen Datensatz; liefert (Bytes zum Anhängen, Offset-Verschiebung, Länge der Nutzdaten)."""
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if store_format == "binary":
+        return _LENGTH.pack(len(payload)) + payload, _LENGTH.size, len(payload)
+    return payload + b"\n", 0, len(payload)
+
+
+class ChunkStoreWriter:
+    """
+    Hängt die optimierten Chunks aller Profile an eine einzelne Datei an.
+
+    Pro Profil wird ein Metadaten-Datensatz und ein Datensatz pro Chunk geschrieben.
+    Der Offset-Index (Chunk-ID bzw. Profil-ID -> Offset und Länge) liegt in
+    <Datei>.idx.json. Wird ein Profil erneut geschrieben, zeigen die Indexeinträge auf
+    die neuen Datensätze; die alten Bytes werden beim Kompaktieren entfernt.
+    """
+
+    def __init__(self, path, store_format="jsonl"):
+        if store_format not in FORMATS:
+            raise ValueError(f"Unbekanntes Format '{store_format}', erlaubt sind: {', '.join(FORMATS)}")
+        self.path = path
+        self.format = store_format
+        self.index = {"format": store_format, "version": 0, "stale_bytes": 0, "chunks": {}, "profiles": {}}
+        self._changed = False
+
+        index_path = _index_path(path)
+        if os.path.exists(path) and os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+            if index.get("format") == store_format:
+                self.index = index
+        if not self.index["profiles"] and os.path.exists(path):
+            # Ohne passenden Index ist der Dateiinhalt nicht adressierbar, daher neu beginnen
+            os.remove(path)
+        self._file = open(path, "ab")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _append(self, record):
+        data, shift, length = _encode_record(record, self.format)
+        offset = self._file.tell() + shift
+        self._file.write(data)
+        return [offset, length]
+
+    def _record_size(self, location):
+        return location[1] + (_LENGTH.size if self.format == "binary" else 1)
+
+    def remove_profile(self, profile_id):
+        """Entfernt ein Profil aus dem Index (die Bytes werden beim Kompaktieren freigegeben)."""
+        entry = self.index["profiles"].pop(profile_id, None)
+        if entry is None:
+            return
+        stale = self._record_size(entry["metadata"])
+        for chunk_id in entry["chunks"]:
+            location = self.index["chunks"].pop(chunk_id, None)
+            if location is not None:
+                stale += self._record_size(location)
+        self.index["stale_bytes"] += stale
+        self._changed = True
+
+    def write_profile(self, profile_id, metadata, chunks):
+        """
+        Schreibt Metadaten und Chunks eines Profils; eine ältere Version wird ersetzt.
+
+        :return: Anzahl der geschriebenen Bytes.
+        """
+        self.remove_profile(profile_id)
+        start = self._file.tell()
+        metadata_location = self._append({"kind": "metadata", "profile_id": profile_id, "metadata": metadata})
+        chunk_ids = []
+        for chunk in chunks:
+            location = self._append({"kind": "chunk", "profile_id": profile_id, **chunk})
+            self.index["chunks"][chunk["id"]] = location
+            chunk_ids.append(chunk["id"])
+        self.index["profiles"][profile_id] = {"metadata": metadata_location, "chunks": chunk_ids}
+        self._changed = True
+        return self._file.tell() - start
+
+    def close(self):
+        """Schließt die Datei, speichert den Index und kompaktiert bei vielen veralteten Datensätzen."""
+        if self._file.closed:
+            return
+        size = self._file.tell()
+        self._file.close()
+        if not self._changed:
+            return
+        self.index["version"] += 1
+        if size and self.index["stale_bytes"] > MAX_STALE_RATIO * size:
+            self._compact()
+        index_path = _index_path(self.path)
+        with open(index_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self.index, file, ensure_ascii=False)
+        os.replace(index_path + ".tmp", index_path)
+
+    def _compact(self):
+        """Schreibt nur die aktuellen Datensätze in eine neue Datei."""
+        store = ChunkStore(self.path, index=self.index)
+        temp_path = self.path + ".tmp"
+        profiles = {}
+        chunks = {}
+        with open(temp_path, "wb") as file:
+            for profile_id, metadata, profile_chunks in store.iter_profiles():
+                locations = []
+                for record in [{"kind": "metadata", "profile_id": profile_id, "metadata": metadata}] + [
+                        {"kind": "chunk", "profile_id": profile_id, **chunk} for chunk in profile_chunks]:
+                    data, shift, length = _encode_record(record, self.format)
+                    locations.append([file.tell() + shift, length])
+                    file.write(data)
+                profiles[profile_id] = {"metadata": locations[0], "chunks": [c["id"] for c in profile_chunks]}
+                chunks.update({chunk["id"]: location for chunk, location in zip(profile_chunks, locations[1:])})
+        store.close()
+        os.replace(temp_path, self.path)
+        self.index.update({"stale_bytes": 0, "chunks": chunks, "profiles": profiles})
+
+
+class ChunkStore:
+    """
+    Lesezugriff auf einen Chunk-Store per mmap.
+
+    Einzelne Chunks und Profile werden über den Offset-Index direkt angesprungen;
+    iter_profiles liest alle aktuellen Profile in Dateireihenfolge.
+    """
+
+    def __init__(self, path, index=None):
+        self.path = path
+        if index is None:
+            with open(_index_path(path), "r", encoding="utf-8") as file:
+                index = json.load(file)
+        self.index = index
+        self.format = index["format"]
+        self.version = index.get("version", 0)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index["chunks"])
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _read(self, location):
+        offset, length = location
+        return json.loads(self._mmap[offset:offset + length])
+
+    def get(self, chunk_id):
+        """Liest einen einzelnen Chunk anhand seiner ID."""
+        location = self.index["chunks"].get(chunk_id)
+        if location is None:
+            raise KeyError(chunk_id)
+        record = self._read(location)
+        del record["kind"]
+        return record
+
+    def profile(self, profile_id):
+        """Liest Metadaten und Chunks eines Profils: (Metadaten, Chunks)."""
+        entry = self.index["profiles"][profile_id]
+        metadata = self._read(entry["metadata"])["metadata"]
+        chunks = [self.get(chunk_id) for chunk_id in entry["chunks"]]
+        return metadata, chunks
+
+    def profile_ids(self):
+        return list(self.index["profiles"])
+
+    def iter_profiles(self, with_chunks=True):
+        """
+        Liest alle Profile in Dateireihenfolge: (Profil-ID, Metadaten, Chunks).
+
+        :param with_chunks: Bei False werden nur die Metadaten gelesen (Chunks als leere Liste).
+        """
+        entries = sorted(self.index["profiles"].items(), key=lambda item: item[1]["metadata"][0])
+        for profile_id, entry in entries:
+            if not with_chunks:
+                yield profile_id, self._read(entry["metadata"])["metadata"], []
+                continue
+            metadata, chunks = self.profile(profile_id)
+            for chunk in chunks:
+                chunk.pop("profile_id", None)
+            yield profile_id, metadata, chunks
+
+
+def read_optimized_profiles(source, with_chunks=True):
+    """
+    Liest optimierte Profile aus einem Ordner mit JSON-Dateien oder aus einem Chunk-Store.
+
+    :param source: Ordner (z.B. Optimized_Chunks) oder Store-Datei (.jsonl/.bin).
+    :param with_chunks: Bei False werden nur die Metadaten benötigt.
+    :return: Generator von (Profil-ID, Metadaten, Chunks).
+    """
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(source, filename), "r", encoding="utf-8") as file:
+                data = json.load(file)
+            metadata = data.get("metadata", {})
+            yield metadata.get("autilityId", "unknown"), metadata, data.get("chunks", []) if with_chunks else []
+    else:
+        with ChunkStore(source) as store:
+            yield from store.iter_profiles(with_chunks)
+
+
+def store_signature(source):
+    """
+    Kennung des aktuellen Datenstands, ohne die Daten zu lesen; ändert sich mit jeder neuen Store-Version.
+
+    Bei einem Store wird der Offset-Index betrachtet, der bei jedem Schließen mit neuer
+    Version atomar ersetzt wird, bei einem Ordner Anzahl, Größe und Änderungszeit der JSON-Dateien.
+    """
+    if os.path.isdir(source):
+        count = size = newest = 0
+        with os.scandir(source) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    count += 1
+                    size += stat.st_size
+                    newest = max(newest, stat.st_mtime_ns)
+        return ("dir", count, size, newest)
+    try:
+        stat = os.stat(_index_path(source))
+    except FileNotFoundError:
+        return None
+    return ("store", stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,201 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from chunk_store import read_optimized_profiles
+from token_counter import count_tokens_batch
+from umlauts import normalisiere
+
+# Eingabe (optimierte Chunks bzw. Chunk-Store) und Ausgabedatei der Duplikatgruppen
+INPUT_DIR = "Optimized_Chunks"
+DEDUP_FILE = "dedup_groups.json"
+
+NUM_PERM = 128               # Länge der MinHash-Signatur
+LSH_BANDS = 32               # Bänder à NUM_PERM / LSH_BANDS Zeilen; Kandidaten ab ca. (1/b)^(1/r) Ähnlichkeit
+SIMILARITY_THRESHOLD = 0.8   # Geschätzte Jaccard-Ähnlichkeit, ab der Chunks als Duplikate gelten
+SHINGLE_WORDS = 3            # Wörter pro Shingle
+SEED = 1
+GROUP_PREFIX = "dup"         # Gruppen-IDs: dup_{type}_{Hash des gemeinsamen Inhalts}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    """
+    MinHash-Signaturen über Wort-Shingles.
+
+    Jede der num_perm Hashfunktionen ist (a * x + b) mod p mit der Primzahl p = 2^61 - 1,
+    angewendet auf die CRC32-Werte der Shingles. Der Anteil gleicher Signaturwerte
+    zweier Texte schätzt die Jaccard-Ähnlichkeit ihrer Shingle-Mengen.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, shingle_words=SHINGLE_WORDS, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        self._a = rng.integers(1, _MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+
+    def shingles(self, text):
+        """Menge der Wort-Shingles des normalisierten Textes (kurze Texte als ein Shingle)."""
+        words = normalisiere(text).split()
+        if len(words) <= self.shingle_words:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + self.shingle_words]) for i in range(len(words) - self.shingle_words + 1)}
+
+    def signature(self, text):
+        """MinHash-Signatur (num_perm x uint32) eines Textes."""
+        values = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in self.shingles(text)),
+                             dtype=np.uint64)
+        hashes = (self._a * values + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return hashes.min(axis=1).astype(np.uint32)
+
+
+def aehnlichkeit(signatur_a, signatur_b):
+    """Geschätzte Jaccard-Ähnlichkeit zweier Signaturen."""
+    return float(np.count_nonzero(signatur_a == signatur_b)) / len(signatur_a)
+
+
+def gemeinsamer_inhalt(chunk, metadata):
+    """
+    Inhalt ohne die Namenszeile, mit der gepackte Chunks beginnen.
+
+    Nur der übrige Text kann von mehreren Consultants geteilt werden.
+    """
+    content = chunk.get("content", "")
+    name = metadata.get("fullName")
+    if name and content.startswith(f"{name}\n"):
+        return content[len(name) + 1:]
+    return content
+
+
+def finde_duplikate(chunks, threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS, seed=SEED):
+    """
+    Gruppiert nahezu gleiche Chunks desselben Typs per MinHash und LSH-Banding.
+
+    Die Chunks werden der Reihe nach verarbeitet: Ein Chunk tritt der Gruppe des ersten
+    Repräsentanten bei, mit dem er einen LSH-Bucket teilt und dessen geschätzte Ähnlichkeit
+    mindestens threshold beträgt, sonst wird er selbst Repräsentant. Verglichen wird nur
+    mit Repräsentanten, damit sich Gruppen nicht über Ketten ähnlicher Chunks ausdehnen.
+
+    :param chunks: Liste von (Typ, Text).
+    :return: Liste der Gruppen als Listen von Indizes (Repräsentant zuerst), nur Gruppen ab zwei Chunks.
+    """
+    if num_perm % bands:
+        raise ValueError(f"NUM_PERM ({num_perm}) muss durch die Anzahl der Bänder ({bands}) teilbar sein.")
+    hasher = MinHasher(num_perm, seed=seed)
+    rows = num_perm // bands
+    buckets = {}          # (Typ, Band, Signaturabschnitt) -> Repräsentanten
+    signatures = {}       # Repräsentant -> Signatur
+    groups = {}           # Repräsentant -> Mitglieder
+    for i, (chunk_type, text) in enumerate(chunks):
+        signature = hasher.signature(text)
+        keys = [(chunk_type, band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(bands)]
+        representative = None
+        checked = set()
+        for key in keys:
+            for candidate in buckets.get(key, ()):
+                if candidate not in checked:
+                    checked.add(candidate)
+                    if aehnlichkeit(signature, signatures[candidate]) >= threshold:
+                        representative = candidate
+                        break
+            if representative is not None:
+                break
+        if representative is not None:
+            groups[representative].append(i)
+            continue
+        signatures[i] = signature
+        groups[i] = [i]
+        for key in keys:
+            buckets.setdefault(key, []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def gruppen_id(chunk_type, content):
+    """Inhaltsbasierte ID einer Duplikatgruppe."""
+    digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{GROUP_PREFIX}_{chunk_type}_{digest[:12]}"
+
+
+def dedupliziere(source=INPUT_DIR, output_path=DEDUP_FILE, threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM,
+                 bands=LSH_BANDS):
+    """
+    Sucht nahezu gleiche Chunks über alle Consultants und speichert jede Gruppe einmal.
+
+    Pro Gruppe werden der gemeinsame Inhalt des Repräsentanten (ohne Namenszeile) sowie
+    die Chunk-IDs und Profil-IDs aller Mitglieder gespeichert. embeddings.py (--dedup)
+    berechnet dann einen Vektor pro Gruppe, und der Vektorindex speichert einen Eintrag
+    pro Gruppe, dessen Treffer auf die Mitglieder abgebildet werden.
+
+    :return: Statistik als Dictionary.
+    """
+    start = time.perf_counter()
+    chunks = []  # (Chunk-ID, Profil-ID, Typ, gemeinsamer Inhalt, vollständiger Inhalt)
+    for profile_id, metadata, profile_chunks in read_optimized_profiles(source):
+        for chunk in profile_chunks:
+            chunks.append((chunk["id"], profile_id, chunk.get("type", "unknown"), gemeinsamer_inhalt(chunk, metadata),
+                           chunk.get("content", "")))
+
+    groups = finde_duplikate([(chunk_type, text) for _, _, chunk_type, text, _ in chunks], threshold, num_perm, bands)
+    ergebnis = []
+    for members in groups:
+        _, _, chunk_type, content, _ = chunks[members[0]]
+        ergebnis.append({
+            "id": gruppen_id(chunk_type, content),
+            "type": chunk_type,
+            "content": content,
+            "members": [{"id": chunks[i][0], "profile_id": chunks[i][1]} for i in members],
+        })
+
+    # Eingespart wird alles, was ohne Deduplizierung für die übrigen Mitglieder berechnet würde
+    grouped = sum(len(members) for members in groups)
+    duplicates = [chunks[i][4] for members in groups for i in members[1:]]
+    statistik = {
+        "chunks": len(chunks),
+        "groups": len(groups),
+        "grouped_chunks": grouped,
+        "embeddings": len(chunks) - grouped + len(groups),
+        "embeddings_saved": grouped - len(groups),
+        "index_entries_saved": grouped - len(groups),
+        "tokens_saved": sum(count_tokens_batch(duplicates)) if duplicates else 0,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    with open(output_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"threshold": threshold, "num_perm": num_perm, "bands": bands, "stats": statistik,
+                   "groups": ergebnis}, file, indent=4, ensure_ascii=False)
+    os.replace(output_path + ".tmp", output_path)
+    return statistik
+
+
+def lade_gruppen(path=DEDUP_FILE):
+    """Liest die Duplikatgruppen: Liste von Dictionaries mit id, type, content und members."""
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file).get("groups", [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nahezu gleiche Chunks vor dem Embedding zusammenfassen")
+    parser.add_argument("--input", default=INPUT_DIR, help="Ordner mit optimierten Chunks oder Chunk-Store-Datei")
+    parser.add_argument("--output", default=DEDUP_FILE, help="Ausgabedatei der Duplikatgruppen")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help="Geschätzte Jaccard-Ähnlichkeit, ab der Chunks als Duplikate gelten")
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM, help="Länge der MinHash-Signatur")
+    parser.add_argument("--bands", type=int, default=LSH_BANDS, help="Anzahl der LSH-Bänder")
+    args = parser.parse_args(argv)
+
+    statistik = dedupliziere(args.input, args.output, args.threshold, args.num_perm, args.bands)
+    print(f"Duplikatgruppen gespeichert unter: {args.output}")
+    print(f"{statistik['chunks']} Chunks, {statistik['groups']} Gruppen mit {statistik['grouped_chunks']} Chunks: "
+          f"{statistik['embeddings_saved']} Embeddings und Indexeinträge sowie "
+          f"{statistik['tokens_saved']} Tokens eingespart ({statistik['seconds']} s)")
+
+
+if __name__ == "__main__":
+    main()
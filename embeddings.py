@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import json
+import os
+
+from chunk_store import read_optimized_profiles
+from model import Chunk, intern
+from token_counter import count_tokens_batch
+
+# Eingabe- und Ausgabeordner
+INPUT_DIR = "Optimized_Chunks"
+OUTPUT_DIR = "Embeddings"
+
+# Mehrsprachiges Modell, da die Profile überwiegend auf Deutsch sind
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+BATCH_SIZE = 32
+
+# Vektoren (float32, normalisiert) und zugehörige Chunk-Einträge in Zeilenreihenfolge
+VECTORS_FILE = "embeddings.npy"
+INDEX_FILE = "embeddings_index.json"
+
+# Standardausgabe von dedup.py (nicht importiert, damit numpy nur bei Bedarf geladen wird)
+DEDUP_FILE = "dedup_groups.json"
+
+
+def lade_modell(model_name=MODEL_NAME):
+    """Lädt das Sentence-Transformers-Modell auf der CPU."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def content_hash(model_name, text):
+    """Hash über Modellname und Chunk-Inhalt; ändert sich eines davon, wird neu berechnet."""
+    return hashlib.sha256(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+
+
+def lade_chunks(input_dir=INPUT_DIR):
+    """
+    Liest alle optimierten Chunks aus einem Ordner oder einem Chunk-Store.
+
+    :return: Liste von model.Chunk mit id, type, content und profile_id.
+    """
+    chunks = []
+    for profile_id, _, profile_chunks in read_optimized_profiles(input_dir):
+        profile_id = intern(profile_id)
+        chunks.extend(Chunk(intern(chunk.get("type", "unknown")), chunk.get("content", ""), id=chunk["id"],
+                            profile_id=profile_id) for chunk in profile_chunks)
+    return chunks
+
+
+def fasse_duplikate_zusammen(chunks, dedup_file):
+    """
+    Ersetzt nahezu gleiche Chunks (dedup.py) durch je einen Chunk mit dem gemeinsamen Inhalt.
+
+    Der Gruppen-Chunk trägt die Gruppen-ID und die Profil-ID des ersten Mitglieds; die
+    Mitglieder stehen in members. Gruppen, von denen weniger als zwei Mitglieder in den
+    aktuellen Chunks vorkommen, werden übersprungen.
+
+    :return: Tupel (Liste von Chunks, {Gruppen-ID: Liste von (Chunk-ID, Profil-ID)}).
+    """
+    from dedup import lade_gruppen
+
+    present = {chunk.id for chunk in chunks}
+    replaced = {}
+    members = {}
+    for group in lade_gruppen(dedup_file):
+        group_members = [(member["id"], intern(member["profile_id"])) for member in group["members"]
+                         if member["id"] in present]
+        if len(group_members) < 2:
+            continue
+        group_chunk = Chunk(intern(group["type"]), group["content"], id=group["id"], profile_id=group_members[0][1])
+        replaced[group_members[0][0]] = group_chunk
+        replaced.update((chunk_id, None) for chunk_id, _ in group_members[1:])
+        members[group["id"]] = group_members
+    result = [replaced.get(chunk.id, chunk) for chunk in chunks]
+    return [chunk for chunk in result if chunk is not None], members
+
+
+def bilde_batches(texts, batch_size=BATCH_SIZE):
+    """
+    Gruppiert Texte nach Tokenlänge, damit innerhalb eines Batches möglichst wenig Padding entsteht.
+
+    :return: Liste von Index-Listen.
+    """
+    token_counts = count_tokens_batch(texts)
+    order = sorted(range(len(texts)), key=lambda i: token_counts[i])
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def lade_cache(output_dir=OUTPUT_DIR):
+    """
+    Lädt vorhandene Embeddings.
+
+    :return: Tupel (Vektoren oder None, Liste der Einträge).
+    """
+    import numpy as np
+
+    vectors_path = os.path.join(output_dir, VECTORS_FILE)
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    if not (os.path.exists(vectors_path) and os.path.exists(index_path)):
+        return None, []
+    try:
+        with open(index_path, "r", encoding="utf-8") as file:
+            entries = json.load(file).get("chunks", [])
+        vectors = np.load(vectors_path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        print(f"Embedding-Cache in {output_dir} nicht lesbar, berechne alles neu: {e}")
+        return None, []
+    if len(vectors) != len(entries):
+        print(f"Embedding-Cache in {output_dir} ist inkonsistent, berechne alles neu.")
+        return None, []
+    return vectors, entries
+
+
+def erzeuge_embeddings(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, model_name=MODEL_NAME,
+                       batch_size=BATCH_SIZE, model=None, dedup_file=None):
+    """
+    Berechnet Embeddings für alle optimierten Chunks und speichert sie in output_dir.
+
+    Chunks, deren Inhalt sich nicht geändert hat (gleicher Hash), werden aus dem
+    vorhandenen Cache übernommen und nicht erneut berechnet.
+
+    :param model: Bereits geladenes Modell (optional).
+    :param dedup_file: Duplikatgruppen aus dedup.py (optional); pro Gruppe wird nur ein Embedding berechnet.
+    :return: Anzahl der neu berechneten Embeddings.
+    """
+    import numpy as np
+
+    os.makedirs(output_dir, exist_ok=True)
+    chunks = lade_chunks(input_dir)
+    total = len(chunks)
+    members = {}
+    if dedup_file:
+        chunks, members = fasse_duplikate_zusammen(chunks, dedup_file)
+    hashes = [content_hash(model_name, chunk.content) for chunk in chunks]
+
+    # Vorhandene Vektoren über (id, hash) und ersatzweise über den Hash wiederverwenden
+    old_vectors, old_entries = lade_cache(output_dir)
+    by_id = {(entry["id"], entry["hash"]): row for row, entry in enumerate(old_entries)}
+    by_hash = {entry["hash"]: row for row, entry in enumerate(old_entries)}
+
+    source_rows = []
+    missing = []
+    for i, (chunk, digest) in enumerate(zip(chunks, hashes)):
+        row = by_id.get((chunk.id, digest), by_hash.get(digest))
+        source_rows.append(row)
+        if row is None:
+            missing.append(i)
+
+    # Gleiche Inhalte innerhalb des Laufs nur einmal berechnen
+    unique_missing = {}
+    for i in missing:
+        unique_missing.setdefault(hashes[i], i)
+
+    new_vectors = {}
+    if unique_missing:
+        model = model or lade_modell(model_name)
+        indices = list(unique_missing.values())
+        texts = [chunks[i].content for i in indices]
+        for batch in bilde_batches(texts, batch_size):
+            encoded = model.encode([texts[j] for j in batch], batch_size=len(batch), device="cpu",
+                                   normalize_embeddings=True, convert_to_numpy=True,
+                                   show_progress_bar=False)
+            for j, vector in zip(batch, encoded):
+                new_vectors[hashes[indices[j]]] = vector.astype(np.float32)
+
+    if new_vectors:
+        dimension = len(next(iter(new_vectors.values())))
+    else:
+        dimension = old_vectors.shape[1] if old_vectors is not None else 0
+    vectors = np.zeros((len(chunks), dimension), dtype=np.float32)
+    for i, row in enumerate(source_rows):
+        vectors[i] = old_vectors[row] if row is not None else new_vectors[hashes[i]]
+
+    entries = [{"id": chunk.id, "hash": digest, "profile_id": chunk.profile_id, "type": chunk.type}
+               for chunk, digest in zip(chunks, hashes)]
+    for entry in entries:
+        if entry["id"] in members:
+            entry["members"] = members[entry["id"]]
+
+    # Erst in temporäre Dateien schreiben, da die alten Vektoren noch per mmap geöffnet sind
+    del old_vectors
+    vectors_path = os.path.join(output_dir, VECTORS_FILE)
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    with open(vectors_path + ".tmp", "wb") as file:
+        np.save(file, vectors)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"model": model_name, "dimension": dimension, "chunks": entries}, file, ensure_ascii=False)
+    os.replace(vectors_path + ".tmp", vectors_path)
+    os.replace(index_path + ".tmp", index_path)
+
+    print(f"Embeddings gespeichert unter: {output_dir} "
+          f"({len(chunks)} Chunks, {len(new_vectors)} neu berechnet)")
+    if members:
+        print(f"{len(members)} Duplikatgruppen: {total - len(chunks)} Embeddings eingespart")
+    return len(new_vectors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embeddings für optimierte Chunks erzeugen")
+    parser.add_argument("--input", default=INPUT_DIR, help="Ordner mit optimierten Chunks oder Chunk-Store-Datei")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Ausgabeordner für die Embeddings")
+    parser.add_argument("--model", default=MODEL_NAME, help="Sentence-Transformers-Modell")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Anzahl Chunks pro Batch")
+    parser.add_argument("--dedup", nargs="?", const=DEDUP_FILE, default=None, metavar="DATEI",
+                        help=f"Duplikatgruppen aus dedup.py verwenden (Standard: {DEDUP_FILE})")
+    parser.add_argument("--store", metavar="CODEC", default=None,
+                        help="Anschließend den kompakten Vektorspeicher bauen (float32, float16, int8 oder pq)")
+    args = parser.parse_args(argv)
+    erzeuge_embeddings(args.input, args.output, args.model, args.batch_size, dedup_file=args.dedup)
+    if args.store:
+        import vector_store
+
+        vector_store.baue_store(args.output, codec=args.store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Standardnamen für den Laufbericht und die cProfile-Daten im Basisverzeichnis
+SUMMARY_FILE = "run_summary.json"
+PROFILE_FILE = "run_profile.prof"
+TOP_FUNKTIONEN = 25  # Anzahl der Funktionen aus cProfile im Laufbericht
+
+# Meldungen pro Datei ausgeben (Standard für die Einzelskripte, die Pipeline schaltet sie ab)
+VERBOSE = True
+
+
+def melde(*args, **kwargs):
+    """print für Meldungen pro Datei, wird nur bei VERBOSE ausgegeben."""
+    if VERBOSE:
+        print(*args, **kwargs)
+
+
+def dateigroesse(pfade):
+    """Summe der Größen aller vorhandenen Dateien in Bytes."""
+    return sum(os.path.getsize(p) for p in pfade if os.path.isfile(p))
+
+
+class _Profildaten:
+    """Hülle um die Rohdaten eines cProfile-Laufs, damit pstats.Stats sie übernehmen kann."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class Recorder:
+    """
+    Sammelt Messwerte pro Consultant und Stufe.
+
+    Jede Messung enthält Wall- und CPU-Zeit, gelesene und geschriebene Bytes, neu
+    encodierte Tokens, Token-Cache-Treffer und die Anzahl erzeugter Chunks. Optional
+    wird pro Stufe der Spitzenspeicher über tracemalloc und pro Job ein cProfile
+    aufgezeichnet. In Worker-Prozessen werden die Messungen mit pop_messungen
+    abgeholt und im Hauptprozess übernommen.
+    """
+
+    def __init__(self, profil=False, speicher=False):
+        self.profil = profil
+        self.speicher = speicher
+        self.messungen = []
+        self.profil_stats = None
+        self._aktiv = []
+        # cProfile, pstats und tracemalloc werden erst importiert, wenn sie eingeschaltet sind
+        if speicher:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextmanager
+    def stufe(self, stage, consultant=None, eingaben=()):
+        """
+        Misst einen Stufenaufruf; der Block kann über zaehle weitere Werte eintragen.
+
+        :param eingaben: Eingabedateien, deren Größe als bytes_read erfasst wird.
+        :return: Dictionary der Messung (bytes_written, skipped usw. können gesetzt werden).
+        """
+        messung = {
+            "consultant": consultant,
+            "stage": stage,
+            "skipped": False,
+            "bytes_read": dateigroesse(eingaben),
+            "bytes_written": 0,
+            "chunks": 0,
+        }
+        counter = self._token_counter()
+        if counter is not None:
+            tokens_vorher, hits_vorher = counter.tokens_encoded, counter.hits
+        if self.speicher:
+            import tracemalloc
+
+            tracemalloc.reset_peak()
+        self._aktiv.append(messung)
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield messung
+        except Exception as e:
+            messung["error"] = str(e)
+            raise
+        finally:
+            messung["wall_seconds"] = time.perf_counter() - start
+            messung["cpu_seconds"] = time.process_time() - cpu_start
+            if counter is not None:
+                messung["tokens_encoded"] = counter.tokens_encoded - tokens_vorher
+                messung["token_cache_hits"] = counter.hits - hits_vorher
+            if self.speicher:
+                messung["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            self._aktiv.pop()
+            self.messungen.append(messung)
+
+    @staticmethod
+    def _token_counter():
+        # Nur auswerten, wenn der Tokenizer ohnehin geladen ist
+        modul = sys.modules.get("token_counter")
+        return modul.get_counter() if modul is not None and modul._counter is not None else None
+
+    def zaehle(self, feld, anzahl=1):
+        """Erhöht einen Zähler der gerade laufenden Messung (ohne aktive Messung wirkungslos)."""
+        if self._aktiv:
+            self._aktiv[-1][feld] = self._aktiv[-1].get(feld, 0) + anzahl
+
+    @contextmanager
+    def job(self):
+        """Zeichnet bei aktiviertem Profiling einen Job (z.B. einen Consultant) mit cProfile auf."""
+        if not self.profil:
+            yield
+            return
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.create_stats()
+            self.uebernehme_profil(profiler.stats)
+
+    def uebernehme_profil(self, stats):
+        """Fasst cProfile-Rohdaten (z.B. aus Worker-Prozessen) zusammen."""
+        if not stats:
+            return
+        if self.profil_stats is None:
+            import pstats
+
+            self.profil_stats = pstats.Stats(_Profildaten(stats))
+        else:
+            self.profil_stats.add(_Profildaten(stats))
+
+    def pop_messungen(self):
+        """Gibt die bisherigen Messungen und cProfile-Rohdaten zurück und leert den Speicher."""
+        messungen, self.messungen = self.messungen, []
+        stats = self.profil_stats.stats if self.profil_stats is not None else None
+        self.profil_stats = None
+        return messungen, stats
+
+    def uebernehme(self, messungen, stats=None):
+        """Übernimmt Messungen und cProfile-Rohdaten aus einem Worker-Prozess."""
+        self.messungen.extend(messungen)
+        self.uebernehme_profil(stats)
+
+    def zusammenfassung(self, wall_seconds=None, extra=None):
+        """
+        Laufbericht mit Summen pro Stufe und den Einzelmessungen pro Consultant.
+
+        :param extra: Weitere Angaben für den Bericht (z.B. Token-Cache-Statistik).
+        """
+        stufen = {}
+        consultants = {}
+        for messung in self.messungen:
+            summe = stufen.setdefault(messung["stage"], {
+                "executed": 0, "skipped": 0, "errors": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                "bytes_read": 0, "bytes_written": 0, "tokens_encoded": 0, "chunks": 0,
+                "max_wall_seconds": 0.0, "slowest_consultant": None,
+            })
+            summe["skipped" if messung["skipped"] else "executed"] += 1
+            summe["errors"] += 1 if "error" in messung else 0
+            for feld in ("wall_seconds", "cpu_seconds", "bytes_read", "bytes_written", "tokens_encoded", "chunks"):
+                summe[feld] += messung.get(feld, 0)
+            if messung["wall_seconds"] > summe["max_wall_seconds"]:
+                summe["max_wall_seconds"] = messung["wall_seconds"]
+                summe["slowest_consultant"] = messung["consultant"]
+            if "peak_memory_bytes" in messung:
+                summe["peak_memory_bytes"] = max(summe.get("peak_memory_bytes", 0), messung["peak_memory_bytes"])
+            if messung["consultant"] is not None:
+                werte = {k: v for k, v in messung.items() if k not in ("consultant", "stage")}
+                consultants.setdefault(messung["consultant"], {})[messung["stage"]] = werte
+
+        bericht = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "wall_seconds": wall_seconds,
+            "consultants_total": len(consultants),
+            "stages": stufen,
+        }
+        bericht.update(extra or {})
+        if self.profil_stats is not None:
+            bericht["profile_top"] = self._top_funktionen()
+        bericht["consultants"] = consultants
+        return bericht
+
+    def _top_funktionen(self, anzahl=TOP_FUNKTIONEN):
+        eintraege = []
+        for (datei, zeile, funktion), (_, aufrufe, tottime, cumtime, _) in self.profil_stats.stats.items():
+            eintraege.append({"function": f"{os.path.basename(datei)}:{zeile}({funktion})",
+                              "calls": aufrufe, "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+        eintraege.sort(key=lambda eintrag: eintrag["cumtime"], reverse=True)
+        return eintraege[:anzahl]
+
+    def speichere(self, pfad, wall_seconds=None, extra=None, profil_pfad=None):
+        """Schreibt den Laufbericht als JSON und optional die cProfile-Daten (für pstats/snakeviz)."""
+        bericht = self.zusammenfassung(wall_seconds, extra)
+        with open(pfad + ".tmp", "w", encoding="utf-8") as datei:
+            json.dump(bericht, datei, indent=4, ensure_ascii=False)
+        os.replace(pfad + ".tmp", pfad)
+        if profil_pfad and self.profil_stats is not None:
+            self.profil_stats.dump_stats(profil_pfad)
+        return bericht
+
+
+_recorder = None
+
+
+def configure(verbose=True, profil=False, speicher=False):
+    """Legt die Einstellungen für den aktuellen Prozess fest und startet einen neuen Recorder."""
+    global VERBOSE, _recorder
+    VERBOSE = verbose
+    _recorder = Recorder(profil, speicher)
+    return _recorder
+
+
+def get_recorder():
+    """Gemeinsamer Recorder des Prozesses."""
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder()
+    return _recorder
+
+
+def zaehle(feld, anzahl=1):
+    """Erhöht einen Zähler der gerade laufenden Messung im gemeinsamen Recorder."""
+    if _recorder is not None:
+        _recorder.zaehle(feld, anzahl)
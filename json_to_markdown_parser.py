@@ -1,14 +1,17 @@
+import argparse
+import hashlib
 import json
 import os
 from pathlib import Path
 
+from instrumentation import melde
+from model import (CERTIFICATES, LANGUAGE_SKILLS, PROFESSIONAL_SUMMARY, SECTION_TITLES, TECHNICAL_SKILLS,
+                   Profile)
+
 # Eingabe- und Ausgabeordner
 INPUT_DIR = "Merged"
 OUTPUT_DIR = "Markdown_Profiles"
 
-# Ausgabeordner sicherstellen
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 
 def list_to_str(value):
     """Liste oder einzelner Wert in eine schöne String-Darstellung konvertieren."""
@@ -17,208 +20,308 @@ def list_to_str(value):
     return "" if value is None else str(value)
 
 
-def add_heading(lines, level, text):
-    """Überschrift mit Leerzeilen davor/danach hinzufügen (MD022-konform)."""
-    text = text.strip()
-    if not text:
-        return
-    if lines and lines[-1].strip() != "":
-        lines.append("")
-    lines.append("#" * level + " " + text)
-    lines.append("")  # Leerzeile nach der Überschrift
+# Ausgegebene Abschnitte mit Einträgen aus startDate, endDate und description: (JSON-Feld, Überschrift)
+SECTION_LISTS = [
+    (field, SECTION_TITLES[field])
+    for field in ("auticonProjects", "studyProjects", "professionalExperience", "studies", "training", "engagements")
+]
 
+# Basisinformationen als Bullet-Points: (JSON-Feld, Beschriftung)
+BASIC_FIELDS = [
+    ("position", "Position"),
+    ("availibility", "Verfügbarkeit"),
+    ("workHoursPerWeek", "Arbeitsstunden pro Woche"),
+    ("location", "Standort"),
+    ("travelArrangement", "Reisebereitschaft"),
+    ("speciality", "Spezialisierung"),
+    ("preferredWorkingAreas", "Bevorzugte Tätigkeitsbereiche"),
+]
 
-def add_text_block(lines, text):
-    """Einen normalen Textblock anhängen (mit vorangehender Leerzeile)."""
-    text = text.strip()
-    if not text:
-        return
-    if lines and lines[-1].strip() != "":
-        lines.append("")
-    lines.append(text)
+# Wird die Darstellung geändert, muss die Version erhöht werden, damit alle Profile neu erzeugt werden
+RENDER_VERSION = 2
 
+MANIFEST_FILE = "markdown_manifest.json"  # Eingabe-Hashes pro Profil im Ausgabeordner
+CORPUS_FILE = "Markdown_Corpus.md"        # Standardname der zusammengefassten Korpusdatei
 
-def add_bullet(lines, text):
-    """Einen Bullet-Point hinzufügen."""
-    text = text.strip()
-    if not text:
-        return
-    lines.append(f"- {text}")
 
+# Ein Profil besteht aus Blöcken (Überschrift, Textblock oder zusammenhängende Bullet-Points),
+# die mit genau einer Leerzeile verbunden werden (MD022-konform). Die Renderer hängen nur
+# nicht-leere Blöcke an.
 
-def add_section_list(lines, title, items):
-    """
-    Generische Hilfsfunktion für Abschnitte mit Einträgen,
-    die startDate, endDate und description enthalten.
-    """
+def _add_bullets(blocks, items):
+    """Zusammenhängende Bullet-Points als ein Block; leere Einträge werden ausgelassen."""
+    items = [f"- {item}" for item in items if item]
+    if items:
+        blocks.append("\n".join(items))
+
+
+def _named_level(name, level_desc):
+    if not name:
+        return ""
+    return f"**{name}** ({level_desc})" if level_desc else f"**{name}**"
+
+
+def render_basic_info(blocks, profile, title):
+    blocks.append(f"## {title}")
+    items = []
+    for field, label in BASIC_FIELDS:
+        value = profile.fields.get(field, "")
+        if field == "preferredWorkingAreas":
+            value = list_to_str(value)
+        # Wochenstunden auch bei 0 ausgeben, die übrigen Felder nur, wenn sie gefüllt sind
+        if value if field != "workHoursPerWeek" else value not in ("", None):
+            items.append(f"**{label}:** {value}".strip())
+    _add_bullets(blocks, items)
+
+
+def render_text_section(blocks, text, title):
+    text = (text or "").strip()
+    if text:
+        blocks += (f"## {title}", text)
+
+
+def render_technical_skills(blocks, tech_skills, title):
+    if not tech_skills:
+        return
+    blocks.append(f"## {title}")
+    # Kategorien ohne Namen setzen die Bullet-Points der vorherigen Kategorie fort
+    items = []
+    for category in tech_skills:
+        cat_name = (category.name or "").strip()
+        if cat_name:
+            _add_bullets(blocks, items)
+            blocks.append(f"### {cat_name}")
+            items = []
+        items += [_named_level((name or "").strip(), (level_desc or "").strip())
+                  for name, level_desc in category.skills]
+    _add_bullets(blocks, items)
+
+
+def render_section_list(blocks, items, title):
+    """Abschnitt mit Einträgen, die startDate, endDate und description enthalten."""
     if not items:
         return
-    add_heading(lines, 2, title)
+    blocks.append(f"## {title}")
     for item in items:
-        start = (item.get("startDate") or "").strip()
-        end = (item.get("endDate") or "").strip()
-        desc = (item.get("description") or "").strip()
-
-        # Überschrift pro Eintrag
-        heading_parts = []
-        if start:
-            heading_parts.append(start)
-        if end:
-            heading_parts.append(end)
-        heading_text = " – ".join(heading_parts) if heading_parts else ""
-
-        if heading_text:
-            add_heading(lines, 3, heading_text)
+        start = (item.start or "").strip()
+        end = (item.end or "").strip()
+        desc = (item.description or "").strip()
+        if start and end:
+            blocks.append(f"### {start} – {end}")
+        elif start or end:
+            blocks.append(f"### {start or end}")
         if desc:
-            add_text_block(lines, desc)
-
+            blocks.append(desc)
 
-def convert_profile_to_markdown(data: dict) -> str:
-    """Wandelt ein einzelnes JSON-Profil in eine Markdown-String-Repräsentation um."""
-    lines = []
 
-    full_name = data.get("fullName") or f"{data.get('firstName', '')} {data.get('lastName', '')}".strip()
+def render_certificates(blocks, certificates, title):
+    if not certificates:
+        return
+    blocks.append(f"## {title}")
+    for cert in certificates:
+        name = (cert.name or "").strip()
+        date = (cert.date or "").strip()
+        skills = list_to_str(cert.skills)
+        if date:
+            blocks.append(f"### {name} ({date})" if name else f"### {date}")
+        elif name:
+            blocks.append(f"### {name}")
+        if skills:
+            blocks.append(f"**Skills:** {skills}".strip())
+
+
+def render_languages(blocks, languages, title):
+    if not languages:
+        return
+    blocks.append(f"## {title}")
+    _add_bullets(blocks, [_named_level((lang.name or "").strip(), (lang.level_description or "").strip())
+                          for lang in languages])
+
+
+# Abschnitte eines Profils in Ausgabereihenfolge: (Renderer, JSON-Feld, Überschrift).
+# Der Renderer erhält Profile.get(JSON-Feld), bei JSON-Feld None das ganze Profil.
+SECTION_RENDERERS = [
+    (render_basic_info, None, "Basisinformationen"),
+    (render_text_section, "qualification", "Qualifikation"),
+    (render_technical_skills, TECHNICAL_SKILLS, SECTION_TITLES[TECHNICAL_SKILLS]),
+    (render_text_section, PROFESSIONAL_SUMMARY, SECTION_TITLES[PROFESSIONAL_SUMMARY]),
+    *[(render_section_list, field, title) for field, title in SECTION_LISTS],
+    (render_certificates, CERTIFICATES, SECTION_TITLES[CERTIFICATES]),
+    (render_languages, LANGUAGE_SKILLS, SECTION_TITLES[LANGUAGE_SKILLS]),
+]
+
+
+def convert_profile_to_markdown(data) -> str:
+    """Wandelt ein einzelnes Profil (Profile oder JSON-Dictionary) in eine Markdown-String-Repräsentation um."""
+    profile = data if isinstance(data, Profile) else Profile.from_dict(data)
+    full_name = profile.full_name
     if not full_name:
         full_name = "Unbekannter Consultant"
 
-    # Titel
-    add_heading(lines, 1, full_name)
-
-    # Basisinformationen
-    add_heading(lines, 2, "Basisinformationen")
-    position = data.get("position", "")
-    avail = data.get("availibility", "")
-    hours = data.get("workHoursPerWeek", "")
-    location = data.get("location", "")
-    travel = data.get("travelArrangement", "")
-    speciality = data.get("speciality", "")
-    preferred = list_to_str(data.get("preferredWorkingAreas", []))
-
-    if position:
-        add_bullet(lines, f"**Position:** {position}")
-    if avail:
-        add_bullet(lines, f"**Verfügbarkeit:** {avail}")
-    if hours not in ("", None):
-        add_bullet(lines, f"**Arbeitsstunden pro Woche:** {hours}")
-    if location:
-        add_bullet(lines, f"**Standort:** {location}")
-    if travel:
-        add_bullet(lines, f"**Reisebereitschaft:** {travel}")
-    if speciality:
-        add_bullet(lines, f"**Spezialisierung:** {speciality}")
-    if preferred:
-        add_bullet(lines, f"**Bevorzugte Tätigkeitsbereiche:** {preferred}")
-
-    # Qualifikation
-    qual = (data.get("qualification") or "").strip()
-    if qual:
-        add_heading(lines, 2, "Qualifikation")
-        add_text_block(lines, qual)
-
-    # Technische Skills
-    tech_skills = data.get("technicalSkills", [])
-    if tech_skills:
-        add_heading(lines, 2, "Technische Skills")
-        for category_item in tech_skills:
-            category = category_item.get("category", {})
-            cat_name = category.get("name", "").strip()
-            skills = category.get("skills", [])
-
-            if cat_name:
-                add_heading(lines, 3, cat_name)
-            for skill in skills:
-                skill_name = skill.get("name", "").strip()
-                level_desc = skill.get("levelDescription", "").strip()
-                if skill_name:
-                    if level_desc:
-                        add_bullet(lines, f"**{skill_name}** ({level_desc})")
-                    else:
-                        add_bullet(lines, f"**{skill_name}**")
-
-    # Berufliche Zusammenfassung
-    prof_sum = (data.get("professionalSummary") or "").strip()
-    if prof_sum:
-        add_heading(lines, 2, "Berufliche Zusammenfassung")
-        add_text_block(lines, prof_sum)
-
-    # Auticon-Projekte
-    add_section_list(lines, "Auticon Projekte", data.get("auticonProjects", []))
-
-    # Studienprojekte
-    add_section_list(lines, "Studienprojekte", data.get("studyProjects", []))
-
-    # Berufserfahrung
-    add_section_list(lines, "Berufserfahrung", data.get("professionalExperience", []))
-
-    # Studium
-    add_section_list(lines, "Studium", data.get("studies", []))
-
-    # Weiterbildungen
-    add_section_list(lines, "Weiterbildungen", data.get("training", []))
-
-    # Engagements
-    add_section_list(lines, "Engagements", data.get("engagements", []))
-
-    # Zertifikate
-    certificates = data.get("certificates", [])
-    if certificates:
-        add_heading(lines, 2, "Zertifikate")
-        for cert in certificates:
-            name = (cert.get("name") or "").strip()
-            date = (cert.get("date") or "").strip()
-            skills = list_to_str(cert.get("skills", []))
-
-            heading = name
-            if date:
-                heading = f"{name} ({date})" if name else date
-
-            if heading:
-                add_heading(lines, 3, heading)
-            if skills:
-                add_text_block(lines, f"**Skills:** {skills}")
-
-    # Sprachkenntnisse
-    languages = data.get("languageSkills", [])
-    if languages:
-        add_heading(lines, 2, "Sprachkenntnisse")
-        for lang in languages:
-            lang_name = (lang.get("name") or "").strip()
-            level_desc = (lang.get("levelDescription") or "").strip()
-            if lang_name:
-                if level_desc:
-                    add_bullet(lines, f"**{lang_name}** ({level_desc})")
-                else:
-                    add_bullet(lines, f"**{lang_name}**")
-
-    # Abschließenden String bauen
-    # Überflüssige Leerzeilen am Ende entfernen
-    while lines and lines[-1].strip() == "":
-        lines.pop()
-
-    return "\n".join(lines) + "\n"
-
-
-def main():
-    for filename in os.listdir(INPUT_DIR):
-        if not filename.endswith(".json"):
-            continue
+    full_name = full_name.strip()
+    blocks = [f"# {full_name}"] if full_name else []
+    for render, field, title in SECTION_RENDERERS:
+        render(blocks, profile if field is None else profile.get(field), title)
+    return "\n\n".join(blocks) + "\n"
+
+
+def convert_file(input_path, output_dir=OUTPUT_DIR):
+    """Wandelt eine JSON-Datei um und gibt den Pfad der Markdown-Datei zurück (None bei Fehlern)."""
+    input_path = Path(input_path)
+    with open(input_path, "rb") as f:
+        raw = f.read()
+    output_path = Path(output_dir) / input_path.name.replace(".json", ".md")
+    return output_path if _render_to_file(raw, input_path, output_path) else None
+
 
-        input_path = Path(INPUT_DIR) / filename
-        with open(input_path, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError as e:
-                print(f"Fehler beim Lesen von {input_path}: {e}")
+def _render_to_file(raw, input_path, output_path):
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        print(f"Fehler beim Lesen von {input_path}: {e}")
+        return False
+
+    write_markdown(data, output_path)
+    return True
+
+
+def write_markdown(profile, output_path):
+    """Schreibt ein bereits gelesenes Profil (Profile oder Dictionary) als Markdown-Datei."""
+    markdown = convert_profile_to_markdown(profile)
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.write(markdown)
+
+    melde(f"✅ {output_path} erstellt.")
+    return output_path
+
+
+def _render_job(job):
+    """Worker-Funktion: (Dateiname, JSON-Bytes, Ausgabeordner) -> (Dateiname, erfolgreich)."""
+    filename, raw, output_dir = job
+    output_path = Path(output_dir) / filename.replace(".json", ".md")
+    return filename, _render_to_file(raw, filename, output_path)
+
+
+def input_hash(raw):
+    """Hash über Renderer-Version und Inhalt der Merged-Datei."""
+    return hashlib.sha256(f"{RENDER_VERSION}:".encode("ascii") + raw).hexdigest()
+
+
+def _load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Manifest {path} nicht lesbar, alle Profile werden neu erzeugt: {e}")
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def write_corpus(output_dir, filenames, corpus_path):
+    """
+    Fasst die Markdown-Dateien zu einer Datei zusammen; jedem Profil geht ein Kommentar mit dem Dateinamen voraus.
+
+    :return: Anzahl der aufgenommenen Profile.
+    """
+    count = 0
+    with open(corpus_path + ".tmp", "w", encoding="utf-8") as corpus:
+        for filename in filenames:
+            md_name = filename.replace(".json", ".md")
+            md_path = os.path.join(output_dir, md_name)
+            if not os.path.exists(md_path):
                 continue
+            with open(md_path, "r", encoding="utf-8") as f:
+                corpus.write(f"<!-- source: {md_name} -->\n\n{f.read()}\n")
+            count += 1
+    os.replace(corpus_path + ".tmp", corpus_path)
+    return count
 
-        markdown = convert_profile_to_markdown(data)
 
-        output_name = filename.replace(".json", ".md")
-        output_path = Path(OUTPUT_DIR) / output_name
-        with open(output_path, "w", encoding="utf-8") as out:
-            out.write(markdown)
+def convert_all(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, workers=1, force=False, corpus_path=None):
+    """
+    Erzeugt die Markdown-Dateien aller Profile, die sich seit dem letzten Lauf geändert haben.
+
+    Unveränderte Profile (gleicher Hash der Merged-Datei laut markdown_manifest.json)
+    werden übersprungen, die übrigen bei workers > 1 in einem Prozess-Pool erzeugt.
+    Markdown-Dateien von entfernten Merged-Dateien werden gelöscht.
+
+    :param workers: Anzahl der Prozesse (0 = alle CPU-Kerne).
+    :param force: Alle Profile neu erzeugen.
+    :param corpus_path: Optional alle Profile zusätzlich in eine Korpusdatei schreiben.
+    :return: Dictionary mit Anzahl erzeugter, übersprungener, entfernter und fehlerhafter Profile.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {} if force else _load_manifest(output_dir)
+    filenames = sorted(f for f in os.listdir(input_dir) if f.endswith(".json"))
+
+    jobs = []
+    hashes = {}
+    for filename in filenames:
+        with open(os.path.join(input_dir, filename), "rb") as f:
+            raw = f.read()
+        hashes[filename] = input_hash(raw)
+        if manifest.get(filename) == hashes[filename] and \
+                os.path.exists(os.path.join(output_dir, filename.replace(".json", ".md"))):
+            continue
+        jobs.append((filename, raw, output_dir))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        # Erst hier importiert, da multiprocessing den Start einzelner Aufrufe merklich verlangsamt
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        results = [_render_job(job) for job in jobs]
+
+    failed = [filename for filename, ok in results if not ok]
+    for filename, ok in results:
+        if ok:
+            manifest[filename] = hashes[filename]
+        else:
+            manifest.pop(filename, None)
+
+    removed = [filename for filename in manifest if filename not in hashes]
+    for filename in removed:
+        del manifest[filename]
+        md_path = os.path.join(output_dir, filename.replace(".json", ".md"))
+        if os.path.exists(md_path):
+            os.remove(md_path)
+    _save_manifest(output_dir, manifest)
+
+    stats = {"rendered": len(results) - len(failed), "skipped": len(filenames) - len(jobs),
+             "removed": len(removed), "failed": len(failed)}
+    if corpus_path:
+        stats["corpus_profiles"] = write_corpus(output_dir, filenames, corpus_path)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merged-Profile in Markdown umwandeln")
+    parser.add_argument("--input", default=INPUT_DIR, help="Ordner mit den Merged-JSON-Dateien")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Ausgabeordner für die Markdown-Dateien")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl Prozesse (0 = alle CPU-Kerne)")
+    parser.add_argument("--force", action="store_true", help="Alle Profile neu erzeugen")
+    parser.add_argument("--corpus", nargs="?", const=CORPUS_FILE, default=None,
+                        help=f"Alle Profile zusätzlich in eine Datei schreiben (Standard: {CORPUS_FILE})")
+    args = parser.parse_args(argv)
+
+    stats = convert_all(args.input, args.output, args.workers, args.force, args.corpus)
+    print(f"Markdown: {stats['rendered']} erzeugt, {stats['skipped']} unverändert, "
+          f"{stats['removed']} entfernt, {stats['failed']} fehlerhaft.")
+    if args.corpus:
+        print(f"Korpus mit {stats['corpus_profiles']} Profilen gespeichert unter: {args.corpus}")
 
-        print(f"✅ {output_path} erstellt.")
 
 if __name__ == "__main__":
     main()
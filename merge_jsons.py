@@ -1,11 +1,161 @@
+import argparse
+import hashlib
 import os
 import json
 
+from instrumentation import melde
+from umlauts import normalisiere
+
+
+# Felder eines datierten Eintrags, die zusammen den Dedup-Schlüssel bilden
+EINTRAG_FELDER = ("startDate", "endDate", "description")
+
+
+def normalisierter_name(text):
+    """Vergleichsschlüssel für Namen: Umlaute wie in rename_umlauts_* ersetzen, '_'/'-' als Leerzeichen."""
+    return normalisiere(str(text).replace("_", " ").replace("-", " "))
+
+
+def _inhalt_schluessel(profil):
+    """Schlüssel aus dem Inhalt eines Autility-Profils: fullName, Vor- und Nachname, autilityId."""
+    schluessel = []
+    if profil.get("fullName"):
+        schluessel.append(normalisierter_name(profil["fullName"]))
+    if profil.get("firstName") or profil.get("lastName"):
+        schluessel.append(normalisierter_name(f"{profil.get('firstName', '')} {profil.get('lastName', '')}"))
+    if profil.get("autilityId") is not None:
+        schluessel.append(str(profil["autilityId"]))
+    return schluessel
+
+
+def ordne_autility_zu(namen, autility_folder):
+    """
+    Ordnet Consultant-Namen (z.B. aus den Dateinamen in Chunked) ihrer Autility-JSON zu.
+
+    Zuerst wird über den normalisierten Dateinamen verglichen, ohne Dateien zu lesen.
+    Nur für noch offene Namen werden die übrigen Autility-Dateien einzeln geladen und
+    über fullName, Vor-/Nachname oder autilityId zugeordnet.
+
+    :param namen: Iterable von Consultant-Namen (z.B. "Anna_Mueller" oder eine autilityId).
+    :return: Dictionary {Name: Pfad der Autility-JSON} für alle gefundenen Namen.
+    """
+    gesucht = {}
+    for name in namen:
+        gesucht.setdefault(normalisierter_name(name), name)
+    if not os.path.exists(autility_folder):
+        return {}
+
+    zuordnung = {}
+    uebrige = []
+    for datei in sorted(os.listdir(autility_folder)):
+        if not datei.endswith(".json"):
+            continue
+        pfad = os.path.join(autility_folder, datei)
+        name = gesucht.get(normalisierter_name(datei[:-len(".json")]))
+        if name is not None and name not in zuordnung:
+            zuordnung[name] = pfad
+        else:
+            uebrige.append(pfad)
+
+    offen = {schluessel: name for schluessel, name in gesucht.items() if name not in zuordnung}
+    for pfad in uebrige:
+        if not offen:
+            break
+        try:
+            with open(pfad, "r", encoding="utf-8") as datei:
+                profil = json.load(datei)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Fehler beim Lesen von {pfad}: {e}")
+            continue
+        if not isinstance(profil, dict):
+            continue
+        for schluessel in _inhalt_schluessel(profil):
+            name = offen.pop(schluessel, None)
+            if name is not None:
+                zuordnung[name] = pfad
+                break
+    return zuordnung
+
+
+def finde_paare(chunked_folder, autility_folder):
+    """
+    Liefert nacheinander die zusammengehörigen Dateien aus Chunked und Autility-JSON.
+
+    :return: Generator von (Autility-Pfad, Chunked-Pfad, Dateiname der Ausgabe wie in Chunked).
+    """
+    namen = sorted(f[:-len(".json")] for f in os.listdir(chunked_folder) if f.endswith(".json"))
+    zuordnung = ordne_autility_zu(namen, autility_folder)
+    for name in namen:
+        autility_pfad = zuordnung.get(name)
+        if autility_pfad is not None:
+            yield autility_pfad, os.path.join(chunked_folder, f"{name}.json"), f"{name}.json"
+
+
+def eintrag_schluessel(eintrag):
+    """
+    Stabiler Schlüssel für Listeneinträge.
+
+    Datierte Einträge (mit startDate, endDate und description, weitere Felder wie company
+    oder role sind erlaubt) werden über (startDate, endDate, Hash der normalisierten
+    Beschreibung) verglichen, damit gleiche Projekte aus Autility und Text-Profil nur einmal
+    vorkommen; alle anderen Einträge über ihren vollständigen Inhalt.
+    """
+    if isinstance(eintrag, dict) and all(feld in eintrag for feld in EINTRAG_FELDER):
+        beschreibung = normalisiere(str(eintrag.get("description") or ""))
+        return (str(eintrag.get("startDate") or "").strip(), str(eintrag.get("endDate") or "").strip(),
+                hashlib.sha1(beschreibung.encode("utf-8")).hexdigest())
+    return json.dumps(eintrag, sort_keys=True, ensure_ascii=False)
+
+
+def dedupliziere(eintraege):
+    """
+    Entfernt doppelte Einträge, die Reihenfolge des ersten Vorkommens bleibt erhalten.
+
+    Felder, die nur ein Duplikat enthält (z.B. company), werden in das erste Vorkommen übernommen.
+    """
+    gesehen = {}
+    ergebnis = []
+    for eintrag in eintraege:
+        schluessel = eintrag_schluessel(eintrag)
+        erstes = gesehen.get(schluessel)
+        if erstes is None:
+            eintrag = dict(eintrag) if isinstance(eintrag, dict) else eintrag
+            gesehen[schluessel] = eintrag
+            ergebnis.append(eintrag)
+        elif isinstance(eintrag, dict):
+            for feld, wert in eintrag.items():
+                if wert and not erstes.get(feld):
+                    erstes[feld] = wert
+    return ergebnis
+
+
+def merge_profile(data1, data2):
+    """
+    Fügt die Inhalte von data2 an data1 an.
+
+    Listen werden zusammengeführt und dedupliziert, Dictionaries aktualisiert,
+    alle anderen Werte aus data2 übernommen.
+
+    :return: Ein neues Dictionary mit der kombinierten Struktur.
+    """
+    merged = dict(data1)
+    for key, value in data2.items():
+        if key in merged and isinstance(merged[key], list) and isinstance(value, list):
+            # Falls der Schlüssel bereits existiert und beide Werte Listen sind, zusammenführen
+            merged[key] = dedupliziere(merged[key] + value)
+        elif key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
+            # Falls beide Werte Dictionaries sind, zusammenführen
+            merged[key] = {**merged[key], **value}
+        else:
+            # Schlüssel existiert nicht in data1, füge neuen Schlüssel hinzu
+            merged[key] = value
+    return merged
+
 
 def append_json_data(file1_path, file2_path):
     """
     Liest zwei JSON-Dateien ein und fügt die Inhalte der zweiten Datei
-    direkt an die erste Datei hinzu.
+    an die erste Datei an (Listen ohne doppelte Einträge).
 
     :param file1_path: Pfad zur ersten JSON-Datei (Basis).
     :param file2_path: Pfad zur zweiten JSON-Datei (hinzuzufügende Daten).
@@ -17,33 +167,61 @@ def append_json_data(file1_path, file2_path):
         with open(file2_path, 'r', encoding='utf-8') as file2:
             data2 = json.load(file2)
 
-        # Inhalte von file2 an data1 "anhängen"
-        if isinstance(data1, dict) and isinstance(data2, dict):
-            for key, value in data2.items():
-                if key in data1 and isinstance(data1[key], list) and isinstance(value, list):
-                    # Falls der Schlüssel bereits existiert und beide Werte Listen sind, zusammenführen
-                    data1[key].extend(value)
-                elif key in data1 and isinstance(data1[key], dict) and isinstance(value, dict):
-                    # Falls beide Werte Dictionaries sind, zusammenführen
-                    data1[key].update(value)
-                else:
-                    # Schlüssel existiert nicht in data1, füge neuen Schlüssel hinzu
-                    data1[key] = value
-        else:
+        if not (isinstance(data1, dict) and isinstance(data2, dict)):
             print("Fehler: Beide Dateien müssen JSON-Objekte sein (keine Arrays).")
             return None
-
-        return data1
+        return merge_profile(data1, data2)
 
     except Exception as e:
         print(f"Fehler beim Anhängen von {file2_path} an {file1_path}: {e}")
         return None
 
 
+def inhalts_hash(daten):
+    """SHA-256 über die Bytes."""
+    return hashlib.sha256(daten).hexdigest()
+
+
+def schreibe_wenn_geaendert(output_path, daten):
+    """
+    Schreibt die Bytes nur, wenn sich der Inhalts-Hash gegenüber der vorhandenen Datei geändert hat.
+
+    :return: True, falls die Datei geschrieben wurde.
+    """
+    if os.path.exists(output_path) and os.path.getsize(output_path) == len(daten):
+        with open(output_path, 'rb') as vorhanden:
+            if inhalts_hash(vorhanden.read()) == inhalts_hash(daten):
+                return False
+    with open(output_path, 'wb') as output_file:
+        output_file.write(daten)
+    return True
+
+
+def merge_json_file(file1_path, file2_path, output_path):
+    """
+    Kombiniert zwei JSON-Dateien und speichert das Ergebnis, sofern es sich geändert hat.
+
+    :param file1_path: Pfad zur ersten JSON-Datei (Basis).
+    :param file2_path: Pfad zur zweiten JSON-Datei (hinzuzufügende Daten).
+    :param output_path: Pfad der kombinierten Datei.
+    :return: True, falls die Ausgabe aktuell ist (geschrieben oder unverändert), sonst False.
+    """
+    merged_data = append_json_data(file1_path, file2_path)
+    if merged_data is None:
+        return False
+    daten = json.dumps(merged_data, indent=4, ensure_ascii=False).encode('utf-8')
+    if schreibe_wenn_geaendert(output_path, daten):
+        melde(f"Kombinierte Datei gespeichert: {output_path}")
+    else:
+        melde(f"Kombinierte Datei unverändert: {output_path}")
+    return True
+
+
 def merge_all_json_files(folder1, folder2, output_folder):
     """
     Kombiniert alle JSON-Dateien aus zwei Ordnern paarweise und speichert die Ergebnisse.
-    Daten aus Ordner1 werden an Daten aus Ordner2 angehängt.
+    Daten aus Ordner1 werden an Daten aus Ordner2 angehängt. Die Paare werden über
+    normalisierte Namen bzw. die autilityId gefunden (siehe ordne_autility_zu).
 
     :param folder1: Pfad zum ersten Ordner (zusätzliche Daten).
     :param folder2: Pfad zum zweiten Ordner (Basisdaten).
@@ -53,37 +231,29 @@ def merge_all_json_files(folder1, folder2, output_folder):
         # Ordner erstellen, falls nicht vorhanden
         os.makedirs(output_folder, exist_ok=True)
 
-        # Alle JSON-Dateien in den beiden Ordnern
-        files1 = {f for f in os.listdir(folder1) if f.endswith('.json')}
-        files2 = {f for f in os.listdir(folder2) if f.endswith('.json')}
+        anzahl = 0
+        for file1_path, file2_path, file_name in finde_paare(folder1, folder2):
+            merge_json_file(file1_path, file2_path, os.path.join(output_folder, file_name))
+            anzahl += 1
 
-        # Gemeinsame Dateien identifizieren
-        common_files = files1 & files2
-
-        if not common_files:
-            print("Keine gemeinsamen JSON-Dateien gefunden.")
-            return
-
-        for file_name in common_files:
-            file1_path = os.path.join(folder2, file_name)  # Basisdaten
-            file2_path = os.path.join(folder1, file_name)  # Zusätzliche Daten
-            output_path = os.path.join(output_folder, file_name)
-
-            merged_data = append_json_data(file1_path, file2_path)
-            if merged_data is not None:
-                with open(output_path, 'w', encoding='utf-8') as output_file:
-                    json.dump(merged_data, output_file, indent=4, ensure_ascii=False)
-                print(f"Kombinierte Datei gespeichert: {output_path}")
+        if not anzahl:
+            print("Keine zusammengehörigen JSON-Dateien gefunden.")
 
     except Exception as e:
         print(f"Fehler beim Verarbeiten der Ordner: {e}")
 
 
-if __name__ == "__main__":
-    # Ordnerpfade
-    chunked_folder = os.path.join(os.getcwd(), "Chunked")
-    autility_json_folder = os.path.join(os.getcwd(), "Autility-JSON")
-    merged_folder = os.path.join(os.getcwd(), "Merged")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON-Dateien aus Chunked und Autility-JSON zusammenführen")
+    parser.add_argument("--chunked", default=os.path.join(os.getcwd(), "Chunked"), help="Ordner mit den geparsten Profilen")
+    parser.add_argument("--autility", default=os.path.join(os.getcwd(), "Autility-JSON"),
+                        help="Ordner mit den Autility-JSON-Dateien")
+    parser.add_argument("--output", default=os.path.join(os.getcwd(), "Merged"), help="Ausgabeordner")
+    args = parser.parse_args(argv)
 
     # Dateien zusammenführen
-    merge_all_json_files(chunked_folder, autility_json_folder, merged_folder)
+    merge_all_json_files(args.chunked, args.autility, args.output)
+
+
+if __name__ == "__main__":
+    main()
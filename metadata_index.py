@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import time
+from bisect import bisect_left, bisect_right
+
+from chunk_store import read_optimized_profiles
+from umlauts import normalisiere
+
+# Eingabeordner
+OPTIMIZED_CHUNKS_DIR = "Optimized_Chunks"
+MERGED_DIR = "Merged"
+
+# Metadatenfelder mit exakt passenden (normalisierten) Werten; Listen werden bei "," getrennt
+INVERTED_FIELDS = ["location", "availibility", "travelArrangement", "preferredWorkingAreas"]
+
+_ZAHL_REGEX = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _werte(value):
+    """Zerlegt einen Metadatenwert (String, Liste oder Zahl) in normalisierte Einzelwerte."""
+    if value is None:
+        return []
+    items = value if isinstance(value, list) else str(value).split(",")
+    return [v for v in (normalisiere(str(item)) for item in items) if v]
+
+
+def _stunden(value):
+    """Liest die Wochenstunden als Zahl, z.B. aus 30, "30" oder "30 Stunden"."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _ZAHL_REGEX.search(str(value or ""))
+    return float(match.group().replace(",", ".")) if match else None
+
+
+def _positionen(bitmap):
+    """Positionen der gesetzten Bits einer Bitmap."""
+    positions = []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            positions.append(byte_index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return positions
+
+
+class MetadataIndex:
+    """
+    Invertierter Attributindex über die Consultant-Metadaten.
+
+    Jeder Attributwert verweist auf eine Bitmap (Python-int) der Consultant-Positionen,
+    Filter werden als bitweises UND ausgewertet. Die Wochenstunden liegen als Spalte
+    mit sortierten Einzelwerten vor, damit Bereichsanfragen per Binärsuche beantwortet werden.
+    Beim Hinzufügen werden nur Positionslisten gesammelt; die Bitmaps entstehen bei der
+    ersten Anfrage.
+    """
+
+    def __init__(self):
+        self.profile_ids = []    # Position -> Profil-ID
+        self.positions = {}      # Profil-ID -> Position
+        self.hours = []          # Position -> Wochenstunden (None, falls unbekannt)
+        self._postings = {field: {} for field in INVERTED_FIELDS + ["skills", "skillCategories", "languages"]}
+        self.inverted = None     # Feld -> Wert -> Bitmap
+        self._hour_values = []   # Sortierte Stundenwerte
+        self._hour_bitmaps = []  # Bitmap je Stundenwert
+        self._all = 0
+
+    def __len__(self):
+        return len(self.profile_ids)
+
+    def _setze(self, field, value, position):
+        self._postings[field].setdefault(value, []).append(position)
+
+    @staticmethod
+    def _bitmap(positions):
+        """Bitmap aus einer Positionsliste, über ein Bytearray statt wiederholter int-Operationen."""
+        if not positions:
+            return 0
+        bits = bytearray(max(positions) // 8 + 1)
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, "little")
+
+    def _baue_bitmaps(self):
+        """Erstellt die Bitmaps aus den gesammelten Positionslisten."""
+        self.inverted = {field: {value: self._bitmap(positions) for value, positions in postings.items()}
+                         for field, postings in self._postings.items()}
+        by_hours = {}
+        for position, hours in enumerate(self.hours):
+            if hours is not None:
+                by_hours.setdefault(hours, []).append(position)
+        self._hour_values = sorted(by_hours)
+        self._hour_bitmaps = [self._bitmap(by_hours[hours]) for hours in self._hour_values]
+        self._all = (1 << len(self.profile_ids)) - 1
+
+    def add(self, profile_id, metadata, technical_skills=None, language_skills=None):
+        """
+        Nimmt einen Consultant in den Index auf.
+
+        :param metadata: Metadaten aus den optimierten Chunks.
+        :param technical_skills: technicalSkills aus dem Merged-Profil.
+        :param language_skills: languageSkills aus dem Merged-Profil.
+        """
+        if profile_id in self.positions:
+            raise ValueError(f"Profil {profile_id} ist bereits im Index.")
+        position = len(self.profile_ids)
+        self.profile_ids.append(profile_id)
+        self.positions[profile_id] = position
+        self.hours.append(_stunden(metadata.get("workHoursPerWeek")))
+        self.inverted = None
+
+        for field in INVERTED_FIELDS:
+            for value in _werte(metadata.get(field)):
+                self._setze(field, value, position)
+
+        for skill_category in technical_skills or []:
+            category = skill_category.get("category", {})
+            for value in _werte(category.get("name")):
+                self._setze("skillCategories", value, position)
+            for skill in category.get("skills", []):
+                for value in _werte(skill.get("name")):
+                    self._setze("skills", value, position)
+
+        for language in language_skills or []:
+            for value in _werte(language.get("name")):
+                self._setze("languages", value, position)
+
+    def _stunden_bitmap(self, min_hours=None, max_hours=None):
+        low = 0 if min_hours is None else bisect_left(self._hour_values, min_hours)
+        high = len(self._hour_values) if max_hours is None else bisect_right(self._hour_values, max_hours)
+        bitmap = 0
+        for hour_bitmap in self._hour_bitmaps[low:high]:
+            bitmap |= hour_bitmap
+        return bitmap
+
+    def filter(self, skills=None, skill_categories=None, languages=None, location=None,
+               availability=None, travel=None, working_areas=None, min_hours=None, max_hours=None):
+        """
+        Liefert die Profil-IDs, die alle angegebenen Bedingungen erfüllen.
+
+        Bei Listen (skills, skill_categories, languages) müssen alle Werte vorhanden sein;
+        bei location, availability, travel und working_areas genügt einer der angegebenen Werte.
+
+        :return: Liste der Profil-IDs in Index-Reihenfolge.
+        """
+        if self.inverted is None:
+            self._baue_bitmaps()
+        bitmap = self._all
+        for field, values in (("skills", skills), ("skillCategories", skill_categories),
+                              ("languages", languages)):
+            for value in _werte(values):
+                bitmap &= self.inverted[field].get(value, 0)
+                if not bitmap:
+                    return []
+
+        for field, values in (("location", location), ("availibility", availability),
+                              ("travelArrangement", travel), ("preferredWorkingAreas", working_areas)):
+            if values is None:
+                continue
+            any_of = 0
+            for value in _werte(values):
+                any_of |= self.inverted[field].get(value, 0)
+            bitmap &= any_of
+            if not bitmap:
+                return []
+
+        if min_hours is not None or max_hours is not None:
+            bitmap &= self._stunden_bitmap(min_hours, max_hours)
+
+        return [self.profile_ids[position] for position in _positionen(bitmap)]
+
+
+def baue_metadata_index(optimized_dir=OPTIMIZED_CHUNKS_DIR, merged_dir=MERGED_DIR):
+    """
+    Baut den Attributindex aus den Metadaten in Optimized_Chunks und den
+    technicalSkills/languageSkills der Merged-Profile.
+    """
+    skills_by_profile = {}
+    if os.path.exists(merged_dir):
+        for filename in sorted(os.listdir(merged_dir)):
+            if filename.endswith(".json"):
+                with open(os.path.join(merged_dir, filename), "r", encoding="utf-8") as file:
+                    profile = json.load(file)
+                skills_by_profile[str(profile.get("autilityId", "unknown"))] = (
+                    profile.get("technicalSkills", []), profile.get("languageSkills", []))
+
+    metadata_index = MetadataIndex()
+    for profile_id, metadata, _ in read_optimized_profiles(optimized_dir, with_chunks=False):
+        technical_skills, language_skills = skills_by_profile.get(profile_id, ([], []))
+        metadata_index.add(profile_id, metadata, technical_skills, language_skills)
+    return metadata_index
+
+
+def gefilterte_suche(query_vector, vector_index, metadata_index, k=10, **filters):
+    """
+    Schränkt die Kandidaten über den Attributindex ein und durchsucht nur deren Chunks.
+
+    :param filters: Argumente für MetadataIndex.filter, z.B. skills=["Java"], location="Berlin", min_hours=30.
+    :return: Treffer wie bei VectorIndex.search.
+    """
+    candidates = metadata_index.filter(**filters)
+    if not candidates:
+        return []
+    return vector_index.search(query_vector, k, profile_ids=candidates)[0]
+
+
+def _synthetische_profile(anzahl, seed=42):
+    """Erzeugt zufällige Metadaten und Skills für den Benchmark."""
+    rng = random.Random(seed)
+    orte = ["Berlin", "München", "Hamburg", "Köln", "Frankfurt", "Stuttgart", "Düsseldorf", "Leipzig"]
+    skills = ["Java", "Python", "C#", "JavaScript", "SQL", "Kubernetes", "Azure", "AWS", "SAP",
+              "Spring", "React", "Angular", "Docker", "Terraform", "Scala", "Go", "Rust", "Tableau"]
+    sprachen = ["Deutsch", "Englisch", "Französisch", "Spanisch"]
+    for i in range(anzahl):
+        metadata = {
+            "autilityId": str(100000 + i),
+            "location": rng.choice(orte),
+            "availibility": rng.choice(["sofort", "ab 01/2026", "nicht verfügbar"]),
+            "workHoursPerWeek": str(rng.choice([20, 25, 30, 32, 35, 40])),
+            "travelArrangement": rng.choice(["bundesweit", "regional", "remote"]),
+            "preferredWorkingAreas": ", ".join(rng.sample(["Backend", "Frontend", "Data", "Test", "DevOps"], 2)),
+        }
+        technical_skills = [{"category": {"name": "Programmiersprachen",
+                                          "skills": [{"name": s} for s in rng.sample(skills, 5)]}}]
+        language_skills = [{"name": s} for s in rng.sample(sprachen, 2)]
+        yield metadata, technical_skills, language_skills
+
+
+def _zeitmessung(funktion, wiederholungen):
+    zeiten = []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        ergebnis = funktion()
+        zeiten.append((time.perf_counter() - start) * 1000)
+    zeiten.sort()
+    return ergebnis, statistics.mean(zeiten), zeiten[int(0.95 * (len(zeiten) - 1))]
+
+
+def benchmark(anzahl=10000, chunks_pro_profil=8, dimension=384, wiederholungen=50):
+    """
+    Misst die Latenz gefilterter Anfragen ("Java + Berlin + >=30h") gegenüber einem
+    linearen Scan und gegenüber einer ungefilterten Vektorsuche.
+    """
+    profile = list(_synthetische_profile(anzahl))
+    metadata_index = MetadataIndex()
+    start = time.perf_counter()
+    for metadata, technical_skills, language_skills in profile:
+        metadata_index.add(metadata["autilityId"], metadata, technical_skills, language_skills)
+    metadata_index.filter()  # Bitmaps aufbauen
+    print(f"Index für {anzahl} Consultants in {(time.perf_counter() - start) * 1000:.1f} ms aufgebaut.")
+
+    filters = {"skills": ["Java"], "location": "Berlin", "min_hours": 30}
+    treffer, mittel, p95 = _zeitmessung(lambda: metadata_index.filter(**filters), wiederholungen)
+    print(f"Attributfilter: {len(treffer)} Kandidaten, Ø {mittel:.3f} ms, p95 {p95:.3f} ms")
+
+    def linearer_scan():
+        return [m["autilityId"] for m, ts, _ in profile
+                if normalisiere(m["location"]) == "berlin"
+                and float(m["workHoursPerWeek"]) >= 30
+                and any(s["name"] == "Java" for c in ts for s in c["category"]["skills"])]
+
+    _, mittel, p95 = _zeitmessung(linearer_scan, wiederholungen)
+    print(f"Linearer Scan:  Ø {mittel:.3f} ms, p95 {p95:.3f} ms")
+
+    try:
+        import numpy as np
+        from vector_index import VectorIndex
+    except ImportError:
+        print("faiss/numpy nicht installiert, Vektorsuche wird nicht gemessen.")
+        return
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((anzahl * chunks_pro_profil, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    profile_ids = [m["autilityId"] for m, _, _ in profile for _ in range(chunks_pro_profil)]
+    chunk_ids = [f"{pid}_chunk_{i}" for i, pid in enumerate(profile_ids)]
+    vector_index = VectorIndex(dimension, "flat")
+    vector_index.add(chunk_ids, vectors, profile_ids)
+    query = vectors[:1]
+
+    _, mittel, p95 = _zeitmessung(lambda: vector_index.search(query, 10), wiederholungen)
+    print(f"Vektorsuche ohne Filter:       Ø {mittel:.3f} ms, p95 {p95:.3f} ms")
+    _, mittel, p95 = _zeitmessung(
+        lambda: gefilterte_suche(query, vector_index, metadata_index, 10, **filters), wiederholungen)
+    print(f"Vektorsuche mit Attributfilter: Ø {mittel:.3f} ms, p95 {p95:.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attributindex für Staffing-Anfragen")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="Benchmark mit N synthetischen Consultants ausführen")
+    parser.add_argument("--skill", action="append", help="Erforderlicher Skill (mehrfach möglich)")
+    parser.add_argument("--location", help="Standort")
+    parser.add_argument("--min-hours", type=float, help="Mindestanzahl Wochenstunden")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        index = baue_metadata_index()
+        for profile_id in index.filter(skills=args.skill, location=args.location, min_hours=args.min_hours):
+            print(profile_id)
+
+
+if __name__ == "__main__":
+    main()
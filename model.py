@@ -0,0 +1,223 @@
+import sys
+
+# Gemeinsame Feldlisten aller Stufen (profile_chunks, profile_chunks_optimized, json_to_markdown_parser)
+
+# Einzelwerte eines Profils, die als eigene Chunks bzw. als Metadaten übernommen werden
+ADDITIONAL_FIELDS = (
+    "firstName", "lastName", "fullName", "autilityId", "autilityUrl",
+    "position", "availibility", "workHoursPerWeek", "location",
+    "travelArrangement", "speciality", "preferredWorkingAreas",
+    "qualification",
+)
+
+# Abschnitte mit Einträgen aus startDate, endDate und description
+DATED_SECTIONS = (
+    "auticonProjects", "studyProjects", "projects", "education",
+    "professionalExperience", "studies", "training", "engagements",
+    "privateProjects", "furtherProjects", "auticonTraining", "certifications",
+)
+
+# Abschnitte mit eigener Struktur
+TECHNICAL_SKILLS = "technicalSkills"
+CERTIFICATES = "certificates"
+LANGUAGE_SKILLS = "languageSkills"
+PROFESSIONAL_SUMMARY = "professionalSummary"
+
+# Felder, die beim Optimieren als Metadaten statt als Chunks gespeichert werden
+METADATA_FIELDS = ADDITIONAL_FIELDS + (LANGUAGE_SKILLS,)
+
+# Abschnitte, die beim früheren Chunking-Verfahren ("merge") zusammengefasst werden
+MERGE_SECTIONS = (TECHNICAL_SKILLS, "professionalExperience", "auticonProjects")
+
+# Deutsche Überschriften der Abschnitte (Chunk-Texte und Markdown)
+SECTION_TITLES = {
+    TECHNICAL_SKILLS: "Technische Skills",
+    PROFESSIONAL_SUMMARY: "Berufliche Zusammenfassung",
+    "auticonProjects": "Auticon Projekte",
+    "studyProjects": "Studienprojekte",
+    "projects": "Projekte",
+    "education": "Ausbildung",
+    "professionalExperience": "Berufserfahrung",
+    "studies": "Studium",
+    "training": "Weiterbildungen",
+    "engagements": "Engagements",
+    "privateProjects": "Private Projekte",
+    "furtherProjects": "Weitere Projekte",
+    "auticonTraining": "Auticon Weiterbildungen",
+    CERTIFICATES: "Zertifikate",
+    "certifications": "Zertifizierungen",
+    LANGUAGE_SKILLS: "Sprachkenntnisse",
+}
+
+
+def intern(value):
+    """Interniert Strings (z.B. Skill-Namen und Level), die im Korpus vielfach vorkommen."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _section_name(name):
+    # Bekannte Namen verwenden die Konstanten oben, alle anderen werden interniert
+    return sys.intern(name) if type(name) is str else name
+
+
+class Entry:
+    """
+    Eintrag eines Abschnitts.
+
+    Datierte Abschnitte verwenden start, end und description, Zertifikate name, date und
+    skills, Sprachen name, level und level_description, technische Skills name (Kategorie)
+    und skills als Tupel von (Name, levelDescription). Fehlende Werte sind None; die
+    Standardwerte (z.B. "N/A") setzen die Stufen selbst.
+    """
+
+    __slots__ = ("section", "start", "end", "description", "name", "date", "level", "level_description", "skills")
+
+    def __init__(self, section, start=None, end=None, description=None, name=None, date=None, level=None,
+                 level_description=None, skills=None):
+        self.section = section
+        self.start = start
+        self.end = end
+        self.description = description
+        self.name = name
+        self.date = date
+        self.level = level
+        self.level_description = level_description
+        self.skills = skills
+
+
+class Chunk:
+    """
+    Chunk eines Profils; optionale Felder sind None und werden in to_dict ausgelassen.
+
+    :param type: Abschnitt bzw. Feldname (interniert).
+    :param source: Name des Consultants (nur in Profile_Chunks).
+    :param profile_id: Profil-ID, wenn Chunks mehrerer Profile gemeinsam geladen werden.
+    """
+
+    __slots__ = ("id", "type", "category", "name", "date", "level", "content", "source", "profile_id")
+
+    # Reihenfolge der Schlüssel in den JSON-Dateien
+    FIELDS = ("id", "type", "category", "name", "date", "level", "content", "source")
+
+    def __init__(self, type, content, source=None, id=None, category=None, name=None, date=None, level=None,
+                 profile_id=None):
+        self.id = id
+        self.type = type
+        self.category = category
+        self.name = name
+        self.date = date
+        self.level = level
+        self.content = content
+        self.source = source
+        self.profile_id = profile_id
+
+    @classmethod
+    def from_dict(cls, data, profile_id=None):
+        """Erzeugt einen Chunk aus einem Dictionary (z.B. aus Profile_Chunks oder Optimized_Chunks)."""
+        return cls(_section_name(data.get("type", "unknown")), data.get("content", ""), data.get("source"),
+                   data.get("id"), data.get("category"), data.get("name"), data.get("date"), data.get("level"),
+                   profile_id)
+
+    def to_dict(self):
+        """Dictionary für JSON-Dateien und Chunk-Store (ohne leere Felder und ohne profile_id)."""
+        result = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None or field == "content":
+                result[field] = value
+        return result
+
+    def __repr__(self):
+        return f"Chunk(id={self.id!r}, type={self.type!r}, content={self.content[:40]!r})"
+
+
+def chunk_dicts(chunks):
+    """Wandelt Chunks für die Ausgabe in Dictionaries um."""
+    return [chunk.to_dict() for chunk in chunks]
+
+
+def _entries(values):
+    return values if isinstance(values, list) else []
+
+
+class Profile:
+    """
+    Gelesenes Merged-Profil.
+
+    fields enthält die vorhandenen ADDITIONAL_FIELDS mit ihren Rohwerten, sections die
+    Einträge der vorhandenen DATED_SECTIONS; technische Skills, Zertifikate und Sprachen
+    liegen als Entry-Tupel vor. Namen von Skills, Leveln und Sprachen werden interniert,
+    da sie sich über den Korpus hinweg stark wiederholen.
+    """
+
+    __slots__ = ("profile_id", "fields", "sections", "technical_skills", "certificates", "languages",
+                 "professional_summary", "has_technical_skills", "has_certificates", "has_languages",
+                 "has_summary")
+
+    def __init__(self, profile_id, fields, sections, technical_skills=(), certificates=(), languages=(),
+                 professional_summary=None, has_technical_skills=False, has_certificates=False,
+                 has_languages=False, has_summary=False):
+        self.profile_id = profile_id
+        self.fields = fields
+        self.sections = sections
+        self.technical_skills = technical_skills
+        self.certificates = certificates
+        self.languages = languages
+        self.professional_summary = professional_summary
+        self.has_technical_skills = has_technical_skills
+        self.has_certificates = has_certificates
+        self.has_languages = has_languages
+        self.has_summary = has_summary
+
+    @classmethod
+    def from_dict(cls, data):
+        """Liest ein Profil aus dem Dictionary einer Merged-JSON-Datei."""
+        fields = {field: data[field] for field in ADDITIONAL_FIELDS if field in data}
+        sections = {}
+        for section in DATED_SECTIONS:
+            if section in data:
+                sections[section] = tuple([Entry(section, item.get("startDate"), item.get("endDate"),
+                                                 item.get("description")) for item in _entries(data[section])])
+
+        technical_skills = []
+        for item in _entries(data.get(TECHNICAL_SKILLS)):
+            category = item.get("category") or {}
+            skills = tuple([(intern(skill.get("name")), intern(skill.get("levelDescription")))
+                            for skill in category.get("skills") or ()])
+            technical_skills.append(Entry(TECHNICAL_SKILLS, None, None, None, intern(category.get("name")), None,
+                                          None, None, skills))
+
+        certificates = tuple([Entry(CERTIFICATES, None, None, None, cert.get("name"), cert.get("date"), None, None,
+                                    cert.get("skills")) for cert in _entries(data.get(CERTIFICATES))])
+        languages = tuple([Entry(LANGUAGE_SKILLS, None, None, None, intern(lang.get("name")), None,
+                                 intern(lang.get("level")), intern(lang.get("levelDescription")))
+                           for lang in _entries(data.get(LANGUAGE_SKILLS))])
+
+        return cls(intern(str(data.get("autilityId", "unknown"))), fields, sections, tuple(technical_skills),
+                   certificates, languages, data.get(PROFESSIONAL_SUMMARY),
+                   TECHNICAL_SKILLS in data, CERTIFICATES in data, LANGUAGE_SKILLS in data,
+                   PROFESSIONAL_SUMMARY in data)
+
+    def get(self, name, default=None):
+        """Wert eines Feldes oder Abschnitts nach seinem JSON-Namen (Abschnitte als Entry-Tupel)."""
+        attribute = _SECTION_ATTRIBUTES.get(name)
+        if attribute is not None:
+            return getattr(self, attribute)
+        if name in self.sections:
+            return self.sections[name]
+        return self.fields.get(name, default)
+
+    @property
+    def full_name(self):
+        """fullName oder ersatzweise Vor- und Nachname (leer, wenn beides fehlt)."""
+        return self.fields.get("fullName") or \
+            f"{self.fields.get('firstName', '')} {self.fields.get('lastName', '')}".strip()
+
+
+# Abschnitte mit eigener Struktur und ihr Attribut in Profile
+_SECTION_ATTRIBUTES = {
+    TECHNICAL_SKILLS: "technical_skills",
+    CERTIFICATES: "certificates",
+    LANGUAGE_SKILLS: "languages",
+    PROFESSIONAL_SUMMARY: "professional_summary",
+}
@@ -0,0 +1,426 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import chunk_store
+import instrumentation
+import json_to_markdown_parser
+import merge_jsons
+import profile_chunks
+import profile_chunks_optimized
+import profile_parser
+import token_counter
+from model import Profile, chunk_dicts
+
+# Manifest mit Eingabe-Hashes und Stufen-Versionen pro Consultant
+MANIFEST_NAME = "pipeline_manifest.json"
+
+# Versionen der einzelnen Stufen. Wird die Logik einer Stufe geändert,
+# muss ihre Version erhöht werden, damit alle Profile neu verarbeitet werden.
+STAGE_VERSIONS = {
+    "parse": 1,
+    "merge": 2,
+    "optimize": 6,
+    "markdown": 1,
+}
+
+# Ordnerstruktur relativ zum Basisverzeichnis
+CHUNKED_DIR = "Chunked"
+AUTILITY_DIR = "Autility-JSON"
+MERGED_DIR = "Merged"
+PROFILE_CHUNKS_DIR = profile_chunks.OUTPUT_PATH
+OPTIMIZED_DIR = profile_chunks_optimized.OUTPUT_DIR
+MARKDOWN_DIR = json_to_markdown_parser.OUTPUT_DIR
+
+
+def datei_hash(pfad):
+    """Berechnet den SHA-256-Hash des Dateiinhalts."""
+    sha = hashlib.sha256()
+    with open(pfad, "rb") as datei:
+        for block in iter(lambda: datei.read(1 << 16), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def berechne_fingerprint(stage, eingaben, basis_verzeichnis, parameter=""):
+    """Fingerprint einer Stufe aus Stufen-Version, Parametern und den Hashes aller Eingabedateien."""
+    sha = hashlib.sha256(f"{stage}:{STAGE_VERSIONS[stage]}:{parameter}".encode("utf-8"))
+    for pfad in eingaben:
+        sha.update(os.path.relpath(pfad, basis_verzeichnis).encode("utf-8"))
+        sha.update(datei_hash(pfad).encode("ascii"))
+    return sha.hexdigest()
+
+
+def lade_manifest(basis_verzeichnis):
+    """Lädt das Manifest oder gibt ein leeres Manifest zurück."""
+    pfad = os.path.join(basis_verzeichnis, MANIFEST_NAME)
+    if not os.path.exists(pfad):
+        return {"consultants": {}}
+    try:
+        with open(pfad, "r", encoding="utf-8") as datei:
+            return json.load(datei)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Manifest {pfad} nicht lesbar, starte ohne Manifest: {e}")
+        return {"consultants": {}}
+
+
+def speichere_manifest(basis_verzeichnis, manifest):
+    """Speichert das Manifest atomar."""
+    pfad = os.path.join(basis_verzeichnis, MANIFEST_NAME)
+    temp_pfad = pfad + ".tmp"
+    with open(temp_pfad, "w", encoding="utf-8") as datei:
+        json.dump(manifest, datei, indent=4, ensure_ascii=False)
+    os.replace(temp_pfad, pfad)
+
+
+def fuehre_stufe_aus(eintrag, stage, eingaben, ausfuehren, basis_verzeichnis, force=False, parameter="",
+                     name=None, ausgaben_messen=True):
+    """
+    Führt eine Stufe nur aus, wenn sich Eingaben oder Stufen-Version geändert haben.
+
+    Laufzeit, gelesene und geschriebene Bytes usw. werden im Recorder aus
+    instrumentation erfasst, übersprungene Stufen mit skipped=True.
+
+    :param eintrag: Manifest-Eintrag des Consultants (wird aktualisiert).
+    :param stage: Name der Stufe.
+    :param eingaben: Liste der Eingabedateien.
+    :param ausfuehren: Funktion ohne Argumente, die die Liste der Ausgabedateien zurückgibt.
+    :param parameter: Einstellungen, die die Ausgabe beeinflussen und in den Fingerprint eingehen.
+    :param name: Consultant, für den die Messung erfasst wird.
+    :param ausgaben_messen: Größe der Ausgabedateien als bytes_written erfassen
+                            (nicht bei gemeinsam genutzten Dateien wie dem Chunk-Store).
+    :return: Tupel (Ausgabedateien, ausgeführt).
+    """
+    with instrumentation.get_recorder().stufe(stage, name, eingaben) as messung:
+        fingerprint = berechne_fingerprint(stage, eingaben, basis_verzeichnis, parameter)
+        zustand = eintrag.get(stage)
+        if not force and zustand and zustand.get("fingerprint") == fingerprint:
+            ausgaben = [os.path.join(basis_verzeichnis, p) for p in zustand.get("outputs", [])]
+            if all(os.path.exists(p) for p in ausgaben):
+                messung["skipped"] = True
+                return ausgaben, False
+
+        ausgaben = ausfuehren()
+        if ausgaben_messen:
+            messung["bytes_written"] = instrumentation.dateigroesse(ausgaben)
+
+    eintrag[stage] = {
+        "version": STAGE_VERSIONS[stage],
+        "fingerprint": fingerprint,
+        "outputs": [os.path.relpath(str(p), basis_verzeichnis) for p in ausgaben],
+    }
+    return ausgaben, True
+
+
+def _profil_id(eintrag, basis_verzeichnis):
+    """Profil-ID eines Consultants aus dem Manifest-Eintrag bzw. ersatzweise aus seiner Merged-Datei."""
+    if "profile_id" in eintrag:
+        return eintrag["profile_id"]
+    for pfad in eintrag.get("merge", {}).get("outputs", []):
+        try:
+            with open(os.path.join(basis_verzeichnis, pfad), "r", encoding="utf-8") as datei:
+                return str(json.load(datei).get("autilityId", "unknown"))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return None
+
+
+def entferne_ausgaben(name, eintrag, basis_verzeichnis, stufen, store_schreibvorgaenge=None):
+    """
+    Löscht die im Manifest-Eintrag verzeichneten Ausgaben der angegebenen Stufen.
+
+    Der gemeinsame Chunk-Store wird nicht gelöscht; stattdessen wird (Profil-ID, None, None)
+    an store_schreibvorgaenge angehängt, damit run_pipeline das Profil aus dem Store entfernt.
+    Die Einträge der Stufen werden aus dem Manifest-Eintrag entfernt.
+
+    :param stufen: Namen der Stufen, z.B. ("merge", "optimize", "markdown").
+    """
+    profile_id = _profil_id(eintrag, basis_verzeichnis)
+    store_dateien = set(chunk_store.STORE_FILES.values())
+    ausgaben = [pfad for stufe in stufen for pfad in eintrag.get(stufe, {}).get("outputs", [])]
+    if profile_id is not None:
+        ausgaben.append(os.path.join(PROFILE_CHUNKS_DIR, f"profile_{profile_id}.json"))
+        if store_schreibvorgaenge is not None:
+            store_schreibvorgaenge.append((profile_id, None, None))
+    for pfad in ausgaben:
+        pfad = os.path.join(basis_verzeichnis, pfad)
+        if os.path.basename(pfad) not in store_dateien and os.path.exists(pfad):
+            os.remove(pfad)
+            instrumentation.melde(f"Ausgabe von {name} gelöscht: {pfad}")
+    for stufe in stufen:
+        eintrag.pop(stufe, None)
+    if "optimize" in stufen:
+        eintrag.pop("profile_id", None)
+
+
+def verarbeite_consultant(name, textdateien, eintrag, basis_verzeichnis, force=False, debug=False,
+                          ausgabeformat="json", store_schreibvorgaenge=None, autility_json=None):
+    """
+    Führt alle Stufen für einen Consultant aus und überspringt unveränderte Stufen.
+
+    :param debug: Zwischenergebnisse der Chunk-Stufe zusätzlich in Profile_Chunks schreiben.
+    :param ausgabeformat: "json" (eine Datei pro Profil) oder "jsonl"/"binary" (Chunk-Store).
+    :param store_schreibvorgaenge: Liste, an die im Store-Modus (Profil-ID, Metadaten, Chunks)
+                                   angehängt wird; geschrieben wird zentral in run_pipeline.
+                                   (Profil-ID, None, None) entfernt das Profil aus dem Store.
+    :param autility_json: Zugeordnete Autility-JSON (siehe merge_jsons.ordne_autility_zu);
+                          ohne Angabe wird Autility-JSON/<Name>.json verwendet.
+
+    :return: Liste der tatsächlich ausgeführten Stufen.
+    """
+    chunked = os.path.join(basis_verzeichnis, CHUNKED_DIR)
+    ausgefuehrt = []
+
+    # 1. Text-Profile -> JSON
+    def parse():
+        ziel_datei_pfad = os.path.join(chunked, f"{name}_zusammengefasst.txt")
+        json_pfad = os.path.join(chunked, f"{name}.json")
+        profile_parser.textdateien_verarbeiten(textdateien, ziel_datei_pfad, json_pfad,
+                                               profile_parser.BEKANNTE_ABSCHNITTE)
+        return [json_pfad, ziel_datei_pfad]
+
+    ausgaben, lief = fuehre_stufe_aus(eintrag, "parse", textdateien, parse, basis_verzeichnis, force,
+                                      name=name)
+    if lief:
+        ausgefuehrt.append("parse")
+    chunked_json = ausgaben[0]
+
+    # 2. Zusammenführen mit Autility-JSON
+    autility_json = autility_json or os.path.join(basis_verzeichnis, AUTILITY_DIR, f"{name}.json")
+    if not os.path.exists(autility_json):
+        print(f"Keine Autility-JSON für {name} gefunden, weitere Stufen übersprungen.")
+        # Frühere Ergebnisse dürfen nicht weiter ausgeliefert werden
+        entferne_ausgaben(name, eintrag, basis_verzeichnis, ("merge", "optimize", "markdown"),
+                          store_schreibvorgaenge)
+        return ausgefuehrt
+    merged_json = os.path.join(basis_verzeichnis, MERGED_DIR, f"{name}.json")
+
+    def merge():
+        if not merge_jsons.merge_json_file(autility_json, chunked_json, merged_json):
+            raise ValueError(f"Zusammenführen für {name} fehlgeschlagen.")
+        return [merged_json]
+
+    _, lief = fuehre_stufe_aus(eintrag, "merge", [autility_json, chunked_json], merge,
+                               basis_verzeichnis, force, name=name)
+    if lief:
+        ausgefuehrt.append("merge")
+
+    # Das Merged-Profil wird höchstens einmal gelesen und von optimize und markdown geteilt
+    profil_cache = []
+
+    def lade_profil():
+        if not profil_cache:
+            with open(merged_json, "r", encoding="utf-8") as datei:
+                profil_cache.append(Profile.from_dict(json.load(datei)))
+        return profil_cache[0]
+
+    # 3./4. Profil -> optimierte Chunks in einem Durchlauf, ohne Zwischendatei
+    debug_dir = os.path.join(basis_verzeichnis, PROFILE_CHUNKS_DIR) if debug else None
+
+    def optimize():
+        optimiert = profile_chunks_optimized.iter_optimized_profiles([(merged_json, lade_profil())], debug_dir)
+        profile_id, metadata, chunks = next(optimiert)
+        # Für das Entfernen des Consultants (Store-Eintrag) im Manifest vermerken
+        eintrag["profile_id"] = profile_id
+        if ausgabeformat == "json":
+            return [profile_chunks_optimized.write_optimized_chunks(
+                f"profile_{profile_id}.json", metadata, chunks, os.path.join(basis_verzeichnis, OPTIMIZED_DIR))]
+        store_schreibvorgaenge.append((profile_id, metadata, chunks))
+        return [os.path.join(basis_verzeichnis, chunk_store.STORE_FILES[ausgabeformat])]
+
+    _, lief = fuehre_stufe_aus(eintrag, "optimize", [merged_json], optimize, basis_verzeichnis, force,
+                               parameter=f"debug={debug};format={ausgabeformat}", name=name,
+                               ausgaben_messen=ausgabeformat == "json")
+    if lief:
+        ausgefuehrt.append("optimize")
+
+    # 5. Markdown erzeugen
+    def markdown():
+        return [json_to_markdown_parser.write_markdown(
+            lade_profil(), os.path.join(basis_verzeichnis, MARKDOWN_DIR, f"{name}.md"))]
+
+    _, lief = fuehre_stufe_aus(eintrag, "markdown", [merged_json], markdown, basis_verzeichnis, force,
+                               name=name)
+    if lief:
+        ausgefuehrt.append("markdown")
+
+    return ausgefuehrt
+
+
+def _init_worker(token_cache_pfad=None, verbose=False, profil=False, speicher=False):
+    """
+    Initialisiert Tokenizer, Token-Cache, kompilierte Regex-Muster und die Messung
+    einmal pro Worker-Prozess.
+    """
+    instrumentation.configure(verbose, profil, speicher)
+    profile_parser.kompiliere_abschnittsmuster(tuple(profile_parser.BEKANNTE_ABSCHNITTE))
+    if token_cache_pfad:
+        token_counter.configure(cache_path=token_cache_pfad)
+    token_counter.get_counter().encoding  # Tokenizer einmal pro Prozess laden
+
+
+def _verarbeite_job(job):
+    """
+    Verarbeitet einen Consultant im Worker-Prozess.
+
+    Fehler werden abgefangen, damit ein defektes Profil die übrigen nicht abbricht.
+
+    :param job: Tupel (Name, Textdateien, Manifest-Eintrag, Basisverzeichnis, force, debug, Ausgabeformat,
+                Autility-JSON oder None).
+    :return: Tupel (Name, aktualisierter Manifest-Eintrag, ausgeführte Stufen, Fehlermeldung,
+             neu gezählte Token-Cache-Einträge, Schreibvorgänge für den Chunk-Store,
+             Messungen und cProfile-Rohdaten).
+    """
+    name, textdateien, eintrag, basis_verzeichnis, force, debug, ausgabeformat, autility_json = job
+    store_schreibvorgaenge = []
+    recorder = instrumentation.get_recorder()
+    try:
+        with recorder.job():
+            ausgefuehrt = verarbeite_consultant(name, textdateien, eintrag, basis_verzeichnis, force, debug,
+                                                ausgabeformat, store_schreibvorgaenge, autility_json)
+        fehler = None
+    except Exception as e:
+        ausgefuehrt, fehler = [], str(e)
+    return (name, eintrag, ausgefuehrt, fehler, token_counter.get_counter().pop_new_entries(),
+            store_schreibvorgaenge, recorder.pop_messungen())
+
+
+def run_pipeline(basis_verzeichnis=None, force=False, workers=1, token_cache=False, debug=False,
+                 ausgabeformat="json", verbose=False, profil=False, speicher=False):
+    """
+    Einstiegspunkt der inkrementellen Pipeline.
+
+    Verarbeitet nur Consultants, deren Eingaben sich seit dem letzten Lauf geändert haben.
+
+    :param basis_verzeichnis: Verzeichnis mit den Ordnern Chunked und Autility-JSON.
+    :param force: Alle Stufen unabhängig vom Manifest neu ausführen.
+    :param workers: Anzahl der Worker-Prozesse (1 = seriell im aktuellen Prozess).
+    :param token_cache: Token-Cache zwischen den Läufen im Basisverzeichnis speichern.
+    :param debug: Zwischenergebnisse der Chunk-Stufe in Profile_Chunks schreiben.
+    :param ausgabeformat: "json" für Optimized_Chunks oder "jsonl"/"binary" für einen Chunk-Store.
+    :param verbose: Meldungen pro Datei ausgeben (sonst nur Zusammenfassung und Fehler).
+    :param profil: Jeden Consultant mit cProfile aufzeichnen (run_profile.prof).
+    :param speicher: Spitzenspeicher pro Stufe mit tracemalloc messen.
+    :return: Dictionary {Name: [ausgeführte Stufen]} in sortierter Reihenfolge.
+    """
+    start = time.perf_counter()
+    basis_verzeichnis = os.path.abspath(basis_verzeichnis or os.getcwd())
+    recorder = instrumentation.configure(verbose, profil, speicher)
+    chunked = os.path.join(basis_verzeichnis, CHUNKED_DIR)
+    if not os.path.exists(chunked):
+        print(f"Der Ordner '{chunked}' wurde nicht gefunden.")
+        return {}
+
+    ordner_liste = [MERGED_DIR, MARKDOWN_DIR] + ([OPTIMIZED_DIR] if ausgabeformat == "json" else [])
+    ordner_liste += [PROFILE_CHUNKS_DIR] if debug else []
+    for ordner in ordner_liste:
+        os.makedirs(os.path.join(basis_verzeichnis, ordner), exist_ok=True)
+
+    manifest = lade_manifest(basis_verzeichnis)
+    eintraege = manifest.setdefault("consultants", {})
+    consultants = profile_parser.finde_consultants(chunked)
+
+    token_cache_pfad = os.path.join(basis_verzeichnis, token_counter.CACHE_FILE) if token_cache else None
+    counter = token_counter.configure(cache_path=token_cache_pfad) if token_cache else token_counter.get_counter()
+
+    # Autility-JSON über normalisierte Namen bzw. autilityId zuordnen, nicht nur über den exakten Dateinamen
+    autility = merge_jsons.ordne_autility_zu(consultants, os.path.join(basis_verzeichnis, AUTILITY_DIR))
+    jobs = [(name, textdateien, eintraege.get(name, {}), basis_verzeichnis, force, debug, ausgabeformat,
+             autility.get(name)) for name, textdateien in consultants.items()]
+
+    # Im Store-Modus schreibt nur der Hauptprozess, die Worker liefern die Chunks zurück
+    writer = None
+    if ausgabeformat != "json":
+        writer = chunk_store.ChunkStoreWriter(
+            os.path.join(basis_verzeichnis, chunk_store.STORE_FILES[ausgabeformat]), ausgabeformat)
+
+    def schreibe_store(name, store_schreibvorgaenge):
+        for profile_id, metadata, chunks in store_schreibvorgaenge:
+            if writer is None:
+                continue
+            if chunks is None:
+                writer.remove_profile(profile_id)
+                continue
+            with recorder.stufe("store", name) as messung:
+                messung["bytes_written"] = writer.write_profile(profile_id, metadata, chunk_dicts(chunks))
+
+    def uebernehme(resultat):
+        name, eintrag, ausgefuehrt, fehler, neue_tokens, store_schreibvorgaenge, messungen = resultat
+        eintraege[name] = eintrag
+        ergebnis[name] = ausgefuehrt
+        counter.update(neue_tokens)
+        recorder.uebernehme(*messungen)
+        schreibe_store(name, store_schreibvorgaenge)
+        if fehler:
+            print(f"Fehler bei der Verarbeitung von {name}: {fehler}")
+
+    ergebnis = {}
+    try:
+        # Consultants, deren Text-Profile entfernt wurden: Ausgaben löschen und aus dem Manifest entfernen
+        for name in sorted(set(eintraege) - set(consultants)):
+            entfernt = []
+            entferne_ausgaben(name, eintraege[name], basis_verzeichnis, ("parse", "merge", "optimize", "markdown"),
+                              entfernt)
+            schreibe_store(name, entfernt)
+            del eintraege[name]
+            print(f"{name} nicht mehr vorhanden, Ausgaben und Eintrag aus dem Manifest entfernt.")
+
+        if workers > 1 and len(jobs) > 1:
+            # Consultants auf Worker-Prozesse verteilen; map liefert die Ergebnisse
+            # in Eingabereihenfolge, dadurch bleiben Manifest und Ausgabe deterministisch.
+            from concurrent.futures import ProcessPoolExecutor
+
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(token_cache_pfad, verbose, profil, speicher)) as executor:
+                for resultat in executor.map(_verarbeite_job, jobs, chunksize=chunksize):
+                    uebernehme(resultat)
+        else:
+            for job in jobs:
+                uebernehme(_verarbeite_job(job))
+    finally:
+        if writer is not None:
+            writer.close()
+        speichere_manifest(basis_verzeichnis, manifest)
+        counter.save()
+
+    geaendert = sum(1 for stufen in ergebnis.values() if stufen)
+    print(f"Pipeline abgeschlossen: {geaendert} von {len(ergebnis)} Consultants aktualisiert.")
+
+    bericht_pfad = os.path.join(basis_verzeichnis, instrumentation.SUMMARY_FILE)
+    profil_pfad = os.path.join(basis_verzeichnis, instrumentation.PROFILE_FILE) if profil else None
+    extra = {"consultants_updated": geaendert, "workers": workers, "output_format": ausgabeformat,
+             "token_cache": counter.stats()}
+    recorder.speichere(bericht_pfad, time.perf_counter() - start, extra, profil_pfad)
+    print(f"Laufbericht gespeichert unter: {bericht_pfad}")
+    return ergebnis
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inkrementelle SmartStaffing-Pipeline")
+    parser.add_argument("--base-dir", default=os.getcwd(),
+                        help="Verzeichnis mit den Ordnern Chunked und Autility-JSON")
+    parser.add_argument("--force", action="store_true",
+                        help="Alle Stufen unabhängig vom Manifest neu ausführen")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Anzahl der Worker-Prozesse (Standard: 1, 0 = alle CPU-Kerne)")
+    parser.add_argument("--token-cache", action="store_true",
+                        help=f"Tokenanzahlen in {token_counter.CACHE_FILE} zwischen den Läufen speichern")
+    parser.add_argument("--debug-intermediate", action="store_true",
+                        help="Zwischenergebnisse der Chunk-Stufe in Profile_Chunks schreiben")
+    parser.add_argument("--output-format", choices=("json",) + chunk_store.FORMATS, default="json",
+                        help="Optimierte Chunks als JSON-Dateien oder als ein Chunk-Store (jsonl/binary)")
+    parser.add_argument("--verbose", action="store_true", help="Meldungen pro Datei ausgeben")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Consultants mit cProfile aufzeichnen ({instrumentation.PROFILE_FILE})")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Spitzenspeicher pro Stufe mit tracemalloc messen")
+    args = parser.parse_args(argv)
+    run_pipeline(args.base_dir, args.force, args.workers or os.cpu_count() or 1, args.token_cache,
+                 args.debug_intermediate, args.output_format, args.verbose, args.profile, args.trace_memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,106 @@
+import argparse
 import json
 import os
 
+from instrumentation import melde
+from model import CERTIFICATES, LANGUAGE_SKILLS, PROFESSIONAL_SUMMARY, TECHNICAL_SKILLS, Chunk, Profile, chunk_dicts
+
 # Ordner mit JSON-Profilen und Zielordner für Chunks
 PROFILE_PATH = "Merged"
 OUTPUT_PATH = "Profile_Chunks"
 
-# Sicherstellen, dass der Ausgabeordner existiert
-if not os.path.exists(OUTPUT_PATH):
-    os.makedirs(OUTPUT_PATH)
-
-# Liste aller relevanten Abschnitte
-sections = [
-    "auticonProjects", "studyProjects", "projects", "education",
-    "professionalExperience", "studies", "training", "engagements",
-    "privateProjects", "furtherProjects", "auticonTraining",
-    "certificates", "certifications"
-]
-
-# Liste der zusätzlichen Felder, die berücksichtigt werden sollen
-additional_fields = [
-    "firstName", "lastName", "fullName", "autilityId", "autilityUrl",
-    "position", "availibility", "workHoursPerWeek", "location",
-    "travelArrangement", "speciality", "preferredWorkingAreas",
-    "qualification"
-]
+def _value(value, default="N/A"):
+    return default if value is None else value
+
 
 # Funktion zur Erstellung einzelner Chunk-Dateien
 
-def chunk_consultant_profile(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        profile = json.load(file)
+def build_chunks(profile):
+    """
+    Zerlegt ein geladenes Profil in Chunks (ohne Dateizugriff).
 
+    :param profile: Profile oder Dictionary einer Merged-JSON-Datei.
+    :return: Liste von Chunk-Objekten.
+    """
+    if not isinstance(profile, Profile):
+        profile = Profile.from_dict(profile)
     chunks = []
-    profile_id = profile.get("autilityId", "unknown")
-    profile_name = profile.get("fullName", "unknown")
-
-    # Zusätzliche Felder als eigene Chunks hinzufügen
-    for field in additional_fields:
-        if field in profile:
-            value = profile[field]
-            content = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
-            chunks.append({
-                "type": field,
-                "content": content,
-                "source": profile_name
-            })
-
-    # Iteriere durch alle Abschnitte im Profil und erstelle Chunks
-    for section in sections:
-        if section in profile and section not in ["certificates", "languageSkills"]:
-            for entry in profile[section]:
-                chunks.append({
-                    "type": section,
-                    "content": f"{entry.get('startDate', 'N/A')} - {entry.get('endDate', 'N/A')} - {entry.get('description', '')}",
-                    "source": profile_name
-                })
+    profile_name = profile.fields.get("fullName", "unknown")
+
+    # Zusätzliche Felder (model.ADDITIONAL_FIELDS) als eigene Chunks hinzufügen
+    for field, value in profile.fields.items():
+        content = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+        chunks.append(Chunk(field, content, profile_name))
+
+    # Iteriere durch alle datierten Abschnitte (model.DATED_SECTIONS) im Profil und erstelle Chunks
+    for section, entries in profile.sections.items():
+        for entry in entries:
+            content = f"{_value(entry.start)} - {_value(entry.end)} - {_value(entry.description, '')}"
+            chunks.append(Chunk(section, content, profile_name))
 
     # Zertifikate separat verarbeiten
-    if "certificates" in profile:
-        for certificate in profile["certificates"]:
-            skills_content = ", ".join(certificate.get("skills", []))
-            chunks.append({
-                "type": "certificates",
-                "name": certificate.get("name", "N/A"),
-                "date": certificate.get("date", "N/A"),
-                "content": f"Skills: {skills_content}",
-                "source": profile_name
-            })
+    for certificate in profile.certificates:
+        skills_content = ", ".join(certificate.skills or [])
+        chunks.append(Chunk(CERTIFICATES, f"Skills: {skills_content}", profile_name,
+                            name=_value(certificate.name), date=_value(certificate.date)))
 
     # Sprachkenntnisse separat verarbeiten
-    if "languageSkills" in profile:
-        for language in profile["languageSkills"]:
-            chunks.append({
-                "type": "languageSkills",
-                "name": language.get("name", "N/A"),
-                "level": language.get("level", "N/A"),
-                "content": language.get("levelDescription", "N/A"),
-                "source": profile_name
-            })
+    for language in profile.languages:
+        chunks.append(Chunk(LANGUAGE_SKILLS, _value(language.level_description), profile_name,
+                            name=_value(language.name), level=_value(language.level)))
 
     # Skills separat verarbeiten
-    if "technicalSkills" in profile:
-        for skill_category in profile["technicalSkills"]:
-            category_name = skill_category["category"]["name"]
-            skills = [skill["name"] for skill in skill_category["category"]["skills"]]
-            chunks.append({
-                "type": "technicalSkills",
-                "category": category_name,
-                "content": f"{category_name}: {', '.join(skills)}",
-                "source": profile_name
-            })
+    for category in profile.technical_skills:
+        category_name = _value(category.name, "")
+        skills = [_value(name, "") for name, _ in category.skills]
+        chunks.append(Chunk(TECHNICAL_SKILLS, f"{category_name}: {', '.join(skills)}", profile_name,
+                            category=category_name))
 
     # Berufliche Zusammenfassung als einzelner Chunk
-    if "professionalSummary" in profile:
-        chunks.append({
-            "type": "professionalSummary",
-            "content": profile["professionalSummary"],
-            "source": profile_name
-        })
-
-    # Speichere Chunks in einer separaten JSON-Datei pro Profil im Ordner profile_chunks
-    output_file = os.path.join(OUTPUT_PATH, f"profile_{profile_id}.json")
+    if profile.has_summary:
+        chunks.append(Chunk(PROFESSIONAL_SUMMARY, _value(profile.professional_summary, ""), profile_name))
+
+    return chunks
+
+
+def write_profile_chunks(profile, chunks, output_path=OUTPUT_PATH):
+    """Speichert Chunks in einer separaten JSON-Datei pro Profil im Ordner profile_chunks."""
+    if not isinstance(profile, Profile):
+        profile = Profile.from_dict(profile)
+    output_file = os.path.join(output_path, f"profile_{profile.profile_id}.json")
     with open(output_file, "w", encoding="utf-8") as outfile:
-        json.dump({"chunks": chunks}, outfile, indent=4, ensure_ascii=False)
+        json.dump({"chunks": chunk_dicts(chunks)}, outfile, indent=4, ensure_ascii=False)
+
+    melde(f"Chunks für {profile.fields.get('fullName', 'unknown')} gespeichert unter: {output_file}")
+    return output_file
+
+
+def chunk_consultant_profile(file_path, output_path=OUTPUT_PATH):
+    """Zerlegt ein Profil in Chunks und gibt den Pfad der erzeugten Datei zurück."""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        profile = Profile.from_dict(json.load(file))
+
+    return write_profile_chunks(profile, build_chunks(profile), output_path)
+
+
+def chunk_all_profiles(profile_path=PROFILE_PATH, output_path=OUTPUT_PATH):
+    """Verarbeitung aller Profile in JSON-Dateien."""
+    # Sicherstellen, dass der Ausgabeordner existiert
+    os.makedirs(output_path, exist_ok=True)
+
+    for filename in os.listdir(profile_path):
+        if filename.endswith(".json"):
+            chunk_consultant_profile(os.path.join(profile_path, filename), output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merged-Profile in Chunks zerlegen")
+    parser.add_argument("--input", default=PROFILE_PATH, help="Ordner mit den Merged-JSON-Dateien")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Ausgabeordner für die Chunks")
+    args = parser.parse_args(argv)
+    chunk_all_profiles(args.input, args.output)
+
 
-    print(f"Chunks für {profile_name} gespeichert unter: {output_file}")
+if __name__ == "__main__":
+    main()
 
-# Verarbeitung aller Profile in JSON-Dateien
-for filename in os.listdir(PROFILE_PATH):
-    if filename.endswith(".json"):
-        chunk_consultant_profile(os.path.join(PROFILE_PATH, filename))
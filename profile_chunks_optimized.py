@@ -1,30 +1,134 @@
+import argparse
+import hashlib
 import json
 import os
-import tiktoken
+import re
+from bisect import bisect_left
 
-# OpenAI Tokenizer für GPT-3.5/4
-encoding = tiktoken.get_encoding("cl100k_base")
+import chunk_store
+import instrumentation
+import profile_chunks
+import token_counter
+from model import CERTIFICATES, METADATA_FIELDS, MERGE_SECTIONS, SECTION_TITLES, Chunk, Profile, chunk_dicts
 
 PROFILE_CHUNKS_DIR = "Profile_Chunks"
 OUTPUT_DIR = "Optimized_Chunks"
 MAX_TOKENS = 500  # Obergrenze für einen Chunk
 MIN_TOKENS = 50   # Untergrenze, um Chunks zusammenzufassen
+OVERLAP_TOKENS = 50  # Überlappung zwischen aufgeteilten Teilstücken
+ID_HASH_LENGTH = 12  # Hex-Zeichen des Inhalts-Hashes in der Chunk-ID
 
-# Sicherstellen, dass der Ausgabeordner existiert
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
+# Bevorzugte Trennstellen beim Aufteilen: Eintragstrenner " | " vor Satzenden
+ENTRY_SEPARATOR = " | "
+ENTRY_SEPARATOR_REGEX = re.compile(r" \| ")
+SENTENCE_END_REGEX = re.compile(r"(?<=[.!?])\s+")
 
-# Liste der Abschnitte, die zusammengefasst werden sollen
-merge_sections = ["technicalSkills", "professionalExperience", "auticonProjects"]
+# Chunking-Verfahren: "pack" packt die Einträge aller Abschnitte bis MAX_TOKENS in Chunks,
+# "merge" ist das frühere Verfahren (nur MERGE_SECTIONS zusammenfassen, kleine Chunks verwerfen)
+CHUNKING_STRATEGIES = ("pack", "merge")
+CHUNKING_STRATEGY = "pack"
+
+COMBINED_TYPE = "combined"  # Typ eines Chunks aus kleinen Resten mehrerer Abschnitte
+SEPARATOR_TOKENS = 2  # Geschätzte Tokens für einen Trenner (" | " bzw. Zeilenumbruch)
 
-# Felder, die als Metadaten gespeichert werden sollen
-metadata_fields = ["firstName", "lastName", "fullName", "autilityId", "autilityUrl",
-                   "position", "availibility", "workHoursPerWeek", "location",
-                   "travelArrangement", "speciality", "preferredWorkingAreas", "qualification", "languageSkills"]
 
 def count_tokens(text):
-    """Berechnet die Anzahl der Tokens im Text."""
-    return len(encoding.encode(text))
+    """Berechnet die Anzahl der Tokens im Text (mit Cache)."""
+    return token_counter.count_tokens(text)
+
+
+def _token_positions(pattern, text, offsets):
+    """
+    Trennstellen an den Treffern des Musters als {Schnitt: Beginn des nächsten Teilstücks} (Token-Indizes).
+
+    Geschnitten wird vor dem Token, mit dem der Treffer beginnt; das nächste Teilstück beginnt
+    mit dem Token, das das letzte Zeichen des Treffers enthält, da der Tokenizer Leerzeichen dem
+    folgenden Wort voranstellt (" 2003"). So landet ein Trenner in keinem der beiden Teilstücke.
+    """
+    return {bisect_left(offsets, match.start()): bisect_left(offsets, match.end() - 1)
+            for match in pattern.finditer(text)}
+
+
+def _last_break(positions, lower, upper):
+    """Größte Trennstelle im Intervall (lower, upper] oder None."""
+    idx = bisect_left(positions, upper + 1) - 1
+    if idx >= 0 and positions[idx] > lower:
+        return positions[idx]
+    return None
+
+
+def split_by_tokens(text, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS, tokens=None):
+    """
+    Teilt einen Text in Stücke mit höchstens max_tokens Tokens.
+
+    Der Text wird einmal encodiert (oder die übergebenen Tokens werden verwendet).
+    Geschnitten wird an Token-Grenzen, bevorzugt an Eintragstrennern (" | "), dann an
+    Satzenden und sonst an Wortgrenzen. Die Teilstücke werden per Zeichen-Offset aus dem
+    Originaltext geschnitten und je einmal nachgezählt, da ein Teilstück an der Schnittstelle
+    anders tokenisiert werden kann; überschreitet es max_tokens, wird um den gemessenen Überhang
+    früher geschnitten (ohne erneutes Encodieren, die Tokenanzahl ist dann geschätzt).
+
+    :param overlap: Anzahl der Tokens, die ein Teilstück mit dem vorherigen teilt
+                    (nicht bei Schnitten an Eintragstrennern).
+    :param tokens: Bereits berechnete Tokens des Textes.
+    :return: Liste von Tupeln (Teilstück, Tokenanzahl des Teilstücks).
+    """
+    # OpenAI Tokenizer für GPT-3.5/4 (gemeinsam mit dem Token-Cache, erst bei Bedarf geladen)
+    counter = token_counter.get_counter()
+    encoding = counter.encoding
+    if tokens is None:
+        tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return [(text, len(tokens))]
+
+    text, offsets = encoding.decode_with_offsets(tokens)
+    n = len(tokens)
+    overlap = max(0, min(overlap, max_tokens // 2))
+    min_window = max_tokens // 2  # Teilstücke sollen mindestens halb gefüllt sein
+
+    entry_resume = _token_positions(ENTRY_SEPARATOR_REGEX, text, offsets)
+    entry_breaks = sorted(entry_resume)
+    sentence_breaks = sorted(_token_positions(SENTENCE_END_REGEX, text, offsets))
+    # Tokens, die mit einem Leerzeichen beginnen, markieren eine Wortgrenze
+    word_breaks = [i for i, offset in enumerate(offsets) if offset < len(text) and text[offset].isspace()]
+
+    parts = []
+    start = 0
+    while start < n:
+        end = min(start + max_tokens, n)
+        at_entry = False
+        if end < n:
+            for positions in (entry_breaks, sentence_breaks, word_breaks):
+                cut = _last_break(positions, start + min_window, end)
+                if cut is not None:
+                    end = cut
+                    at_entry = positions is entry_breaks
+                    break
+
+        part = text[offsets[start]:offsets[end] if end < n else len(text)].strip()
+        part_tokens = counter.count(part) if part else 0
+        if part_tokens > max_tokens and end - start > 1:
+            # Um den gemessenen Überhang früher schneiden, ohne das Teilstück erneut zu encodieren
+            kuerzer = max(start + 1, end - (part_tokens - max_tokens))
+            part_tokens -= end - kuerzer
+            end, at_entry = kuerzer, False
+            part = text[offsets[start]:offsets[end]].strip()
+        if part:
+            parts.append((part, part_tokens))
+        if end >= n:
+            break
+
+        # Nächstes Teilstück mit Überlappung beginnen, möglichst an einer Wortgrenze.
+        # Nach einem Eintragstrenner ist keine Überlappung nötig.
+        next_start = entry_resume[end] if at_entry else end - overlap
+        if overlap and not at_entry:
+            snapped = bisect_left(word_breaks, next_start)
+            if snapped < len(word_breaks) and word_breaks[snapped] < end:
+                next_start = word_breaks[snapped]
+        start = next_start if next_start > start else end
+
+    return parts
+
 
 def extract_autility_id(profile_data):
     """Extrahiert die autilityId aus den Chunks."""
@@ -33,78 +137,303 @@ def extract_autility_id(profile_data):
             return chunk.get("content", "unknown")
     return "unknown"
 
-def process_chunks():
+def assign_chunk_ids(profile_id, chunks):
+    """
+    Vergibt inhaltsbasierte IDs der Form {profile_id}_{type}_{hash}.
+
+    Die ID hängt nur vom Inhalt ab, nicht von der Position; eine Änderung an einem
+    Eintrag verschiebt daher nicht die IDs der übrigen Chunks. Gleiche Inhalte
+    innerhalb eines Profils erhalten in ihrer Reihenfolge die Endungen _2, _3, ...
+    """
+    seen = {}
+    for chunk in chunks:
+        digest = hashlib.blake2b(chunk.content.encode("utf-8"), digest_size=16).hexdigest()
+        chunk_id = f"{profile_id}_{chunk.type}_{digest[:ID_HASH_LENGTH]}"
+        seen[chunk_id] = seen.get(chunk_id, 0) + 1
+        chunk.id = chunk_id if seen[chunk_id] == 1 else f"{chunk_id}_{seen[chunk_id]}"
+    return chunks
+
+
+def merge_chunks(chunks):
+    """
+    Früheres Verfahren: fasst die MERGE_SECTIONS zusammen und verwirft übrige Chunks unter MIN_TOKENS.
+
+    :return: Tupel (Metadaten, Chunks ohne ID).
+    """
+    optimized_chunks = []
+    metadata = {}
+    merged_sections = {}
+
+    # Tokens nur für Chunks zählen, die gegen MIN_TOKENS geprüft werden, gesammelt in einem Batch
+    counted = [chunk.content for chunk in chunks
+               if chunk.type not in METADATA_FIELDS and chunk.type not in MERGE_SECTIONS]
+    token_counts = iter(token_counter.count_tokens_batch(counted))
+
+    # Zunächst Metadaten sammeln
+    for chunk in chunks:
+        chunk_type = chunk.type
+        content = chunk.content
+
+        if chunk_type in METADATA_FIELDS:
+            metadata[chunk_type] = content  # Speichere als Metadaten
+        elif chunk_type in MERGE_SECTIONS:
+            if chunk_type not in merged_sections:
+                merged_sections[chunk_type] = []
+            merged_sections[chunk_type].append(content)
+        else:
+            # Normale Chunks behalten, falls sie groß genug sind
+            if next(token_counts) >= MIN_TOKENS:
+                optimized_chunks.append(Chunk(chunk_type, content))
+
+    # Merged Sections zusammenfügen
+    for section, contents in merged_sections.items():
+        merged_content = " | ".join(contents)  # Trenner für Zusammenfassung
+        # Tokenanzahl aus dem Cache; nur bei einem Fehltreffer einmal encodieren
+        counter = token_counter.get_counter()
+        tokens = None
+        token_count = counter.peek(merged_content)
+        if token_count is None:
+            tokens = counter.encode(merged_content)
+            token_count = len(tokens)
+
+        # Falls Chunk zu groß ist, an Token-Grenzen aufteilen
+        if token_count > MAX_TOKENS:
+            parts = split_by_tokens(merged_content, MAX_TOKENS, OVERLAP_TOKENS, tokens=tokens)
+            optimized_chunks.extend(Chunk(section, part) for part, _ in parts)
+        else:
+            optimized_chunks.append(Chunk(section, merged_content))
+
+    return metadata, optimized_chunks
+
+
+def _entry_text(chunk):
+    """Text eines Eintrags; bei Zertifikaten mit Name und Datum, die sonst nur als Felder vorliegen."""
+    content = chunk.content
+    if chunk.type in (CERTIFICATES, "certifications"):
+        name = chunk.name or ""
+        date = chunk.date or ""
+        label = f"{name} ({date})" if name and date and date != "N/A" else name
+        return f"{label}, {content}" if label else content
+    return content
+
+
+def _pack(items, budget):
+    """
+    Packt (Eintrag, Tokens)-Paare der Reihe nach in Gruppen mit höchstens budget Tokens.
+
+    Die Reihenfolge (z.B. chronologisch) bleibt erhalten; ein Eintrag über dem Budget bildet eine eigene Gruppe.
+
+    :return: Liste von Tupeln (Einträge der Gruppe, geschätzte Tokens).
+    """
+    groups = []
+    current, used = [], 0
+    for text, tokens in items:
+        cost = tokens + SEPARATOR_TOKENS if current else tokens
+        if current and used + cost > budget:
+            groups.append((current, used))
+            current, used, cost = [], 0, tokens
+        current.append(text)
+        used += cost
+    if current:
+        groups.append((current, used))
+    return groups
+
+
+def pack_chunks(chunks):
+    """
+    Packt die Einträge jedes Abschnitts der Reihe nach in möglichst volle Chunks bis MAX_TOKENS.
+
+    Jeder Chunk beginnt mit dem Namen des Consultants, jede Zeile mit der Überschrift
+    ihres Abschnitts ("Weiterbildungen: A | B"). Einträge über dem Budget werden mit
+    split_by_tokens geteilt. Abschnitte, die insgesamt unter MIN_TOKENS bleiben, werden
+    pro Profil zu Chunks vom Typ COMBINED_TYPE zusammengefasst statt verworfen.
+
+    :return: Tupel (Metadaten, Chunks ohne ID).
+    """
+    metadata = {}
+    sections = {}
+    name = ""
+    for chunk in chunks:
+        chunk_type = chunk.type
+        if chunk_type in METADATA_FIELDS:
+            metadata[chunk_type] = chunk.content
+            continue
+        name = name or chunk.source or ""
+        text = _entry_text(chunk).strip()
+        if text:
+            sections.setdefault(chunk_type, []).append(text)
+    name = metadata.get("fullName") or name
+    header = f"{name}\n" if name else ""
+
+    prefixes = {section: f"{SECTION_TITLES.get(section, section)}: " for section in sections}
+    texts = [header] + list(prefixes.values()) + [text for entries in sections.values() for text in entries]
+    counts = iter(token_counter.count_tokens_batch(texts))
+    header_tokens = next(counts)
+    prefix_tokens = {section: next(counts) for section in prefixes}
+
+    # Pro Abschnitt packen: (Abschnitt, Zeile, geschätzte Tokens der Zeile)
+    lines = []
+    for section, entries in sections.items():
+        budget = MAX_TOKENS - header_tokens - prefix_tokens[section]
+        items = []
+        for text in entries:
+            tokens = next(counts)
+            if tokens > budget:
+                # Die Teilstücke bringen ihre Tokenanzahl mit, sie werden nicht erneut gezählt
+                items.extend(split_by_tokens(text, budget, OVERLAP_TOKENS))
+            else:
+                items.append((text, tokens))
+        for group, tokens in _pack(items, budget):
+            lines.append((section, prefixes[section] + ENTRY_SEPARATOR.join(group), prefix_tokens[section] + tokens))
+
+    packed = [(section, [line]) for section, line, tokens in lines if tokens >= MIN_TOKENS]
+    # Kleine Abschnitte eines Profils gemeinsam packen
+    small = [((section, line), tokens) for section, line, tokens in lines if tokens < MIN_TOKENS]
+    for group, _ in _pack(small, MAX_TOKENS - header_tokens):
+        types = {section for section, _ in group}
+        packed.append((types.pop() if len(types) == 1 else COMBINED_TYPE, [line for _, line in group]))
+
+    optimized_chunks = []
+    contents = [header + "\n".join(group) for _, group in packed]
+    for (chunk_type, _), content, tokens in zip(packed, contents, token_counter.count_tokens_batch(contents)):
+        # Die Schätzung über Einzelzählungen kann knapp danebenliegen
+        parts = split_by_tokens(content, MAX_TOKENS, OVERLAP_TOKENS) if tokens > MAX_TOKENS else [(content, tokens)]
+        optimized_chunks.extend(Chunk(chunk_type, part) for part, _ in parts)
+    return metadata, optimized_chunks
+
+
+def optimize_chunks(chunks, profile_id, strategy=CHUNKING_STRATEGY):
+    """
+    Teilt die Chunks eines Profils in Metadaten und optimierte Chunks auf (ohne Dateizugriff).
+
+    :param strategy: "pack" (pack_chunks) oder "merge" (merge_chunks).
+    :return: Tupel (Metadaten, optimierte Chunks).
+    """
+    if strategy not in CHUNKING_STRATEGIES:
+        raise ValueError(f"Unbekanntes Chunking-Verfahren '{strategy}', erlaubt sind: {', '.join(CHUNKING_STRATEGIES)}")
+    metadata, optimized_chunks = pack_chunks(chunks) if strategy == "pack" else merge_chunks(chunks)
+    return metadata, assign_chunk_ids(profile_id, optimized_chunks)
+
+
+def write_optimized_chunks(filename, metadata, optimized_chunks, output_dir=OUTPUT_DIR):
+    """Speichern der optimierten Daten."""
+    output_file = os.path.join(output_dir, filename)
+    with open(output_file, "w", encoding="utf-8") as outfile:
+        json.dump({"metadata": metadata, "chunks": chunk_dicts(optimized_chunks)}, outfile, indent=4, ensure_ascii=False)
+
+    instrumentation.melde(f"Optimierte Chunks gespeichert unter: {output_file}")
+    return output_file
+
+
+def optimize_profile_chunks(file_path, output_dir=OUTPUT_DIR, strategy=CHUNKING_STRATEGY):
+    """Optimiert die Chunks eines Profils und gibt den Pfad der erzeugten Datei zurück."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        profile_data = json.load(file)
+
+    # Profil-ID aus den Chunks extrahieren
+    profile_id = extract_autility_id(profile_data)
+    chunks = [Chunk.from_dict(chunk) for chunk in profile_data.get("chunks", [])]
+    metadata, optimized_chunks = optimize_chunks(chunks, profile_id, strategy)
+    return write_optimized_chunks(os.path.basename(file_path), metadata, optimized_chunks, output_dir)
+
+
+def iter_merged_profiles(profile_dir=profile_chunks.PROFILE_PATH):
+    """Liest die Profile aus Merged nacheinander ein: (Dateipfad, Profil)."""
+    for filename in sorted(os.listdir(profile_dir)):
+        if filename.endswith(".json"):
+            file_path = os.path.join(profile_dir, filename)
+            with open(file_path, "r", encoding="utf-8") as file:
+                yield file_path, json.load(file)
+
+
+def iter_optimized_profiles(profiles, debug_dir=None, strategy=CHUNKING_STRATEGY):
+    """
+    Erzeugt aus geladenen Profilen direkt die optimierten Chunks im Speicher.
+
+    Die Zwischenergebnisse aus profile_chunks werden nur geschrieben, wenn debug_dir gesetzt ist.
+
+    :param profiles: Iterable von (Dateipfad, Profil als Dictionary oder Profile), z.B. aus iter_merged_profiles.
+    :param strategy: Chunking-Verfahren (siehe optimize_chunks).
+    :return: Generator von (Profil-ID, Metadaten, optimierte Chunks als model.Chunk).
+    """
+    for _, profile in profiles:
+        if not isinstance(profile, Profile):
+            profile = Profile.from_dict(profile)
+        chunks = profile_chunks.build_chunks(profile)
+        if debug_dir:
+            profile_chunks.write_profile_chunks(profile, chunks, debug_dir)
+        # Die autilityId liegt direkt im Profil vor, eine Suche in den Chunks ist nicht nötig
+        profile_id = profile.profile_id
+        metadata, optimized_chunks = optimize_chunks(chunks, profile_id, strategy)
+        instrumentation.zaehle("chunks", len(optimized_chunks))
+        yield profile_id, metadata, optimized_chunks
+
+
+def optimize_profile(file_path, output_dir=OUTPUT_DIR, debug_dir=None):
+    """Erzeugt für ein Merged-Profil direkt die optimierten Chunks und gibt den Ausgabepfad zurück."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        profile = json.load(file)
+    profile_id, metadata, optimized_chunks = next(iter_optimized_profiles([(file_path, profile)], debug_dir))
+    return write_optimized_chunks(f"profile_{profile_id}.json", metadata, optimized_chunks, output_dir)
+
+
+def stream_chunks(profile_dir=profile_chunks.PROFILE_PATH, output_dir=OUTPUT_DIR, debug=False,
+                  debug_dir=profile_chunks.OUTPUT_PATH, output_format="json", strategy=CHUNKING_STRATEGY):
+    """
+    Verarbeitet alle Merged-Profile in einem Durchlauf zu optimierten Chunks,
+    ohne die Zwischenergebnisse in Profile_Chunks zu schreiben und erneut einzulesen.
+
+    :param debug: Zwischenergebnisse zusätzlich in debug_dir schreiben.
+    :param output_format: "json" (eine Datei pro Profil in output_dir) oder "jsonl"/"binary"
+                          (ein Chunk-Store, output_dir ist dann der Pfad der Store-Datei).
+    :param strategy: Chunking-Verfahren (siehe optimize_chunks).
+    """
+    if debug:
+        os.makedirs(debug_dir, exist_ok=True)
+    profiles = iter_merged_profiles(profile_dir)
+    optimized = iter_optimized_profiles(profiles, debug_dir if debug else None, strategy)
+
+    if output_format == "json":
+        os.makedirs(output_dir, exist_ok=True)
+        for profile_id, metadata, optimized_chunks in optimized:
+            write_optimized_chunks(f"profile_{profile_id}.json", metadata, optimized_chunks, output_dir)
+        return
+
+    with chunk_store.ChunkStoreWriter(output_dir, output_format) as writer:
+        for profile_id, metadata, optimized_chunks in optimized:
+            writer.write_profile(profile_id, metadata, chunk_dicts(optimized_chunks))
+    print(f"Chunk-Store gespeichert unter: {output_dir}")
+
+
+def process_chunks(profile_chunks_dir=PROFILE_CHUNKS_DIR, output_dir=OUTPUT_DIR, strategy=CHUNKING_STRATEGY):
     """Optimiert die Chunking-Strategie durch Zusammenfassung und Metadatenverwaltung."""
-    for filename in os.listdir(PROFILE_CHUNKS_DIR):
+    # Sicherstellen, dass der Ausgabeordner existiert
+    os.makedirs(output_dir, exist_ok=True)
+
+    for filename in os.listdir(profile_chunks_dir):
         if filename.endswith(".json"):
-            with open(os.path.join(PROFILE_CHUNKS_DIR, filename), "r", encoding="utf-8") as file:
-                profile_data = json.load(file)
-                chunks = profile_data.get("chunks", [])
-
-                optimized_chunks = []
-                metadata = {}
-                merged_sections = {}
-                chunk_counters = {}  # Speichert Zähler für jede "type"-Kategorie
-
-                # Profil-ID aus den Chunks extrahieren
-                profile_id = extract_autility_id(profile_data)
-
-                # Zunächst Metadaten sammeln
-                for chunk in chunks:
-                    chunk_type = chunk.get("type", "unknown")
-                    content = chunk.get("content", "")
-                    token_count = count_tokens(content)
-
-                    if chunk_type in metadata_fields:
-                        metadata[chunk_type] = content  # Speichere als Metadaten
-                    elif chunk_type in merge_sections:
-                        if chunk_type not in merged_sections:
-                            merged_sections[chunk_type] = []
-                        merged_sections[chunk_type].append(content)
-                    else:
-                        # Falls eine Kategorie noch keinen Zähler hat, initialisieren wir ihn
-                        if chunk_type not in chunk_counters:
-                            chunk_counters[chunk_type] = 1
-
-                        # Normale Chunks behalten, falls sie groß genug sind
-                        if token_count >= MIN_TOKENS:
-                            chunk_id = f"{profile_id}_{chunk_type}_{chunk_counters[chunk_type]}"
-                            optimized_chunks.append({
-                                "id": chunk_id,
-                                "type": chunk_type,
-                                "content": content
-                            })
-                            chunk_counters[chunk_type] += 1  # Inkrementiere Zähler
-
-                # Merged Sections zusammenfügen
-                for section, contents in merged_sections.items():
-                    merged_content = " | ".join(contents)  # Trenner für Zusammenfassung
-                    token_count = count_tokens(merged_content)
-
-                    # Falls Chunk zu groß ist, aufteilen
-                    if token_count > MAX_TOKENS:
-                        parts = [merged_content[i:i+MAX_TOKENS] for i in range(0, len(merged_content), MAX_TOKENS)]
-                        for idx, part in enumerate(parts, start=1):
-                            chunk_id = f"{profile_id}_{section}_{idx}"
-                            optimized_chunks.append({
-                                "id": chunk_id,
-                                "type": section,
-                                "content": part
-                            })
-                    else:
-                        chunk_id = f"{profile_id}_{section}_1"
-                        optimized_chunks.append({
-                            "id": chunk_id,
-                            "type": section,
-                            "content": merged_content
-                        })
-
-                # Speichern der optimierten Daten
-                output_file = os.path.join(OUTPUT_DIR, filename)
-                with open(output_file, "w", encoding="utf-8") as outfile:
-                    json.dump({"metadata": metadata, "chunks": optimized_chunks}, outfile, indent=4, ensure_ascii=False)
-
-                print(f"Optimierte Chunks gespeichert unter: {output_file}")
-
-# Starte den Prozess
-process_chunks()
+            optimize_profile_chunks(os.path.join(profile_chunks_dir, filename), output_dir, strategy)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunks optimieren")
+    parser.add_argument("--stream", action="store_true",
+                        help="Direkt aus Merged verarbeiten, ohne Profile_Chunks zu lesen")
+    parser.add_argument("--debug", action="store_true",
+                        help="Im Stream-Modus die Zwischenergebnisse in Profile_Chunks schreiben")
+    parser.add_argument("--format", choices=("json",) + chunk_store.FORMATS, default="json",
+                        help="Ausgabeformat im Stream-Modus: JSON-Dateien oder ein Chunk-Store")
+    parser.add_argument("--strategy", choices=CHUNKING_STRATEGIES, default=CHUNKING_STRATEGY,
+                        help="pack: Einträge bis MAX_TOKENS packen, merge: früheres Verfahren")
+    args = parser.parse_args(argv)
+
+    # Starte den Prozess
+    if args.stream:
+        output = OUTPUT_DIR if args.format == "json" else chunk_store.STORE_FILES[args.format]
+        stream_chunks(output_dir=output, debug=args.debug, output_format=args.format, strategy=args.strategy)
+    else:
+        process_chunks(strategy=args.strategy)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,132 @@
+import argparse
 import os
 import re
 import json
+from functools import lru_cache
 
+from instrumentation import melde
 
-def abschnitte_analysieren(text, bekannte_abschnitte):
+# Bekannte Abschnittsnamen in den Text-Profilen
+BEKANNTE_ABSCHNITTE = [
+    "auticon Projekte", "Studium Projekte", "Projekte", "Ausbildung", "Beruflicher Werdegang",
+    "Studium", "Weiterbildung", "Engagement", "Private Projekte", "Weitere Projekte",
+    "auticon Weiterbildungen"
+]
+
+# Datumsformat am Zeilenanfang, z.B. "Seit 01/2020", "2019 - aktuell"
+DATUM_REGEX = re.compile(
+    r"(?:(Seit|seit|Ab|ab)\s+)?(\d{2}/\d{4}|\d{4})(?:\s*[-–]\s*(\d{2}/\d{4}|\d{4}|aktuell))?\s*(.*)",
+    re.IGNORECASE
+)
+
+# Dateien wie John_Doe_1.txt
+DATEINAMEN_REGEX = re.compile(r"^([A-Za-z]+_[A-Za-z]+)_[0-9]+\.txt$")
+
+# Mapping der deutschen Abschnittsnamen zu englischen Bezeichnungen
+ABSCHNITT_MAPPING = {
+    "auticon Projekte": "auticonProjects",
+    "Studium Projekte": "studyProjects",
+    "Projekte": "projects",
+    "Ausbildung": "education",
+    "Beruflicher Werdegang": "professionalExperience",
+    "Studium": "studies",
+    "Weiterbildung": "training",
+    "Engagement": "engagements",
+    "Private Projekte": "privateProjects",
+    "Weitere Projekte": "furtherProjects",
+    "auticon Weiterbildungen": "auticonTraining",
+    "Zertifikate": "certificates",
+    "Zertifizierungen": "certifications",
+}
+
+
+@lru_cache(maxsize=16)
+def kompiliere_abschnittsmuster(bekannte_abschnitte):
     """
-    Erkennt Abschnitte und deren Inhalte basierend auf bekannten Abschnittsnamen.
+    Kompiliert das Muster für Abschnittsüberschriften einmalig pro Abschnittsliste.
+
+    :param bekannte_abschnitte: Tupel der Abschnittsnamen.
     """
-    abschnittsmuster = re.compile(
+    return re.compile(
         r"^(" + "|".join(re.escape(abschnitt) for abschnitt in bekannte_abschnitte) + r")\b",
         re.IGNORECASE | re.MULTILINE
     )
 
+
+# Einmalig kompiliert für die Standard-Abschnitte
+ABSCHNITTSMUSTER = kompiliere_abschnittsmuster(tuple(BEKANNTE_ABSCHNITTE))
+
+
+def _eintraege_aus_bereich(text, start, ende):
+    """
+    Bildet die datierten Einträge für den Abschnitt text[start:ende].
+
+    :return: Liste der Einträge oder None, wenn der Abschnitt leer ist.
+    """
+    zeilen = [zeile for zeile in map(str.strip, text[start:ende].split("\n")) if zeile]
+    if not zeilen:
+        return None
+
+    datum_match = DATUM_REGEX.match
+    eintraege = []
+    teile = None  # Beschreibungsteile des aktuellen Eintrags
+    for zeile in zeilen:
+        datum = datum_match(zeile)
+        if datum:
+            if teile is not None:
+                eintraege[-1]["description"] = " ".join(teile)
+            teile = [datum.group(4).strip()]
+            eintraege.append({
+                "startDate": f"{datum.group(1) or ''} {datum.group(2)}".strip(),
+                "endDate": datum.group(3),
+                "description": None,
+            })
+        elif teile is not None:
+            # Zeile gehört zum vorherigen Eintrag (Fließtext)
+            teile.append(zeile)
+    if teile is not None:
+        eintraege[-1]["description"] = " ".join(teile)
+    return eintraege
+
+
+def analysiere_profil(text, bekannte_abschnitte=BEKANNTE_ABSCHNITTE):
+    """
+    Zerlegt einen Profiltext in einem Durchlauf in Abschnitte und datierte Einträge.
+
+    Liefert dasselbe Ergebnis wie abschnitte_analysieren und abschnitte_zu_json
+    nacheinander, ohne die Abschnittsinhalte als Zwischenstrings aufzubauen: Die
+    Überschriften werden mit dem vorkompilierten Muster in einem Scan gefunden und
+    jeder Abschnitt direkt aus seinem Textbereich in Einträge zerlegt.
+
+    :return: Tupel (gefundene Abschnittsnamen, JSON-Daten).
+    """
+    if bekannte_abschnitte is BEKANNTE_ABSCHNITTE:
+        muster = ABSCHNITTSMUSTER
+    else:
+        muster = kompiliere_abschnittsmuster(tuple(bekannte_abschnitte))
+
+    # Nur die Bereiche merken; eine wiederholte Überschrift ersetzt den Bereich,
+    # behält aber ihre erste Position, daher wird jeder Abschnitt nur einmal zerlegt
+    bereiche = {}
+    matches = list(muster.finditer(text))
+    for i, match in enumerate(matches):
+        ende = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        bereiche[match.group(1).strip()] = (match.end(), ende)
+
+    json_daten = {}
+    for abschnitt, (start, ende) in bereiche.items():
+        eintraege = _eintraege_aus_bereich(text, start, ende)
+        if eintraege is not None:
+            json_daten[ABSCHNITT_MAPPING.get(abschnitt, abschnitt)] = eintraege
+    return list(bereiche), json_daten
+
+
+def abschnitte_analysieren(text, bekannte_abschnitte):
+    """
+    Erkennt Abschnitte und deren Inhalte basierend auf bekannten Abschnittsnamen.
+    """
+    abschnittsmuster = kompiliere_abschnittsmuster(tuple(bekannte_abschnitte))
+
     abschnitte = {}
     matches = list(abschnittsmuster.finditer(text))
     for i, match in enumerate(matches):
@@ -28,35 +143,34 @@ def extrahiere_daten_mit_regex(abschnitt_inhalt):
     """
     Extrahiert Unterabschnitte aus dem Abschnittsinhalt basierend auf Datumsformaten.
     """
-    date_regex = re.compile(
-        r"(?:(Seit|seit|Ab|ab)\s+)?(\d{2}/\d{4}|\d{4})(?:\s*[-–]\s*(\d{2}/\d{4}|\d{4}|aktuell))?\s*(.*)",
-        re.IGNORECASE
-    )
     eintraege = []
     zeilen = abschnitt_inhalt.split("\n")
     aktueller_eintrag = None
+    teile = []
 
     for zeile in zeilen:
         zeile = zeile.strip()
         if not zeile:
             continue  # Überspringe leere Zeilen
-        match = date_regex.match(zeile)
+        match = DATUM_REGEX.match(zeile)
         if match:
             # Neuer Eintrag beginnt
             if aktueller_eintrag:
+                aktueller_eintrag["description"] = " ".join(teile)
                 eintraege.append(aktueller_eintrag)
+            teile = [match.group(4).strip()]
             aktueller_eintrag = {
                 "startDate": f"{match.group(1) or ''} {match.group(2)}".strip(),
                 "endDate": match.group(3),
-                "description": match.group(4).strip()
             }
         else:
             # Zeile gehört zum vorherigen Eintrag (Fließtext)
             if aktueller_eintrag:
-                aktueller_eintrag["description"] += f" {zeile}"
+                teile.append(zeile)
 
     # Füge den letzten Eintrag hinzu
     if aktueller_eintrag:
+        aktueller_eintrag["description"] = " ".join(teile)
         eintraege.append(aktueller_eintrag)
 
     return eintraege
@@ -66,27 +180,10 @@ def abschnitte_zu_json(abschnitte):
     """
     Transformiert Abschnitte in JSON-kompatibles Format und übersetzt die Abschnittsnamen ins Englische.
     """
-    # Mapping der deutschen Abschnittsnamen zu englischen Bezeichnungen
-    mapping = {
-        "auticon Projekte": "auticonProjects",
-        "Studium Projekte": "studyProjects",
-        "Projekte": "projects",
-        "Ausbildung": "education",
-        "Beruflicher Werdegang": "professionalExperience",
-        "Studium": "studies",
-        "Weiterbildung": "training",
-        "Engagement": "engagements",
-        "Private Projekte": "privateProjects",
-        "Weitere Projekte": "furtherProjects",
-        "auticon Weiterbildungen": "auticonTraining",
-        "Zertifikate": "certificates",
-        "Zertifizierungen": "certifications",
-    }
-
     json_daten = {}
     for abschnitt, inhalt in abschnitte.items():
         # Übersetze Abschnittsnamen ins Englische
-        englischer_abschnitt = mapping.get(abschnitt, abschnitt)
+        englischer_abschnitt = ABSCHNITT_MAPPING.get(abschnitt, abschnitt)
         if inhalt:
             json_daten[englischer_abschnitt] = extrahiere_daten_mit_regex(inhalt)
     return json_daten
@@ -96,28 +193,28 @@ def zeige_abschnitte_im_terminal(abschnitte, dateiname):
     """
     Zeigt die gefundenen Abschnitte im Terminal an.
     """
-    print(f"\nGefundene Abschnitte in {dateiname}:")
-    for abschnitt, inhalt in abschnitte.items():
-        print(f"- {abschnitt}")
-    print("\n")
+    melde(f"\nGefundene Abschnitte in {dateiname}:")
+    for abschnitt in abschnitte:
+        melde(f"- {abschnitt}")
+    melde("\n")
 
 
 def textdateien_verarbeiten(dateipfade, ziel_datei_pfad, json_pfad, bekannte_abschnitte):
     """
     Liest Textdateien, analysiert Abschnitte und speichert das Ergebnis als JSON.
     """
-    gesamter_text = ""
+    teile = []
     for datei_pfad in dateipfade:
         with open(datei_pfad, 'r', encoding='utf-8') as datei:
-            gesamter_text += datei.read() + "\n\n"
+            teile.append(datei.read())
+            teile.append("\n\n")
+    gesamter_text = "".join(teile)
 
-    abschnitte = abschnitte_analysieren(gesamter_text, bekannte_abschnitte)
+    abschnitte, json_daten = analysiere_profil(gesamter_text, bekannte_abschnitte)
 
     # Zeige die gefundenen Abschnitte im Terminal an
     zeige_abschnitte_im_terminal(abschnitte, os.path.basename(ziel_datei_pfad))
 
-    json_daten = abschnitte_zu_json(abschnitte)
-
     with open(ziel_datei_pfad, 'w', encoding='utf-8') as ziel_datei:
         ziel_datei.write(gesamter_text.strip())
 
@@ -125,26 +222,18 @@ def textdateien_verarbeiten(dateipfade, ziel_datei_pfad, json_pfad, bekannte_abs
         json.dump(json_daten, json_datei, indent=4, ensure_ascii=False)
 
 
-def verarbeite_alle_consultants(chunked_verzeichnis):
-    """
-    Verarbeitet alle Consultant-Profile im Verzeichnis 'Chunked'.
+def finde_consultants(chunked_verzeichnis):
     """
-    bekannte_abschnitte = [
-        "auticon Projekte", "Studium Projekte", "Projekte", "Ausbildung", "Beruflicher Werdegang",
-        "Studium", "Weiterbildung", "Engagement", "Private Projekte", "Weitere Projekte",
-        "auticon Weiterbildungen"
-    ]
-
-    if not os.path.exists(chunked_verzeichnis):
-        print(f"Der Ordner '{chunked_verzeichnis}' wurde nicht gefunden.")
-        os.makedirs(chunked_verzeichnis, exist_ok=True)
+    Gruppiert die Textdateien im Verzeichnis 'Chunked' nach Consultant.
 
+    :return: Dictionary {Name: [Dateipfade]} in sortierter Reihenfolge.
+    """
     dateien = sorted([f for f in os.listdir(chunked_verzeichnis) if f.endswith('.txt')])
     consultants = {}
 
     # Suche nach Eingabedateien mit passendem Muster
     for datei in dateien:
-        match = re.match(r"^([A-Za-z]+_[A-Za-z]+)_[0-9]+\.txt$", datei)  # Dateien wie John_Doe_1.txt
+        match = DATEINAMEN_REGEX.match(datei)  # Dateien wie John_Doe_1.txt
         if not match:
             continue
         name = match.group(1)  # Extrahiere 'John_Doe'
@@ -152,12 +241,31 @@ def verarbeite_alle_consultants(chunked_verzeichnis):
             consultants[name] = []
         consultants[name].append(os.path.join(chunked_verzeichnis, datei))
 
+    return consultants
+
+
+def verarbeite_alle_consultants(chunked_verzeichnis):
+    """
+    Verarbeitet alle Consultant-Profile im Verzeichnis 'Chunked'.
+    """
+    if not os.path.exists(chunked_verzeichnis):
+        print(f"Der Ordner '{chunked_verzeichnis}' wurde nicht gefunden.")
+        os.makedirs(chunked_verzeichnis, exist_ok=True)
+
+    consultants = finde_consultants(chunked_verzeichnis)
+
     # Verarbeitung der Consultants
     for name, files in consultants.items():
         ziel_datei_pfad = os.path.join(chunked_verzeichnis, f"{name}_zusammengefasst.txt")
         json_pfad = os.path.join(chunked_verzeichnis, f"{name}.json")
-        textdateien_verarbeiten(files, ziel_datei_pfad, json_pfad, bekannte_abschnitte)
+        textdateien_verarbeiten(files, ziel_datei_pfad, json_pfad, BEKANNTE_ABSCHNITTE)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Text-Profile aus Chunked zusammenfassen und als JSON speichern")
+    parser.add_argument("--input", default=os.path.join(os.getcwd(), "Chunked"), help="Ordner mit den Text-Profilen")
+    args = parser.parse_args(argv)
+    verarbeite_alle_consultants(args.input)
+
 
 if __name__ == "__main__":
-    chunked_verzeichnis = os.path.join(os.getcwd(), "Chunked")
-    verarbeite_alle_consultants(chunked_verzeichnis)
+    main()
@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+
+import bm25_index
+import embeddings
+import metadata_index
+from chunk_store import store_signature
+from umlauts import normalisiere
+
+# Eingabeordner bzw. Chunk-Store und Indexordner (wie in vector_index.py und bm25_index.py)
+OPTIMIZED_CHUNKS_DIR = embeddings.INPUT_DIR
+VECTOR_INDEX_DIR = "Vector_Index"
+VECTOR_META_FILE = "index_meta.json"  # vector_index.META_FILE (vector_index wird erst bei Bedarf mit faiss importiert)
+BM25_INDEX_DIR = bm25_index.INDEX_DIR
+MERGED_DIR = metadata_index.MERGED_DIR
+
+EMBEDDING_CACHE_SIZE = 1024  # Gecachte Anfragevektoren (hängen nur vom Modell ab)
+RESULT_CACHE_SIZE = 512      # Gecachte Ergebnislisten
+RESULT_TTL_SECONDS = 300     # Lebensdauer eines gecachten Ergebnisses
+VERSION_CHECK_SECONDS = 1.0  # Höchstens so oft wird der Datenstand auf Änderungen geprüft
+
+# Satzzeichen, die für die Anfrage keine Rolle spielen ("Python, Berlin!" = "Python Berlin")
+_SATZZEICHEN_REGEX = re.compile(r"[,;:!?\"'()]")
+
+
+def normalisiere_anfrage(text):
+    """Schlüssel für Anfragen: Umlaute ersetzen, Kleinschreibung, Satzzeichen und doppelten Leerraum entfernen."""
+    return normalisiere(_SATZZEICHEN_REGEX.sub(" ", text))
+
+
+class LRUCache:
+    """
+    Begrenzter LRU-Cache mit optionaler Lebensdauer der Einträge und Trefferstatistik.
+
+    :param max_size: Maximale Anzahl Einträge, danach wird der am längsten unbenutzte verdrängt.
+    :param ttl: Lebensdauer in Sekunden (None = unbegrenzt).
+    :param clock: Zeitquelle (für Tests austauschbar).
+    """
+
+    def __init__(self, max_size, ttl=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # Schlüssel -> (Zeitpunkt, Wert)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Liefert den gecachten Wert oder None."""
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and self.clock() - entry[0] > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value):
+        self._entries[key] = (self.clock(), value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        """Trefferstatistik als Dictionary."""
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class QueryService:
+    """
+    Anfrageschicht vor Vektorindex, BM25-Index und Attributindex.
+
+    Anfragevektoren werden pro normalisierter Anfrage in einem LRU-Cache gehalten,
+    ganze Ergebnislisten in einem LRU-Cache mit Lebensdauer. Ändert sich der Chunk-Store
+    (bzw. Optimized_Chunks), der Ordner Merged oder einer der gespeicherten Indizes, wird
+    der Ergebniscache geleert und die selbst geladenen Indizes werden beim nächsten Zugriff
+    neu geladen.
+    Übergebene Indexobjekte werden nicht neu geladen.
+
+    Die gelieferten Treffer werden zwischen Anfragen geteilt und dürfen nicht verändert werden.
+    """
+
+    def __init__(self, source=OPTIMIZED_CHUNKS_DIR, vector_index_dir=VECTOR_INDEX_DIR, bm25_index_dir=BM25_INDEX_DIR,
+                 merged_dir=MERGED_DIR, model=None, vector_index=None, bm25_index=None, metadata_index=None,
+                 embedding_cache_size=EMBEDDING_CACHE_SIZE, result_cache_size=RESULT_CACHE_SIZE,
+                 result_ttl=RESULT_TTL_SECONDS, version_check_seconds=VERSION_CHECK_SECONDS, clock=time.monotonic):
+        self.source = source
+        self.vector_index_dir = vector_index_dir
+        self.bm25_index_dir = bm25_index_dir
+        self.merged_dir = merged_dir
+        self.model = model
+        self.clock = clock
+        self.version_check_seconds = version_check_seconds
+        self.embedding_cache = LRUCache(embedding_cache_size, clock=clock)
+        self.result_cache = LRUCache(result_cache_size, result_ttl, clock=clock)
+        self.invalidations = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        # Übergebene Indizes bleiben fest, alle anderen werden bei Bedarf (neu) geladen
+        self._fest = {"vector": vector_index, "bm25": bm25_index, "metadata": metadata_index}
+        self._geladen = {}
+        self._signatur = self._aktuelle_signatur()
+        self._letzte_pruefung = clock()
+
+    def _aktuelle_signatur(self):
+        indexdateien = (os.path.join(self.vector_index_dir, VECTOR_META_FILE),
+                        os.path.join(self.bm25_index_dir, bm25_index.META_FILE))
+        stand = []
+        for pfad in indexdateien:
+            try:
+                stat = os.stat(pfad)
+                stand.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                stand.append(None)
+        # Der Attributindex wird aus Merged gebaut und muss bei Änderungen dort ebenfalls neu entstehen
+        return store_signature(self.source), store_signature(self.merged_dir), tuple(stand)
+
+    def pruefe_datenstand(self, erzwingen=False):
+        """
+        Leert den Ergebniscache, wenn sich Chunk-Store, Merged oder Indizes geändert haben.
+
+        :param erzwingen: Sofort prüfen statt höchstens alle version_check_seconds.
+        :return: True, wenn der Cache invalidiert wurde.
+        """
+        jetzt = self.clock()
+        if not erzwingen and jetzt - self._letzte_pruefung < self.version_check_seconds:
+            return False
+        self._letzte_pruefung = jetzt
+        signatur = self._aktuelle_signatur()
+        if signatur == self._signatur:
+            return False
+        self._signatur = signatur
+        self.result_cache.clear()
+        self._geladen.clear()
+        self.invalidations += 1
+        return True
+
+    def _index(self, art):
+        if self._fest[art] is not None:
+            return self._fest[art]
+        if art not in self._geladen:
+            if art == "vector":
+                from vector_index import VectorIndex
+                self._geladen[art] = VectorIndex.load(self.vector_index_dir)
+            elif art == "bm25":
+                self._geladen[art] = bm25_index.BM25Index.load(self.bm25_index_dir)
+            else:
+                self._geladen[art] = metadata_index.baue_metadata_index(self.source, self.merged_dir)
+        return self._geladen[art]
+
+    def anfragevektor(self, text):
+        """Normalisierter Anfragevektor (1 x d), aus dem Cache oder neu berechnet."""
+        schluessel = normalisiere_anfrage(text)
+        vektor = self.embedding_cache.get(schluessel)
+        if vektor is None:
+            if self.model is None:
+                self.model = embeddings.lade_modell()
+            # Encodiert wird der Originaltext: Das Modell wurde auf Text mit Umlauten und Großschreibung
+            # trainiert, die Normalisierung dient nur als Cacheschlüssel
+            vektor = self.model.encode([text], normalize_embeddings=True, convert_to_numpy=True,
+                                       show_progress_bar=False)
+            vektor.setflags(write=False)
+            self.embedding_cache.put(schluessel, vektor)
+        return vektor
+
+    def suche(self, text, k=10, hybrid=False, candidates=50, **filters):
+        """
+        Top-k-Suche mit Ergebniscache.
+
+        :param hybrid: BM25 und Vektorsuche per RRF fusionieren (bm25_index.hybride_suche).
+        :param candidates: Kandidaten je Verfahren bei der hybriden Suche.
+        :param filters: Argumente für MetadataIndex.filter, z.B. skills=["Java"], location="Berlin", min_hours=30.
+        :return: Treffer wie bei VectorIndex.search bzw. hybride_suche.
+        """
+        start = time.perf_counter()
+        self.pruefe_datenstand()
+        schluessel = (normalisiere_anfrage(text), k, hybrid, candidates if hybrid else None,
+                      tuple(sorted((name, tuple(wert) if isinstance(wert, list) else wert)
+                                   for name, wert in filters.items() if wert is not None)))
+        treffer = self.result_cache.get(schluessel)
+        if treffer is None:
+            treffer = self._suche(text, k, hybrid, candidates, filters)
+            self.result_cache.put(schluessel, treffer)
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - start
+        return treffer
+
+    def _suche(self, text, k, hybrid, candidates, filters):
+        profile_ids = None
+        if any(wert is not None for wert in filters.values()):
+            profile_ids = self._index("metadata").filter(**filters)
+            if not profile_ids:
+                return []
+        vektor = self.anfragevektor(text)
+        if hybrid:
+            return bm25_index.hybride_suche(text, self._index("bm25"), self._index("vector"), k=k, candidates=candidates,
+                                 profile_ids=profile_ids, query_vector=vektor)
+        return self._index("vector").search(vektor, k, profile_ids)[0]
+
+    def statistik(self):
+        """Trefferquoten beider Caches, Anzahl der Invalidierungen und mittlere Antwortzeit."""
+        return {
+            "queries": self.queries,
+            "mean_ms": round(self.query_seconds / self.queries * 1000, 3) if self.queries else None,
+            "invalidations": self.invalidations,
+            "embedding_cache": self.embedding_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gecachte Staffing-Suche über Vektor-, BM25- und Attributindex")
+    parser.add_argument("--query", required=True, help="Anfragetext")
+    parser.add_argument("--chunks", default=OPTIMIZED_CHUNKS_DIR, help="Ordner mit optimierten Chunks oder Chunk-Store-Datei")
+    parser.add_argument("--hybrid", action="store_true", help="BM25 und Vektorsuche fusionieren")
+    parser.add_argument("--skill", action="append", help="Erforderlicher Skill (mehrfach möglich)")
+    parser.add_argument("--location", help="Standort")
+    parser.add_argument("--min-hours", type=float, help="Mindestanzahl Wochenstunden")
+    parser.add_argument("--repeat", type=int, default=1, help="Anfrage mehrfach ausführen und Cache-Statistik ausgeben")
+    parser.add_argument("-k", type=int, default=10, help="Anzahl der Treffer")
+    args = parser.parse_args(argv)
+
+    service = QueryService(args.chunks)
+    for _ in range(args.repeat):
+        hits = service.suche(args.query, args.k, args.hybrid, skills=args.skill, location=args.location,
+                             min_hours=args.min_hours)
+    for hit in hits:
+        print(f"{hit['score']:.4f}  {hit['id']}  {hit['metadata'].get('fullName', hit['profile_id'])}")
+    print(json.dumps(service.statistik(), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import embeddings
+import metadata_index
+from chunk_store import read_optimized_profiles
+from model import TECHNICAL_SKILLS
+
+# Eingabe: Embeddings (embeddings.py) und Metadaten aus den optimierten Chunks
+EMBEDDINGS_DIR = embeddings.OUTPUT_DIR
+OPTIMIZED_CHUNKS_DIR = embeddings.INPUT_DIR
+
+AGGREGATIONS = ("max", "topn", "weighted")
+TOP_N = 3            # Anzahl der besten Chunks im Mittelwert bei "topn"
+SUPPORT_CHUNKS = 3   # Chunk-IDs pro Consultant, die das Ergebnis belegen
+
+# Gewichte der Abschnitte bei "weighted" (Mittel der besten Chunks pro Abschnitt)
+SECTION_WEIGHTS = {
+    TECHNICAL_SKILLS: 1.0,
+    "auticonProjects": 1.0,
+    "professionalExperience": 0.9,
+    "projects": 0.8,
+    "furtherProjects": 0.6,
+    "professionalSummary": 0.6,
+    "certificates": 0.6,
+    "certifications": 0.6,
+    "training": 0.4,
+    "auticonTraining": 0.4,
+    "studyProjects": 0.4,
+    "privateProjects": 0.4,
+    "education": 0.3,
+    "studies": 0.3,
+    "engagements": 0.2,
+}
+DEFAULT_SECTION_WEIGHT = 0.5  # z.B. combined
+
+# Batch-Modus: Anforderungen pro Block und Chunk-Zeilen pro Teil der Matrixmultiplikation
+QUERY_BLOCK = 64
+BLOCK_ROWS = 8192
+MATCHES_FILE = "matches.json"
+
+# Synthetischer Korpus für --benchmark
+BENCHMARK_CONSULTANTS = (1000, 4000, 16000)
+BENCHMARK_CHUNKS_PER_PROFILE = 17  # Mittelwert der optimierten Chunks pro Profil
+BENCHMARK_QUERIES = 48  # z.B. offene Anforderungen eines wöchentlichen Laufs
+
+
+def _starts(*keys):
+    """Startpositionen der Abschnitte gleicher Schlüssel in sortierten Arrays (für np.*.reduceat)."""
+    change = np.zeros(len(keys[0]), dtype=bool)
+    change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+class RankingEngine:
+    """
+    Bewertet alle Chunks mit einer Matrixmultiplikation und fasst die Scores pro Consultant zusammen.
+
+    Beim Laden werden die Chunks einmal nach Consultant und Abschnitt sortiert ("Postings";
+    eine Duplikatgruppe aus dedup.py ergibt ein Posting pro Mitglied). Anfragen werden als
+    Spalten einer Matrix bewertet: eine blockweise Multiplikation der Embedding-Matrix mit
+    allen Anfragevektoren und einige np.*.reduceat-Durchläufe über die Postings, ohne
+    Python-Schleife pro Chunk. Mehrere Anfragen teilen sich so einen Durchlauf über die Matrix.
+    """
+
+    def __init__(self, vectors, entries, metadata=None, section_weights=None):
+        section_weights = SECTION_WEIGHTS if section_weights is None else section_weights
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.metadata = metadata or {}
+        self._metadata_index = None
+
+        rows, profiles, types, chunk_ids = [], [], [], []
+        for row, entry in enumerate(entries):
+            for chunk_id, profile_id in entry.get("members") or ((entry["id"], entry["profile_id"]),):
+                rows.append(row)
+                profiles.append(profile_id)
+                types.append(entry.get("type", "unknown"))
+                chunk_ids.append(chunk_id)
+        if not rows:
+            raise ValueError("Keine Chunks für das Ranking vorhanden.")
+
+        self.profile_ids, profile_index = np.unique(np.array(profiles, dtype=object), return_inverse=True)
+        type_names, type_index = np.unique(np.array(types, dtype=object), return_inverse=True)
+        order = np.lexsort((type_index, profile_index))
+        self.posting_rows = np.array(rows, dtype=np.int64)[order]
+        self.posting_profiles = profile_index[order]
+        self.posting_types = type_names[type_index[order]]
+        self.chunk_ids = np.array(chunk_ids, dtype=object)[order]
+
+        # Gruppen pro Consultant und pro (Consultant, Abschnitt) als Startpositionen für reduceat
+        self.profile_starts = _starts(self.posting_profiles)
+        self.profile_counts = np.diff(np.r_[self.profile_starts, len(order)])
+        self.pair_starts = _starts(self.posting_profiles, type_index[order])
+        self.pair_weights = np.array([section_weights.get(name, DEFAULT_SECTION_WEIGHT)
+                                      for name in self.posting_types[self.pair_starts]], dtype=np.float32)
+        self.pair_profile_starts = _starts(self.posting_profiles[self.pair_starts])
+        self.weight_sums = np.add.reduceat(self.pair_weights, self.pair_profile_starts)
+
+    def __len__(self):
+        return len(self.profile_ids)
+
+    @classmethod
+    def load(cls, embeddings_dir=EMBEDDINGS_DIR, optimized_dir=OPTIMIZED_CHUNKS_DIR, section_weights=None):
+        """Lädt Embeddings und Consultant-Metadaten."""
+        vectors, entries = embeddings.lade_cache(embeddings_dir)
+        if vectors is None:
+            raise FileNotFoundError(f"Keine Embeddings in '{embeddings_dir}' gefunden.")
+        metadata = {profile_id: data
+                    for profile_id, data, _ in read_optimized_profiles(optimized_dir, with_chunks=False)}
+        return cls(vectors, entries, metadata, section_weights)
+
+    def posting_scores(self, query_vectors, block_rows=BLOCK_ROWS):
+        """
+        Kosinus-Ähnlichkeit aller Postings zu den normalisierten Anfragevektoren.
+
+        Die Embedding-Matrix wird in Blöcken von block_rows Zeilen mit allen Anfragen
+        zugleich multipliziert, damit jeder Block nur einmal gelesen wird.
+
+        :return: Matrix Anfragen x Postings (Postings zusammenhängend, damit reduceat entlang
+            der Zeilen schnell ist).
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        scores = np.empty((len(queries), len(self.vectors)), dtype=np.float32)
+        for start in range(0, len(self.vectors), block_rows):
+            np.matmul(queries, self.vectors[start:start + block_rows].T, out=scores[:, start:start + block_rows])
+        return np.take(scores, self.posting_rows, axis=1)
+
+    def aggregiere(self, scores, top_n=TOP_N):
+        """
+        Fasst Posting-Scores pro Consultant zusammen.
+
+        :param scores: Matrix Anfragen x Postings (siehe posting_scores).
+        :return: Dictionary {"max", "topn", "weighted"} mit je einer Matrix Anfragen x Consultants
+            (Reihenfolge profile_ids).
+        """
+        best = np.maximum.reduceat(scores, self.profile_starts, axis=1)
+
+        # Mittel der top_n besten Chunks: top_n Durchläufe, die jeweils das aktuelle Maximum
+        # (bei Gleichstand alle gleichen Werte, höchstens so viele wie noch fehlen) entnehmen
+        remaining = np.minimum(self.profile_counts, top_n)
+        divisor = remaining.astype(np.float32)
+        total = np.zeros(best.shape, dtype=np.float32)
+        rest = scores
+        current = best
+        for step in range(top_n):
+            hit = rest == np.repeat(current, self.profile_counts, axis=1)
+            taken = np.minimum(np.add.reduceat(hit, self.profile_starts, axis=1, dtype=np.int32), remaining)
+            total += taken * np.where(taken > 0, current, 0)
+            remaining = remaining - taken
+            if step == top_n - 1 or not remaining.any():
+                break
+            rest = np.where(hit, np.float32(-np.inf), rest)
+            current = np.maximum.reduceat(rest, self.profile_starts, axis=1)
+
+        # Gewichtetes Mittel des besten Chunks pro Abschnitt
+        section_best = np.maximum.reduceat(scores, self.pair_starts, axis=1)
+        weighted = np.add.reduceat(section_best * self.pair_weights, self.pair_profile_starts, axis=1) \
+            / self.weight_sums
+        return {"max": best, "topn": total / divisor, "weighted": weighted}
+
+    def verfuegbar(self, availability=None, min_hours=None):
+        """
+        Maske der Consultants (Reihenfolge profile_ids), die die Verfügbarkeit erfüllen.
+
+        :param availability: Erlaubte Werte von availibility (einer genügt), z.B. ["sofort"].
+        :param min_hours: Mindestwert von workHoursPerWeek.
+        :return: Bool-Array oder None, wenn keine Bedingung angegeben ist.
+        """
+        if availability is None and min_hours is None:
+            return None
+        if self._metadata_index is None:
+            self._metadata_index = metadata_index.MetadataIndex()
+            for profile_id in self.profile_ids:
+                self._metadata_index.add(profile_id, self.metadata.get(profile_id, {}))
+        candidates = self._metadata_index.filter(availability=availability, min_hours=min_hours)
+        return np.isin(self.profile_ids, np.array(candidates, dtype=object))
+
+    def belege(self, profile, scores, anzahl=SUPPORT_CHUNKS):
+        """Beste Chunks eines Consultants (Index in profile_ids) für eine Anfrage (Scores in Posting-Reihenfolge)."""
+        start = self.profile_starts[profile]
+        profile_scores = scores[start:start + self.profile_counts[profile]]
+        best = np.argsort(-profile_scores, kind="stable")[:anzahl]
+        return [{"id": self.chunk_ids[start + i], "type": self.posting_types[start + i],
+                 "score": round(float(profile_scores[i]), 4)} for i in best]
+
+    def ranglisten(self, query_vectors, k=10, aggregation="weighted", masks=None, top_n=TOP_N,
+                   support=SUPPORT_CHUNKS, query_block=QUERY_BLOCK):
+        """
+        Ranglisten der Consultants für mehrere normalisierte Anfragevektoren.
+
+        :param masks: Optional pro Anfrage eine Maske aus verfuegbar() oder None.
+        :return: Pro Anfrage eine Liste von Dictionaries mit profile_id, score, den drei
+            Aggregaten, den belegenden Chunks (chunks) und den Consultant-Metadaten.
+        """
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unbekannte Aggregation '{aggregation}', erlaubt sind: {', '.join(AGGREGATIONS)}")
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        masks = masks if masks is not None else [None] * len(queries)
+        results = []
+        for block_start in range(0, len(queries), query_block):
+            block = queries[block_start:block_start + query_block]
+            scores = self.posting_scores(block)
+            aggregate = self.aggregiere(scores, top_n)
+            ranking = aggregate[aggregation]
+            for column in range(len(block)):
+                mask = masks[block_start + column]
+                values = ranking[column] if mask is None else np.where(mask, ranking[column], -np.inf)
+                top_k = min(k, len(values) if mask is None else int(np.count_nonzero(mask)))
+                if not top_k:
+                    results.append([])
+                    continue
+                top = np.argpartition(-values, top_k - 1)[:top_k]
+                top = top[np.argsort(-values[top], kind="stable")]
+                results.append([self._treffer(profile, column, scores, aggregate, aggregation, support)
+                                for profile in top])
+        return results
+
+    def rangliste(self, query_vector, k=10, aggregation="weighted", mask=None, top_n=TOP_N, support=SUPPORT_CHUNKS):
+        """Rangliste der Consultants für einen normalisierten Anfragevektor (siehe ranglisten)."""
+        return self.ranglisten(np.atleast_2d(query_vector), k, aggregation, [mask], top_n, support)[0]
+
+    def _treffer(self, profile, column, scores, aggregate, aggregation, support):
+        profile_id = self.profile_ids[profile]
+        return {
+            "profile_id": profile_id,
+            "score": round(float(aggregate[aggregation][column, profile]), 4),
+            **{name: round(float(values[column, profile]), 4) for name, values in aggregate.items()},
+            "chunks": self.belege(profile, scores[column], support),
+            "metadata": self.metadata.get(profile_id, {}),
+        }
+
+
+def _absaetze(text):
+    return [absatz.strip() for absatz in text.split("\n\n") if absatz.strip()] or [text]
+
+
+def anfragevektoren(texte, model):
+    """
+    Normalisierte Vektoren mehrerer Stellenbeschreibungen, in einem Aufruf des Modells eingebettet.
+
+    Lange Beschreibungen werden absatzweise eingebettet (das Modell kürzt lange Eingaben)
+    und die Absatzvektoren gemittelt.
+
+    :return: Matrix Beschreibungen x Dimension.
+    """
+    absaetze = [_absaetze(text) for text in texte]
+    vectors = model.encode([absatz for teile in absaetze for absatz in teile], normalize_embeddings=True,
+                           convert_to_numpy=True, show_progress_bar=False)
+    counts = np.array([len(teile) for teile in absaetze])
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    means = np.add.reduceat(np.asarray(vectors, dtype=np.float32), starts, axis=0) / counts[:, None]
+    return means / np.maximum(np.linalg.norm(means, axis=1, keepdims=True), 1e-12)
+
+
+def anfragevektor(text, model):
+    """Normalisierter Vektor einer Stellenbeschreibung (siehe anfragevektoren)."""
+    return anfragevektoren([text], model)[0]
+
+
+def ranking(text, k=10, aggregation="weighted", engine=None, model=None, embeddings_dir=EMBEDDINGS_DIR,
+            optimized_dir=OPTIMIZED_CHUNKS_DIR, availability=None, min_hours=None):
+    """Rangliste der Consultants für eine Stellenbeschreibung (siehe RankingEngine.rangliste)."""
+    engine = engine or RankingEngine.load(embeddings_dir, optimized_dir)
+    model = model or embeddings.lade_modell()
+    return engine.rangliste(anfragevektor(text, model), k, aggregation, engine.verfuegbar(availability, min_hours))
+
+
+def lade_anforderungen(path):
+    """
+    Liest offene Anforderungen aus einer JSON-Datei oder einem Ordner mit Textdateien.
+
+    Die JSON-Datei enthält eine Liste von Objekten mit id und text sowie optional
+    availability (Liste erlaubter Werte) und min_hours; im Ordner ist jede .txt- bzw.
+    .md-Datei eine Anforderung mit dem Dateinamen als ID.
+
+    :return: Liste von Dictionaries.
+    """
+    if os.path.isdir(path):
+        anforderungen = []
+        for filename in sorted(os.listdir(path)):
+            if filename.endswith((".txt", ".md")):
+                with open(os.path.join(path, filename), "r", encoding="utf-8") as file:
+                    anforderungen.append({"id": os.path.splitext(filename)[0], "text": file.read()})
+        return anforderungen
+    with open(path, "r", encoding="utf-8") as file:
+        anforderungen = json.load(file)
+    return [dict(anforderung, id=str(anforderung.get("id", i))) for i, anforderung in enumerate(anforderungen)]
+
+
+def batch_matching(anforderungen, k=10, aggregation="weighted", engine=None, model=None,
+                   embeddings_dir=EMBEDDINGS_DIR, optimized_dir=OPTIMIZED_CHUNKS_DIR, availability=None,
+                   min_hours=None):
+    """
+    Top-k-Consultants für viele Anforderungen in einem Durchlauf.
+
+    Alle Anforderungen werden gemeinsam eingebettet und blockweise (QUERY_BLOCK) mit der
+    Chunk-Matrix multipliziert. availability und min_hours gelten für alle Anforderungen,
+    sofern eine Anforderung keine eigenen Werte angibt.
+
+    :param anforderungen: Liste von Dictionaries (siehe lade_anforderungen).
+    :return: Dictionary {Anforderungs-ID: Treffer wie bei RankingEngine.rangliste}.
+    """
+    engine = engine or RankingEngine.load(embeddings_dir, optimized_dir)
+    model = model or embeddings.lade_modell()
+    if not anforderungen:
+        return {}
+    vectors = anfragevektoren([anforderung["text"] for anforderung in anforderungen], model)
+    masks = [engine.verfuegbar(anforderung.get("availability", availability), anforderung.get("min_hours", min_hours))
+             for anforderung in anforderungen]
+    results = engine.ranglisten(vectors, k, aggregation, masks)
+    return {anforderung["id"]: treffer for anforderung, treffer in zip(anforderungen, results)}
+
+
+def _synthetische_engine(consultants, chunks_per_profile=BENCHMARK_CHUNKS_PER_PROFILE, dimension=384, seed=0):
+    rng = np.random.default_rng(seed)
+    sections = list(SECTION_WEIGHTS)
+    anzahl = consultants * chunks_per_profile
+    vectors = rng.standard_normal((anzahl, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    entries = [{"id": f"{i // chunks_per_profile}_{i}", "profile_id": str(i // chunks_per_profile),
+                "type": sections[i % len(sections)]} for i in range(anzahl)]
+    return RankingEngine(vectors, entries)
+
+
+def benchmark(consultants=BENCHMARK_CONSULTANTS, anfragen=BENCHMARK_QUERIES, k=10, aggregation="weighted"):
+    """
+    Misst Latenz und Durchsatz (Matrixmultiplikation, Aggregation, Top-k) bei wachsender Korpusgröße.
+
+    Verglichen werden einzelne Anfragen nacheinander und alle Anfragen als ein Batch
+    (ohne die Zeit für das Einbetten der Anfragen).
+
+    :return: Liste von Dictionaries pro Korpusgröße.
+    """
+    ergebnisse = []
+    for anzahl in consultants:
+        engine = _synthetische_engine(anzahl)
+        queries = np.random.default_rng(1).standard_normal((anfragen, engine.vectors.shape[1]), dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        engine.rangliste(queries[0], k, aggregation)
+        start = time.perf_counter()
+        for query in queries:
+            engine.rangliste(query, k, aggregation)
+        einzeln = time.perf_counter() - start
+        start = time.perf_counter()
+        engine.ranglisten(queries, k, aggregation)
+        batch = time.perf_counter() - start
+        dauer = einzeln / anfragen * 1000
+        ergebnis = {"consultants": anzahl, "chunks": len(engine.posting_rows), "queries": anfragen,
+                    "query_ms": round(dauer, 3),
+                    "us_per_1000_chunks": round(dauer * 1000 / len(engine.posting_rows) * 1000, 2),
+                    "qps_single": round(anfragen / einzeln, 1), "qps_batch": round(anfragen / batch, 1)}
+        ergebnisse.append(ergebnis)
+        print(f"{anzahl:8d} Consultants {ergebnis['chunks']:9d} Chunks  {dauer:9.3f} ms/Anfrage  "
+              f"{ergebnis['us_per_1000_chunks']:7.2f} µs pro 1000 Chunks  "
+              f"{ergebnis['qps_single']:8.1f} Anfragen/s einzeln  {ergebnis['qps_batch']:8.1f} Anfragen/s im Batch")
+        del engine
+    return ergebnisse
+
+
+def _zeige(treffer_liste):
+    for rang, treffer in enumerate(treffer_liste, 1):
+        name = treffer["metadata"].get("fullName", treffer["profile_id"])
+        belege = ", ".join(f"{chunk['id']} ({chunk['score']:.3f})" for chunk in treffer["chunks"])
+        print(f"{rang:3d}. {treffer['score']:.4f}  {name}  [max {treffer['max']:.3f}, "
+              f"top{TOP_N} {treffer['topn']:.3f}, gewichtet {treffer['weighted']:.3f}]  {belege}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consultants für Stellenbeschreibungen ranken")
+    parser.add_argument("--query", help="Stellenbeschreibung als Text")
+    parser.add_argument("--file", help="Datei mit der Stellenbeschreibung")
+    parser.add_argument("--batch", metavar="PFAD",
+                        help="Viele Anforderungen auf einmal: JSON-Datei oder Ordner mit Textdateien")
+    parser.add_argument("--output", default=MATCHES_FILE, help="Ergebnisdatei im Batch-Modus")
+    parser.add_argument("-k", type=int, default=10, help="Anzahl der Consultants")
+    parser.add_argument("--aggregation", choices=AGGREGATIONS, default="weighted",
+                        help="Score pro Consultant: bester Chunk, Mittel der besten Chunks oder nach Abschnitten gewichtet")
+    parser.add_argument("--availability", action="append",
+                        help="Nur Consultants mit dieser Verfügbarkeit, z.B. sofort (mehrfach möglich)")
+    parser.add_argument("--min-hours", type=float, help="Nur Consultants mit mindestens so vielen Wochenstunden")
+    parser.add_argument("--embeddings", default=EMBEDDINGS_DIR, help="Ordner mit den Embeddings")
+    parser.add_argument("--chunks", default=OPTIMIZED_CHUNKS_DIR,
+                        help="Ordner mit optimierten Chunks oder Chunk-Store-Datei (Metadaten)")
+    parser.add_argument("--benchmark", type=int, nargs="*", metavar="N",
+                        help=f"Latenz und Durchsatz mit N synthetischen Consultants messen "
+                             f"(Standard: {BENCHMARK_CONSULTANTS})")
+    args = parser.parse_args(argv)
+
+    if args.benchmark is not None:
+        benchmark(args.benchmark or BENCHMARK_CONSULTANTS, aggregation=args.aggregation)
+        return
+    if args.batch:
+        anforderungen = lade_anforderungen(args.batch)
+        start = time.perf_counter()
+        ergebnisse = batch_matching(anforderungen, args.k, args.aggregation, embeddings_dir=args.embeddings,
+                                    optimized_dir=args.chunks, availability=args.availability,
+                                    min_hours=args.min_hours)
+        dauer = time.perf_counter() - start
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(ergebnisse, file, indent=4, ensure_ascii=False)
+        print(f"{len(anforderungen)} Anforderungen in {dauer:.2f} s ({len(anforderungen) / max(dauer, 1e-9):.1f} "
+              f"Anforderungen/s), Ergebnisse gespeichert unter: {args.output}")
+        return
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as file:
+            text = file.read()
+    elif args.query:
+        text = args.query
+    else:
+        parser.error("--query, --file, --batch oder --benchmark angeben")
+
+    _zeige(ranking(text, args.k, args.aggregation, embeddings_dir=args.embeddings, optimized_dir=args.chunks,
+                   availability=args.availability, min_hours=args.min_hours))
+
+
+if __name__ == "__main__":
+    main()
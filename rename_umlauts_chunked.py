@@ -1,6 +1,8 @@
 import os
 import re
 
+from umlauts import ersetze_umlaute
+
 def ersetze_umlaute_in_dateinamen(ordner):
     """
     Ersetzt Umlaute (ä, ö, ü) in Dateinamen durch Umschreibungen (ae, oe, ue)
@@ -17,14 +19,7 @@ def ersetze_umlaute_in_dateinamen(ordner):
     for datei in dateien:
         # Prüfen, ob der Dateiname dem Muster Vorname_Nachname_Zahl.txt entspricht
         if re.match(r"^[A-Za-zäöüÄÖÜ]+_[A-Za-zäöüÄÖÜ]+_\d+\.txt$", datei):
-            neuer_name = (
-                datei.replace("ä", "ae")
-                     .replace("ö", "oe")
-                     .replace("ü", "ue")
-                     .replace("Ä", "Ae")
-                     .replace("Ö", "Oe")
-                     .replace("Ü", "Ue")
-            )
+            neuer_name = ersetze_umlaute(datei)
             alter_pfad = os.path.join(ordner, datei)
             neuer_pfad = os.path.join(ordner, neuer_name)
             # Umbenennen der Datei
@@ -0,0 +1,165 @@
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Unterbefehle: Name -> (Modul, Beschreibung). Die Module werden erst beim Aufruf importiert,
+# damit ein Befehl nur die Abhängigkeiten lädt, die er selbst braucht.
+BEFEHLE = {
+    "parse": ("profile_parser", "Text-Profile aus Chunked zusammenfassen (Schritt 1)"),
+    "merge": ("merge_jsons", "Chunked und Autility-JSON zu Merged zusammenführen (Schritt 2)"),
+    "chunk": ("profile_chunks", "Merged-Profile in Chunks zerlegen (Schritt 3)"),
+    "optimize": ("profile_chunks_optimized", "Chunks optimieren bzw. direkt aus Merged streamen (Schritt 4)"),
+    "markdown": ("json_to_markdown_parser", "Merged-Profile in Markdown umwandeln (Schritt 5)"),
+    "pipeline": ("pipeline", "Schritte 1-5 inkrementell für alle Consultants"),
+    "tokens": ("chunk_size_calculator", "Tokenanzahl pro Chunk ausgeben"),
+    "dedup": ("dedup", "Nahezu gleiche Chunks vor dem Embedding zusammenfassen"),
+    "embeddings": ("embeddings", "Embeddings für die optimierten Chunks berechnen"),
+    "vector-index": ("vector_index", "FAISS-Vektorindex aufbauen und abfragen"),
+    "vector-store": ("vector_store", "Kompakten Vektorspeicher bauen und vergleichen"),
+    "bm25": ("bm25_index", "BM25-Index aufbauen und hybride Suche"),
+    "metadata": ("metadata_index", "Attributindex abfragen und messen"),
+    "query": ("query_service", "Gecachte Suche über alle Indizes"),
+    "rank": ("ranking", "Consultants für Stellenbeschreibungen ranken (einzeln oder im Batch)"),
+    "upload": ("azure_uploader", "Optimierte Chunks in Azure AI Search hochladen"),
+    "sync": ("sync_ledger", "Suchindex inkrementell abgleichen"),
+    "corpus": ("synthetic_corpus", "Synthetischen Korpus erzeugen"),
+    "benchmark": ("benchmark_suite", "Pipeline-Stufen auf synthetischen Korpora messen"),
+}
+
+STARTUP_REPORT_FILE = "startup_report.json"
+STARTUP_REPEAT = 5   # Wiederholungen pro Messung (Median)
+STARTUP_IMPORTS = 3  # Anzahl der teuersten direkten Importe im Bericht
+
+# Verzeichnis der Module, damit die Messprozesse sie unabhängig vom Arbeitsverzeichnis finden
+MODUL_VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+
+
+def fuehre_aus(befehl, argumente):
+    """Importiert das Modul eines Unterbefehls und ruft dessen main mit den übrigen Argumenten auf."""
+    modul_name, _ = BEFEHLE[befehl]
+    modul = importlib.import_module(modul_name)
+    # Die Usage-Zeile des Moduls soll den Unterbefehl enthalten ("smartstaffing.py optimize ...")
+    sys.argv[0] = f"{os.path.basename(sys.argv[0])} {befehl}"
+    return modul.main(argumente)
+
+
+def _umgebung():
+    pfade = [MODUL_VERZEICHNIS] + [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(pfade))
+
+
+def _median_ms(kommando, wiederholungen, umgebung):
+    zeiten = []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        subprocess.run(kommando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=umgebung, check=True)
+        zeiten.append(time.perf_counter() - start)
+    return statistics.median(zeiten) * 1000
+
+
+def schwerste_importe(modul_name, anzahl=STARTUP_IMPORTS, umgebung=None):
+    """
+    Direkte Importe eines Moduls mit der größten kumulierten Importzeit (python -X importtime).
+
+    :return: Liste von (Modul, Millisekunden).
+    """
+    ausgabe = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modul_name}"],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                             env=umgebung or _umgebung(), check=True).stderr
+    # Die Ausgabe listet Importe nach ihren Abhängigkeiten; die direkten Importe eines
+    # Moduls stehen eine Ebene (zwei Leerzeichen) eingerückt unmittelbar vor ihm
+    importe, kandidaten = [], []
+    for zeile in ausgabe.splitlines():
+        teile = zeile.split("|")
+        if len(teile) != 3 or not teile[1].strip().isdigit():
+            continue
+        name = teile[2][1:]
+        if not name.startswith(" "):
+            if name == modul_name:
+                importe = kandidaten
+            kandidaten = []
+        elif not name.startswith("   "):
+            kandidaten.append((name.strip(), int(teile[1]) / 1000))
+    importe.sort(key=lambda eintrag: eintrag[1], reverse=True)
+    return [(name, round(ms, 1)) for name, ms in importe[:anzahl]]
+
+
+def miss_kaltstart(befehle=None, wiederholungen=STARTUP_REPEAT):
+    """
+    Misst die Kaltstartzeit jedes Unterbefehls in frischen Prozessen.
+
+    import_ms ist die Zeit für den Import des Moduls, help_ms die Zeit für
+    "smartstaffing.py BEFEHL --help" (Import, Parser und Ausgabe), jeweils als Median
+    abzüglich des Interpreterstarts (base_ms).
+
+    :return: Bericht als Dictionary.
+    """
+    umgebung = _umgebung()
+    basis = _median_ms([sys.executable, "-c", "pass"], wiederholungen, umgebung)
+    ergebnisse = {}
+    for befehl in befehle or BEFEHLE:
+        modul_name, _ = BEFEHLE[befehl]
+        import_ms = _median_ms([sys.executable, "-c", f"import {modul_name}"], wiederholungen, umgebung)
+        help_ms = _median_ms([sys.executable, os.path.abspath(__file__), befehl, "--help"], wiederholungen, umgebung)
+        ergebnisse[befehl] = {
+            "module": modul_name,
+            "import_ms": round(max(0.0, import_ms - basis), 1),
+            "help_ms": round(max(0.0, help_ms - basis), 1),
+            "top_imports": schwerste_importe(modul_name, umgebung=umgebung),
+        }
+        print(f"{befehl:14s} {ergebnisse[befehl]['import_ms']:8.1f} ms {ergebnisse[befehl]['help_ms']:8.1f} ms  "
+              + ", ".join(f"{name} {ms:.0f} ms" for name, ms in ergebnisse[befehl]["top_imports"]))
+    return {"python": sys.version.split()[0], "repeat": wiederholungen, "base_ms": round(basis, 1),
+            "commands": ergebnisse}
+
+
+def _startup(argumente):
+    parser = argparse.ArgumentParser(prog=f"{os.path.basename(sys.argv[0])} startup",
+                                     description="Kaltstartzeit der Unterbefehle messen")
+    parser.add_argument("befehle", nargs="*", metavar="BEFEHL", help="Zu messende Unterbefehle (Standard: alle)")
+    parser.add_argument("--repeat", type=int, default=STARTUP_REPEAT, help="Wiederholungen pro Messung")
+    parser.add_argument("--report", default=STARTUP_REPORT_FILE, help="Pfad des JSON-Berichts")
+    args = parser.parse_args(argumente)
+    unbekannt = [befehl for befehl in args.befehle if befehl not in BEFEHLE]
+    if unbekannt:
+        parser.error(f"Unbekannte Befehle: {', '.join(unbekannt)}")
+
+    print(f"{'Befehl':14s} {'Import':>11s} {'--help':>11s}  Teuerste Importe")
+    bericht = miss_kaltstart(args.befehle, args.repeat)
+    with open(args.report, "w", encoding="utf-8") as datei:
+        json.dump(bericht, datei, indent=4, ensure_ascii=False)
+    print(f"Interpreterstart {bericht['base_ms']} ms (abgezogen), Bericht gespeichert unter: {args.report}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    befehlsliste = "\n".join(f"  {name:14s} {beschreibung}" for name, (_, beschreibung) in BEFEHLE.items())
+    parser = argparse.ArgumentParser(
+        description="SmartStaffing-Preprocessing",
+        epilog=f"Befehle:\n{befehlsliste}\n  {'startup':14s} Kaltstartzeit der Befehle messen\n\n"
+               "Hilfe zu einem Befehl: BEFEHL --help",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("befehl", metavar="BEFEHL", help="Auszuführender Befehl")
+    parser.add_argument("argumente", nargs="*", metavar="ARGUMENTE", help="Argumente des Befehls")
+    if not argv:
+        parser.print_help()
+        return None
+    if argv[0].startswith("-"):
+        parser.parse_args(argv)
+        return None
+
+    befehl, argumente = argv[0], argv[1:]
+    if befehl == "startup":
+        return _startup(argumente)
+    if befehl not in BEFEHLE:
+        parser.error(f"Unbekannter Befehl '{befehl}', erlaubt sind: {', '.join(BEFEHLE)}, startup")
+    return fuehre_aus(befehl, argumente)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import azure_uploader
+
+# Stand des Suchindex nach dem letzten erfolgreichen Abgleich: {Chunk-ID: Dokument-Hash}
+LEDGER_FILE = "sync_ledger.json"
+
+
+def dokument_hash(dokument):
+    """Hash über den vollständigen Dokumentinhalt (Text, Metadaten und Vektor)."""
+    daten = json.dumps(dokument, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(daten.encode("utf-8")).hexdigest()
+
+
+class SyncLedger:
+    """
+    Merkt sich, welche Dokumente mit welchem Inhalt zuletzt in einen Suchindex übertragen wurden.
+
+    Da die Chunk-IDs inhaltsbasiert sind, erscheint ein geänderter Chunk als neue ID
+    (hinzufügen) und die alte ID als gelöscht; geänderte Metadaten oder Vektoren bei
+    gleichem Text als Aktualisierung derselben ID. Der Ledger gilt nur für den Endpunkt
+    und Index, für den er angelegt wurde.
+    """
+
+    def __init__(self, path=LEDGER_FILE, endpoint=None, index_name=None):
+        self.path = path
+        self.endpoint = endpoint
+        self.index_name = index_name
+        self.documents = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("endpoint") == endpoint and data.get("index") == index_name:
+                self.documents = data.get("documents", {})
+            else:
+                print(f"Ledger {path} gehört zu einem anderen Index, alle Dokumente werden übertragen.")
+
+    def delta(self, dokumente):
+        """
+        Vergleicht die aktuellen Dokumente mit dem Ledger.
+
+        :return: Tupel (hinzuzufügende Dokumente, zu aktualisierende Dokumente, zu löschende IDs,
+                 neue Hashes {ID: Hash} aller aktuellen Dokumente).
+        """
+        hinzufuegen, aktualisieren = [], []
+        hashes = {}
+        for dokument in dokumente:
+            digest = dokument_hash(dokument)
+            hashes[dokument["id"]] = digest
+            alt = self.documents.get(dokument["id"])
+            if alt is None:
+                hinzufuegen.append(dokument)
+            elif alt != digest:
+                aktualisieren.append(dokument)
+        loeschen = [chunk_id for chunk_id in self.documents if chunk_id not in hashes]
+        return hinzufuegen, aktualisieren, loeschen, hashes
+
+    def bestaetige(self, hochgeladen, geloescht, hashes):
+        """Übernimmt erfolgreich übertragene Dokumente und Löschungen in den Ledger."""
+        for chunk_id in hochgeladen:
+            self.documents[chunk_id] = hashes[chunk_id]
+        for chunk_id in geloescht:
+            self.documents.pop(chunk_id, None)
+
+    def save(self):
+        """Speichert den Ledger atomar."""
+        with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({"endpoint": self.endpoint, "index": self.index_name, "documents": self.documents},
+                      file, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+
+async def synchronisiere(source=azure_uploader.INPUT_DIR, endpoint=None, index_name=None, api_key=None,
+                         embeddings_dir=None, ledger_path=LEDGER_FILE, concurrency=azure_uploader.CONCURRENCY,
+                         transport=None, dry_run=False):
+    """
+    Überträgt nur neue, geänderte und gelöschte Chunks in den Suchindex.
+
+    Fehlgeschlagene Dokumente werden nicht in den Ledger übernommen und beim
+    nächsten Lauf erneut gesendet.
+
+    :param dry_run: Nur das Delta berechnen, nichts senden.
+    :return: Statistik als Dictionary.
+    """
+    ledger = SyncLedger(ledger_path, endpoint, index_name)
+    vektoren = azure_uploader.lade_embeddings(embeddings_dir) if embeddings_dir else None
+    hinzufuegen, aktualisieren, loeschen, hashes = ledger.delta(
+        azure_uploader.erzeuge_dokumente(source, vektoren))
+    statistik = {"documents": len(hashes), "added": len(hinzufuegen), "updated": len(aktualisieren),
+                 "deleted": len(loeschen), "unchanged": len(hashes) - len(hinzufuegen) - len(aktualisieren)}
+    if dry_run or not (hinzufuegen or aktualisieren or loeschen):
+        return statistik
+
+    start = time.perf_counter()
+    hochladen = hinzufuegen + aktualisieren
+    async with azure_uploader.AzureSearchUploader(endpoint, index_name, api_key, concurrency=concurrency,
+                                                  transport=transport) as uploader:
+        upload_fehler = set(await uploader.upload(hochladen)) if hochladen else set()
+        loesch_fehler = set(await uploader.delete(loeschen)) if loeschen else set()
+
+    ledger.bestaetige([d["id"] for d in hochladen if d["id"] not in upload_fehler],
+                      [chunk_id for chunk_id in loeschen if chunk_id not in loesch_fehler], hashes)
+    ledger.save()
+    statistik.update({"failed": len(upload_fehler) + len(loesch_fehler), "requests": uploader.statistik["requests"],
+                      "seconds": round(time.perf_counter() - start, 3)})
+    return statistik
+
+
+def pruefe_fehlerbehandlung():
+    """
+    Prüft gegen den lokalen Mock, dass dauerhaft abgelehnte Dokumente nicht in den Ledger gelangen.
+
+    Der Mock beantwortet einen Batch mit 207 und lehnt ein Dokument mit 400 ab. Dieses
+    darf nicht im Ledger stehen und muss beim nächsten Lauf erneut gesendet werden,
+    alle übrigen Dokumente müssen bestätigt sein.
+
+    :return: True, wenn die Prüfung bestanden ist.
+    """
+    with tempfile.TemporaryDirectory() as verzeichnis:
+        source = os.path.join(verzeichnis, "Optimized_Chunks")
+        os.makedirs(source)
+        chunks = [{"id": f"100000_projects_{i}", "type": "projects", "content": f"Projekt {i}"} for i in range(3)]
+        with open(os.path.join(source, "profile_100000.json"), "w", encoding="utf-8") as file:
+            json.dump({"metadata": {"autilityId": "100000", "fullName": "Test"}, "chunks": chunks}, file)
+        abgelehnt = chunks[1]["id"]
+        ledger_path = os.path.join(verzeichnis, LEDGER_FILE)
+
+        server, endpoint = azure_uploader.starte_mock_server(fail_ids=[abgelehnt])
+        try:
+            erster = asyncio.run(synchronisiere(source, endpoint, "check", ledger_path=ledger_path))
+            ledger = SyncLedger(ledger_path, endpoint, "check")
+            zweiter = asyncio.run(synchronisiere(source, endpoint, "check", ledger_path=ledger_path))
+        finally:
+            server.shutdown()
+
+    bestaetigt = {chunk["id"] for chunk in chunks} - {abgelehnt}
+    ok = (abgelehnt not in ledger.documents and set(ledger.documents) == bestaetigt
+          and erster["failed"] == 1 and zweiter["added"] == 1 and zweiter["failed"] == 1)
+    print(f"Prüfung {'bestanden' if ok else 'FEHLGESCHLAGEN'}: abgelehntes Dokument "
+          f"{'nicht ' if abgelehnt not in ledger.documents else ''}im Ledger, "
+          f"{len(ledger.documents)} Dokumente bestätigt, zweiter Lauf sendet {zweiter['added']} erneut.")
+    return ok
+
+
+def main(argv=None):
+    konfiguration = azure_uploader.konfiguration_aus_umgebung()
+    parser = argparse.ArgumentParser(description="Suchindex inkrementell mit den optimierten Chunks abgleichen")
+    parser.add_argument("--input", default=azure_uploader.INPUT_DIR,
+                        help="Ordner mit optimierten Chunks oder Chunk-Store-Datei")
+    parser.add_argument("--endpoint", default=konfiguration["endpoint"], help="Endpunkt des Suchdienstes")
+    parser.add_argument("--index", default=konfiguration["index_name"], help="Name des Suchindex")
+    parser.add_argument("--embeddings", default=None, help="Ordner mit Embeddings (optional)")
+    parser.add_argument("--ledger", default=LEDGER_FILE, help="Pfad des Sync-Ledgers")
+    parser.add_argument("--concurrency", type=int, default=azure_uploader.CONCURRENCY, help="Gleichzeitige Anfragen")
+    parser.add_argument("--dry-run", action="store_true", help="Nur anzeigen, was übertragen würde")
+    parser.add_argument("--check", action="store_true",
+                        help="Fehlerbehandlung gegen einen lokalen Mock prüfen (abgelehnte Dokumente nicht im Ledger)")
+    args = parser.parse_args(argv)
+    if args.check:
+        if not pruefe_fehlerbehandlung():
+            raise SystemExit(1)
+        return
+    if not args.endpoint:
+        parser.error("Kein Endpunkt angegeben (--endpoint oder AZURE_SEARCH_ENDPOINT).")
+
+    ergebnis = asyncio.run(synchronisiere(args.input, args.endpoint, args.index, konfiguration["api_key"],
+                                          args.embeddings, args.ledger, args.concurrency, dry_run=args.dry_run))
+    print(f"Abgleich {'(Probelauf) ' if args.dry_run else ''}abgeschlossen: {json.dumps(ergebnis)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import random
+
+import profile_parser
+
+# Bausteine für Namen, Texte und Autility-Felder
+VORNAMEN = ("Anna Bernd Clara Dieter Eva Felix Greta Hannes Ida Jonas Katrin Lukas Marie Niklas Olga Paul "
+            "Quentin Rosa Stefan Tina Uwe Vera Wolfgang Xenia Yannick Zoe").split()
+NACHNAMEN = ("Mueller Schmidt Schneider Fischer Weber Meyer Wagner Becker Schulz Hoffmann Koch Richter Klein "
+             "Wolf Schroeder Neumann Schwarz Braun Zimmermann Krueger Hartmann Lange Werner Krause").split()
+WOERTER = ("Entwicklung Migration Plattform Kunde Datenbank Schnittstelle Analyse Betrieb "
+           "Java Python Kubernetes Spring Cloud Testautomatisierung Architektur Team").split()
+STANDORTE = ["Berlin", "München", "Hamburg", "Frankfurt", "Köln", "Stuttgart", "Düsseldorf", "Leipzig"]
+VERFUEGBARKEITEN = ["sofort", "ab nächstem Monat", "in 3 Monaten", "nicht verfügbar"]
+REISEBEREITSCHAFT = ["bundesweit", "regional", "remote", "international"]
+ARBEITSBEREICHE = ["Backend", "Frontend", "Data", "DevOps", "Testing", "Cloud", "SAP", "Security"]
+WOCHENSTUNDEN = [20, 25, 30, 32, 35, 40]
+SKILL_KATEGORIEN = {
+    "Programmiersprachen": ["Java", "Python", "C#", "C++", "JavaScript", "TypeScript", "Go", "Kotlin"],
+    "Frameworks": ["Spring Boot", "Django", "React", "Angular", ".NET", "Node.js"],
+    "Datenbanken": ["PostgreSQL", "Oracle", "MongoDB", "SQL Server", "Redis"],
+    "Cloud": ["AWS", "Azure", "GCP", "Kubernetes", "Docker", "Terraform"],
+}
+SKILL_LEVEL = ["Grundkenntnisse", "Fortgeschritten", "Experte"]
+SPRACHEN = [("Deutsch", 5, "Muttersprache"), ("Englisch", 4, "Verhandlungssicher"),
+            ("Französisch", 2, "Grundkenntnisse"), ("Spanisch", 3, "Gut")]
+ZERTIFIKATE = [("AWS Solutions Architect", ["AWS", "Cloud"]), ("Scrum Master", ["Scrum", "Agile"]),
+               ("ISTQB Foundation", ["Testing"]), ("Azure Fundamentals", ["Azure", "Cloud"])]
+
+
+def consultant_name(index):
+    """
+    Eindeutiger Name aus Buchstaben (passend zu DATEINAMEN_REGEX), z.B. Anna_Mueller oder Anna_Muellerb.
+    """
+    vorname = VORNAMEN[index % len(VORNAMEN)]
+    rest = index // len(VORNAMEN)
+    nachname = NACHNAMEN[rest % len(NACHNAMEN)]
+    rest //= len(NACHNAMEN)
+    suffix = ""
+    while rest:
+        rest, ziffer = divmod(rest - 1, 26)
+        suffix = chr(ord("a") + ziffer) + suffix
+    return f"{vorname}_{nachname}{suffix}"
+
+
+def _satz(rng, minimum=5, maximum=15):
+    return " ".join(rng.choices(WOERTER, k=rng.randint(minimum, maximum)))
+
+
+def _datierte_zeile(rng):
+    jahr = rng.randint(2000, 2023)
+    ende = rng.choice(["aktuell", str(jahr + rng.randint(0, 3)), f"{rng.randint(1, 12):02d}/{jahr + 1}"])
+    anfang = rng.choice([str(jahr), f"{rng.randint(1, 12):02d}/{jahr}"])
+    return f"{anfang} - {ende} {_satz(rng, 4, 10)}"
+
+
+def _abschnitt(rng, name, eintraege):
+    zeilen = [name]
+    for _ in range(eintraege):
+        zeilen.append(_datierte_zeile(rng))
+        zeilen.extend(_satz(rng) for _ in range(rng.randint(0, 3)))
+    return "\n".join(zeilen)
+
+
+def profiltexte(rng):
+    """
+    Erzeugt die Text-Profile eines Consultants, auf ein bis drei Dateien verteilt.
+
+    :return: Liste der Dateiinhalte.
+    """
+    abschnitte = rng.sample(profile_parser.BEKANNTE_ABSCHNITTE, rng.randint(3, 7))
+    texte = [_abschnitt(rng, name, rng.randint(1, 6)) for name in abschnitte]
+    anzahl_dateien = min(len(texte), rng.randint(1, 3))
+    return ["\n\n".join(texte[i::anzahl_dateien]) + "\n" for i in range(anzahl_dateien)]
+
+
+def autility_profil(rng, index, name):
+    """Erzeugt einen Autility-Datensatz mit den Feldern, die Merge, Chunking und Markdown verwenden."""
+    vorname, nachname = name.split("_")
+    kategorien = rng.sample(sorted(SKILL_KATEGORIEN), rng.randint(1, len(SKILL_KATEGORIEN)))
+    return {
+        "firstName": vorname,
+        "lastName": nachname,
+        "fullName": f"{vorname} {nachname}",
+        "autilityId": str(100000 + index),
+        "autilityUrl": f"https://autility.example/profile/{100000 + index}",
+        "position": rng.choice(["Consultant", "Senior Consultant", "Test Engineer", "Data Engineer"]),
+        "availibility": rng.choice(VERFUEGBARKEITEN),
+        "workHoursPerWeek": rng.choice(WOCHENSTUNDEN),
+        "location": rng.choice(STANDORTE),
+        "travelArrangement": rng.choice(REISEBEREITSCHAFT),
+        "speciality": rng.choice(ARBEITSBEREICHE),
+        "preferredWorkingAreas": rng.sample(ARBEITSBEREICHE, rng.randint(1, 3)),
+        "qualification": rng.choice(["B.Sc. Informatik", "M.Sc. Informatik", "Fachinformatiker", "Dipl.-Ing."]),
+        "professionalSummary": " ".join(_satz(rng) + "." for _ in range(rng.randint(2, 6))),
+        "technicalSkills": [
+            {"category": {"name": kategorie, "skills": [
+                {"name": skill, "levelDescription": rng.choice(SKILL_LEVEL)}
+                for skill in rng.sample(SKILL_KATEGORIEN[kategorie], rng.randint(1, 4))]}}
+            for kategorie in kategorien
+        ],
+        "certificates": [
+            {"name": zertifikat, "date": str(rng.randint(2015, 2024)), "skills": skills}
+            for zertifikat, skills in rng.sample(ZERTIFIKATE, rng.randint(0, 2))
+        ],
+        "languageSkills": [
+            {"name": sprache, "level": level, "levelDescription": beschreibung}
+            for sprache, level, beschreibung in [SPRACHEN[0]] + rng.sample(SPRACHEN[1:], rng.randint(0, 2))
+        ],
+        "auticonProjects": [
+            {"startDate": f"{rng.randint(1, 12):02d}/{jahr}", "endDate": f"{rng.randint(1, 12):02d}/{jahr + 1}",
+             "description": _satz(rng, 8, 20)}
+            for jahr in rng.sample(range(2015, 2024), rng.randint(0, 2))
+        ],
+    }
+
+
+def erzeuge_korpus(basis_verzeichnis, anzahl, seed=42):
+    """
+    Schreibt einen synthetischen Korpus mit Chunked/*.txt und passenden Autility-JSON-Dateien.
+
+    Jeder Consultant hat einen eigenen Zufallsgenerator, daher ist Consultant i bei
+    gleichem Seed unabhängig von der Korpusgröße identisch.
+
+    :return: Dictionary mit Anzahl Consultants, Dateien und Bytes.
+    """
+    chunked = os.path.join(basis_verzeichnis, "Chunked")
+    autility = os.path.join(basis_verzeichnis, "Autility-JSON")
+    os.makedirs(chunked, exist_ok=True)
+    os.makedirs(autility, exist_ok=True)
+
+    dateien = 0
+    groesse = 0
+    for index in range(anzahl):
+        rng = random.Random(seed * 1_000_003 + index)
+        name = consultant_name(index)
+        for nummer, text in enumerate(profiltexte(rng), start=1):
+            daten = text.encode("utf-8")
+            with open(os.path.join(chunked, f"{name}_{nummer}.txt"), "wb") as datei:
+                datei.write(daten)
+            dateien += 1
+            groesse += len(daten)
+        daten = json.dumps(autility_profil(rng, index, name), indent=4, ensure_ascii=False).encode("utf-8")
+        with open(os.path.join(autility, f"{name}.json"), "wb") as datei:
+            datei.write(daten)
+        dateien += 1
+        groesse += len(daten)
+    return {"consultants": anzahl, "files": dateien, "bytes": groesse}
+
+
+def synthetischer_profiltext(groesse_bytes, seed=42):
+    """
+    Erzeugt einen einzelnen großen Profiltext, in dem jede Überschrift einmal vorkommt.
+
+    :param groesse_bytes: Ungefähre Zielgröße in Bytes.
+    """
+    rng = random.Random(seed)
+    abschnitte = {abschnitt: [abschnitt] for abschnitt in profile_parser.BEKANNTE_ABSCHNITTE}
+    groesse = 0
+    while groesse < groesse_bytes:
+        # Einträge reihum auf die Abschnitte verteilen
+        zeilen = abschnitte[rng.choice(profile_parser.BEKANNTE_ABSCHNITTE)]
+        neue_zeilen = [_datierte_zeile(rng)] + [_satz(rng) for _ in range(rng.randint(0, 4))]
+        zeilen.extend(neue_zeilen)
+        groesse += sum(len(zeile) + 1 for zeile in neue_zeilen)
+    return "\n\n".join("\n".join(zeilen) for zeilen in abschnitte.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetischen Consultant-Korpus erzeugen")
+    parser.add_argument("--consultants", type=int, default=100, help="Anzahl Consultants (z.B. 100 bis 100000)")
+    parser.add_argument("--output", default="Synthetic_Corpus", help="Zielverzeichnis")
+    parser.add_argument("--seed", type=int, default=42, help="Seed für reproduzierbare Daten")
+    args = parser.parse_args(argv)
+    info = erzeuge_korpus(args.output, args.consultants, args.seed)
+    print(f"Korpus erzeugt unter {args.output}: {info['consultants']} Consultants, "
+          f"{info['files']} Dateien, {info['bytes'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# OpenAI Tokenizer für GPT-3.5/4
+ENCODING_NAME = "cl100k_base"
+CACHE_SIZE = 100_000  # Maximale Anzahl gecachter Texte
+CACHE_FILE = "token_cache.json"  # Standardname für den optionalen Datei-Cache
+
+
+class TokenCounter:
+    """
+    Zählt Tokens mit einem begrenzten LRU-Cache, dessen Schlüssel der Inhalts-Hash ist.
+
+    Wiederkehrende Texte (Level-Beschreibungen, "N/A - N/A - "-Präfixe, Skill-Listen)
+    werden nur einmal encodiert. Fehlende Texte werden gesammelt per encode_batch encodiert.
+    Optional wird der Cache in einer JSON-Datei zwischen den Läufen gespeichert.
+    Der Tokenizer wird erst beim ersten Encodieren geladen.
+    """
+
+    def __init__(self, encoding_name=ENCODING_NAME, max_size=CACHE_SIZE, cache_path=None):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self.max_size = max_size
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self.tokens_encoded = 0  # Summe der tatsächlich encodierten Tokens
+        self._cache = OrderedDict()
+        self._new_entries = {}
+        if cache_path:
+            self.load()
+
+    @property
+    def encoding(self):
+        """tiktoken-Encoding, beim ersten Zugriff geladen."""
+        if self._encoding is None:
+            import tiktoken
+
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        return self._encoding
+
+    @staticmethod
+    def content_hash(text):
+        """Hash des Textinhalts als Cache-Schlüssel."""
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _remember(self, key, count):
+        self._cache[key] = count
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def count(self, text):
+        """Berechnet die Anzahl der Tokens im Text."""
+        key = self.content_hash(text)
+        count = self._cache.get(key)
+        if count is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return count
+        self.misses += 1
+        count = len(self.encoding.encode(text))
+        self.tokens_encoded += count
+        self._remember(key, count)
+        self._new_entries[key] = count
+        return count
+
+    def peek(self, text):
+        """Gecachte Tokenanzahl oder None, ohne zu encodieren."""
+        key = self.content_hash(text)
+        count = self._cache.get(key)
+        if count is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        return count
+
+    def encode(self, text):
+        """Encodiert den Text und übernimmt die Tokenanzahl in den Cache."""
+        tokens = self.encoding.encode(text)
+        key = self.content_hash(text)
+        self.misses += 1
+        self.tokens_encoded += len(tokens)
+        self._remember(key, len(tokens))
+        self._new_entries[key] = len(tokens)
+        return tokens
+
+    def count_batch(self, texts):
+        """
+        Berechnet die Tokenanzahl für mehrere Texte.
+
+        Nicht gecachte Texte werden dedupliziert und in einem encode_batch-Aufruf encodiert.
+
+        :return: Liste der Tokenanzahlen in Eingabereihenfolge.
+        """
+        keys = [self.content_hash(text) for text in texts]
+        # Treffer lokal festhalten: Beim Einfügen der Fehltreffer kann das LRU sie verdrängen
+        counts = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in counts:
+                self.hits += 1
+            elif key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                counts[key] = self._cache[key]
+            elif key not in missing:
+                missing[key] = text
+            else:
+                self.hits += 1
+
+        if missing:
+            self.misses += len(missing)
+            encoded = self.encoding.encode_batch(list(missing.values()))
+            fresh = {key: len(tokens) for key, tokens in zip(missing, encoded)}
+            self.tokens_encoded += sum(fresh.values())
+            for key, count in fresh.items():
+                self._remember(key, count)
+            self._new_entries.update(fresh)
+            counts.update(fresh)
+
+        return [counts[key] for key in keys]
+
+    def pop_new_entries(self):
+        """Gibt die seit dem letzten Aufruf neu berechneten Einträge zurück (z.B. aus Worker-Prozessen)."""
+        entries, self._new_entries = self._new_entries, {}
+        return entries
+
+    def update(self, entries):
+        """Übernimmt Einträge {Hash: Tokenanzahl} in den Cache."""
+        for key, count in entries.items():
+            self._remember(key, count)
+
+    def load(self):
+        """Lädt den Datei-Cache, sofern er zum Tokenizer passt."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Token-Cache {self.cache_path} nicht lesbar: {e}")
+            return
+        if data.get("encoding") == self.encoding_name:
+            self.update(data.get("entries", {}))
+
+    def save(self):
+        """Speichert den aktuellen Cache-Inhalt atomar in der Cache-Datei."""
+        if not self.cache_path:
+            return
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"encoding": self.encoding_name, "entries": dict(self._cache)}, file)
+        os.replace(temp_path, self.cache_path)
+
+    def stats(self):
+        """Trefferstatistik des Caches."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "tokens_encoded": self.tokens_encoded,
+            "size": len(self._cache),
+        }
+
+
+_counter = None
+
+
+def configure(cache_path=None, max_size=CACHE_SIZE):
+    """Erstellt den gemeinsamen TokenCounter neu, z.B. mit Datei-Cache."""
+    global _counter
+    _counter = TokenCounter(max_size=max_size, cache_path=cache_path)
+    return _counter
+
+
+def get_counter():
+    """Gemeinsamer TokenCounter des Prozesses."""
+    global _counter
+    if _counter is None:
+        _counter = TokenCounter()
+    return _counter
+
+
+def count_tokens(text):
+    """Berechnet die Anzahl der Tokens im Text."""
+    return get_counter().count(text)
+
+
+def count_tokens_batch(texts):
+    """Berechnet die Anzahl der Tokens für mehrere Texte."""
+    return get_counter().count_batch(texts)
@@ -0,0 +1,23 @@
+# Ersetzungen für Umlaute, wie sie auch in den Dateinamen verwendet werden
+UMLAUT_ERSETZUNGEN = {
+    "ä": "ae",
+    "ö": "oe",
+    "ü": "ue",
+    "Ä": "Ae",
+    "Ö": "Oe",
+    "Ü": "Ue",
+}
+
+# Für Suchschlüssel zusätzlich ß -> ss
+_SUCH_ERSETZUNGEN = str.maketrans({**UMLAUT_ERSETZUNGEN, "ß": "ss"})
+_DATEINAMEN_ERSETZUNGEN = str.maketrans(UMLAUT_ERSETZUNGEN)
+
+
+def ersetze_umlaute(text):
+    """Ersetzt [ä, ü, ö] durch [ae, ue, oe] und [Ä, Ü, Ö] durch [Ae, Ue, Oe]."""
+    return text.translate(_DATEINAMEN_ERSETZUNGEN)
+
+
+def normalisiere(text):
+    """Normalisiert einen Text für Suchschlüssel: Umlaute und ß ersetzen, Kleinschreibung, Leerraum zusammenfassen."""
+    return " ".join(text.translate(_SUCH_ERSETZUNGEN).lower().split())
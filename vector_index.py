@@ -0,0 +1,338 @@
+import argparse
+import json
+import os
+
+import faiss
+import numpy as np
+
+import embeddings
+from chunk_store import read_optimized_profiles
+
+# Eingabe- und Ausgabeordner
+EMBEDDINGS_DIR = embeddings.OUTPUT_DIR
+OPTIMIZED_CHUNKS_DIR = embeddings.INPUT_DIR
+INDEX_DIR = "Vector_Index"
+
+INDEX_FILE = "index.faiss"
+META_FILE = "index_meta.json"
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+IVF_NLIST = 256        # Anzahl der Cluster bei IVF (wird bei kleinen Beständen reduziert)
+IVF_NPROBE = 16        # Anzahl der durchsuchten Cluster pro Anfrage
+HNSW_M = 32            # Nachbarn pro Knoten im HNSW-Graphen
+HNSW_EF_SEARCH = 64    # Suchbreite im HNSW-Graphen
+MAX_TOMBSTONE_RATIO = 0.2  # Ab diesem Anteil gelöschter Einträge wird HNSW neu aufgebaut
+
+
+def _erzeuge_faiss_index(index_type, dimension, nlist=IVF_NLIST):
+    """Erstellt einen leeren FAISS-Index für normalisierte Vektoren (Skalarprodukt = Kosinus)."""
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    if index_type == "ivf":
+        quantizer = faiss.IndexFlatIP(dimension)
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+    if index_type == "hnsw":
+        return faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT))
+    raise ValueError(f"Unbekannter Index-Typ '{index_type}', erlaubt sind: {', '.join(INDEX_TYPES)}")
+
+
+def _profile_ids(entry):
+    """Profil-IDs eines Eintrags; bei Duplikatgruppen die aller Mitglieder."""
+    return {entry["profile_id"]}.union(profile_id for _, profile_id in entry.get("members", ()))
+
+
+class VectorIndex:
+    """
+    Lokaler Vektorindex über den optimierten Chunks.
+
+    Die Chunk-IDs ({autilityId}_{type}_{hash}) werden auf fortlaufende int64-IDs des
+    FAISS-Index abgebildet. Ein Eintrag kann für eine Duplikatgruppe aus dedup.py stehen;
+    seine Mitglieder (members) werden dann bei der Suche einzeln als Treffer ausgegeben.
+    Einträge können einzeln hinzugefügt und entfernt werden;
+    da HNSW kein Entfernen unterstützt, werden dort gelöschte Einträge bei der Suche
+    ausgefiltert und der Graph bei zu vielen Löschungen neu aufgebaut.
+    """
+
+    def __init__(self, dimension, index_type="flat", nlist=IVF_NLIST):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unbekannter Index-Typ '{index_type}', erlaubt sind: {', '.join(INDEX_TYPES)}")
+        self.dimension = dimension
+        self.index_type = index_type
+        self.nlist = nlist
+        self.index = None if index_type == "ivf" else _erzeuge_faiss_index(index_type, dimension)
+        self.next_id = 0
+        self.chunks = {}       # Chunk-ID -> {"faiss_id", "hash", "profile_id"[, "members"]}
+        self.chunk_ids = {}    # FAISS-ID -> Chunk-ID
+        self.profile_chunks = {}  # Profil-ID -> FAISS-IDs seiner Chunks
+        self.metadata = {}     # Profil-ID -> Metadaten des Consultants
+        self.deleted = set()   # Gelöschte FAISS-IDs (nur HNSW)
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def train(self, vectors):
+        """Trainiert den IVF-Quantisierer; bei Flat und HNSW ohne Wirkung."""
+        if self.index_type != "ivf" or self.index is not None:
+            return
+        nlist = max(1, min(self.nlist, int(np.sqrt(len(vectors)))))
+        self.index = _erzeuge_faiss_index("ivf", self.dimension, nlist)
+        self.index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def add(self, chunk_ids, vectors, profile_ids, hashes=None, members=None):
+        """
+        Fügt Chunks hinzu; bereits vorhandene Chunk-IDs werden ersetzt.
+
+        :param members: Optional pro Chunk die Mitglieder einer Duplikatgruppe als Liste von
+            (Chunk-ID, Profil-ID) oder None.
+        """
+        if not len(chunk_ids):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.index is None:
+            self.train(vectors)
+        self.remove([chunk_id for chunk_id in chunk_ids if chunk_id in self.chunks])
+
+        faiss_ids = np.arange(self.next_id, self.next_id + len(chunk_ids), dtype=np.int64)
+        self.next_id += len(chunk_ids)
+        self.index.add_with_ids(vectors, faiss_ids)
+        hashes = hashes or [None] * len(chunk_ids)
+        members = members or [None] * len(chunk_ids)
+        for chunk_id, faiss_id, profile_id, digest, group in zip(chunk_ids, faiss_ids, profile_ids, hashes,
+                                                                members):
+            entry = {"faiss_id": int(faiss_id), "hash": digest, "profile_id": profile_id}
+            if group:
+                entry["members"] = [list(member) for member in group]
+            self.chunks[chunk_id] = entry
+            self.chunk_ids[int(faiss_id)] = chunk_id
+            for owner in _profile_ids(entry):
+                self.profile_chunks.setdefault(owner, set()).add(int(faiss_id))
+
+    def remove(self, chunk_ids):
+        """Entfernt Chunks anhand ihrer Chunk-IDs."""
+        faiss_ids = []
+        for chunk_id in chunk_ids:
+            entry = self.chunks.pop(chunk_id, None)
+            if entry is not None:
+                faiss_ids.append(entry["faiss_id"])
+                del self.chunk_ids[entry["faiss_id"]]
+                for owner in _profile_ids(entry):
+                    profile_chunks = self.profile_chunks[owner]
+                    profile_chunks.discard(entry["faiss_id"])
+                    if not profile_chunks:
+                        del self.profile_chunks[owner]
+        if not faiss_ids:
+            return
+        if self.index_type == "hnsw":
+            self.deleted.update(faiss_ids)
+            if len(self.deleted) > MAX_TOMBSTONE_RATIO * max(1, self.index.ntotal):
+                self.compact()
+        else:
+            self.index.remove_ids(np.array(faiss_ids, dtype=np.int64))
+
+    def compact(self):
+        """Baut den HNSW-Graphen ohne gelöschte Einträge neu auf."""
+        if self.index_type != "hnsw" or not self.deleted:
+            return
+        live_ids = np.array(sorted(self.chunk_ids), dtype=np.int64)
+        vectors = np.vstack([self.index.reconstruct(int(i)) for i in live_ids]) if len(live_ids) else None
+        self.index = _erzeuge_faiss_index("hnsw", self.dimension)
+        if vectors is not None:
+            self.index.add_with_ids(vectors, live_ids)
+        self.deleted.clear()
+
+    def _search_params(self, allowed_faiss_ids=None):
+        """Suchparameter mit optionalem ID-Filter für den jeweiligen Index-Typ."""
+        selector = None
+        if allowed_faiss_ids is not None:
+            selector = faiss.IDSelectorBatch(np.array(sorted(allowed_faiss_ids), dtype=np.int64))
+        elif self.deleted:
+            selector = faiss.IDSelectorNot(
+                faiss.IDSelectorBatch(np.array(sorted(self.deleted), dtype=np.int64)))
+
+        if self.index_type == "ivf":
+            params = faiss.SearchParametersIVF()
+            params.nprobe = min(IVF_NPROBE, self.index.nlist)
+        elif self.index_type == "hnsw":
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = HNSW_EF_SEARCH
+        else:
+            params = faiss.SearchParameters()
+        if selector is not None:
+            params.sel = selector
+        # Selektor referenzieren, damit er nicht vor der Suche freigegeben wird
+        params._selector = selector
+        return params
+
+    def search(self, query_vectors, k=10, profile_ids=None):
+        """
+        Sucht die k ähnlichsten Chunks pro Anfragevektor.
+
+        Treffer auf Duplikatgruppen werden in ihre Mitglieder (mit gleichem Score)
+        aufgelöst, beim Profilfilter nur in die Mitglieder der gewählten Consultants.
+
+        :param query_vectors: Normalisierte Anfragevektoren (n x d) oder ein einzelner Vektor.
+        :param profile_ids: Optional nur Chunks dieser Consultants berücksichtigen.
+        :return: Pro Anfrage eine Liste von Dictionaries mit id, score, profile_id und metadata.
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        if self.index is None or not self.chunks:
+            return [[] for _ in range(len(queries))]
+
+        allowed = None
+        if profile_ids is not None:
+            allowed = set()
+            for profile_id in profile_ids:
+                allowed.update(self.profile_chunks.get(profile_id, ()))
+            if not allowed:
+                return [[] for _ in range(len(queries))]
+
+        wanted = set(profile_ids) if profile_ids is not None else None
+        scores, faiss_ids = self.index.search(queries, k, params=self._search_params(allowed))
+        results = []
+        for row_scores, row_ids in zip(scores, faiss_ids):
+            hits = []
+            for score, faiss_id in zip(row_scores, row_ids):
+                chunk_id = self.chunk_ids.get(int(faiss_id))
+                if chunk_id is None:
+                    continue
+                entry = self.chunks[chunk_id]
+                for member_id, profile_id in entry.get("members") or ((chunk_id, entry["profile_id"]),):
+                    if wanted is not None and profile_id not in wanted:
+                        continue
+                    hits.append({
+                        "id": member_id,
+                        "score": float(score),
+                        "profile_id": profile_id,
+                        "metadata": self.metadata.get(profile_id, {}),
+                    })
+            results.append(hits[:k])
+        return results
+
+    def save(self, directory=INDEX_DIR):
+        """Speichert Index und Zuordnungen in directory."""
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, INDEX_FILE)
+        meta_path = os.path.join(directory, META_FILE)
+        if self.index is not None:
+            faiss.write_index(self.index, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+        meta = {
+            "dimension": self.dimension,
+            "index_type": self.index_type,
+            "nlist": self.nlist,
+            "next_id": self.next_id,
+            "chunks": self.chunks,
+            "metadata": self.metadata,
+            "deleted": sorted(self.deleted),
+        }
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(meta, file, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, directory=INDEX_DIR, mmap=True):
+        """
+        Lädt einen gespeicherten Index.
+
+        :param mmap: Index-Datei per Memory-Mapping öffnen statt komplett einzulesen.
+        """
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        vector_index = cls(meta["dimension"], meta["index_type"], meta.get("nlist", IVF_NLIST))
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            flags = faiss.IO_FLAG_MMAP if mmap else 0
+            vector_index.index = faiss.read_index(index_path, flags)
+        vector_index.next_id = meta["next_id"]
+        vector_index.chunks = meta["chunks"]
+        vector_index.chunk_ids = {entry["faiss_id"]: chunk_id for chunk_id, entry in meta["chunks"].items()}
+        for entry in meta["chunks"].values():
+            for owner in _profile_ids(entry):
+                vector_index.profile_chunks.setdefault(owner, set()).add(entry["faiss_id"])
+        vector_index.metadata = meta["metadata"]
+        vector_index.deleted = set(meta.get("deleted", []))
+        return vector_index
+
+
+def lade_metadaten(optimized_dir=OPTIMIZED_CHUNKS_DIR):
+    """Liest die Consultant-Metadaten aus den optimierten Chunks: {Profil-ID: Metadaten}."""
+    return {profile_id: metadata
+            for profile_id, metadata, _ in read_optimized_profiles(optimized_dir, with_chunks=False)}
+
+
+def baue_index(embeddings_dir=EMBEDDINGS_DIR, optimized_dir=OPTIMIZED_CHUNKS_DIR, index_dir=INDEX_DIR,
+               index_type="flat"):
+    """
+    Baut den Vektorindex auf oder aktualisiert ihn inkrementell.
+
+    Nur neue oder geänderte Chunks (anderer Inhalts-Hash bzw. andere Gruppenmitglieder)
+    werden hinzugefügt, nicht mehr vorhandene Chunks werden entfernt.
+
+    :return: Der aktualisierte VectorIndex.
+    """
+    vectors, entries = embeddings.lade_cache(embeddings_dir)
+    if vectors is None:
+        raise FileNotFoundError(f"Keine Embeddings in '{embeddings_dir}' gefunden.")
+
+    vector_index = None
+    if os.path.exists(os.path.join(index_dir, META_FILE)):
+        vector_index = VectorIndex.load(index_dir, mmap=False)
+        if vector_index.index_type != index_type or vector_index.dimension != vectors.shape[1]:
+            print(f"Index-Typ oder Dimension geändert, baue '{index_dir}' neu auf.")
+            vector_index = None
+    if vector_index is None:
+        vector_index = VectorIndex(vectors.shape[1], index_type)
+
+    current = {entry["id"]: row for row, entry in enumerate(entries)}
+    # Auch Duplikatgruppen, deren Mitglieder sich geändert haben, werden neu eingetragen
+    removed = [chunk_id for chunk_id, entry in vector_index.chunks.items()
+               if chunk_id not in current or entries[current[chunk_id]]["hash"] != entry["hash"]
+               or entries[current[chunk_id]].get("members") != entry.get("members")]
+    vector_index.remove(removed)
+
+    rows = [row for chunk_id, row in current.items() if chunk_id not in vector_index.chunks]
+    vector_index.add([entries[row]["id"] for row in rows],
+                     vectors[rows] if rows else np.zeros((0, vectors.shape[1]), dtype=np.float32),
+                     [entries[row]["profile_id"] for row in rows],
+                     [entries[row]["hash"] for row in rows],
+                     [entries[row].get("members") for row in rows])
+    vector_index.metadata = lade_metadaten(optimized_dir)
+    vector_index.save(index_dir)
+
+    print(f"Vektorindex gespeichert unter: {index_dir} "
+          f"({len(vector_index)} Chunks, {len(rows)} hinzugefügt, {len(removed)} entfernt)")
+    return vector_index
+
+
+def suche(text, k=10, vector_index=None, model=None, profile_ids=None, index_dir=INDEX_DIR):
+    """
+    Top-k-Suche für einen Anfragetext.
+
+    :return: Liste von Dictionaries mit Chunk-ID, Score, Profil-ID und Consultant-Metadaten.
+    """
+    vector_index = vector_index or VectorIndex.load(index_dir)
+    model = model or embeddings.lade_modell()
+    query_vector = model.encode([text], normalize_embeddings=True, convert_to_numpy=True,
+                                show_progress_bar=False)
+    return vector_index.search(query_vector, k, profile_ids)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokalen FAISS-Vektorindex aufbauen und abfragen")
+    parser.add_argument("--type", choices=INDEX_TYPES, default="flat", help="Index-Typ")
+    parser.add_argument("--embeddings", default=EMBEDDINGS_DIR, help="Ordner mit den Embeddings")
+    parser.add_argument("--chunks", default=OPTIMIZED_CHUNKS_DIR, help="Ordner mit optimierten Chunks oder Chunk-Store-Datei")
+    parser.add_argument("--output", default=INDEX_DIR, help="Ordner für den Index")
+    parser.add_argument("--query", help="Anfragetext; ohne Angabe wird nur der Index aufgebaut")
+    parser.add_argument("-k", type=int, default=10, help="Anzahl der Treffer")
+    args = parser.parse_args(argv)
+
+    if args.query:
+        for hit in suche(args.query, args.k, index_dir=args.output):
+            print(f"{hit['score']:.4f}  {hit['id']}  {hit['metadata'].get('fullName', hit['profile_id'])}")
+    else:
+        baue_index(args.embeddings, args.chunks, args.output, args.type)
+
+
+if __name__ == "__main__":
+    main()
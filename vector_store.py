@@ -0,0 +1,351 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import embeddings
+
+# Eingabe- und Ausgabeordner
+EMBEDDINGS_DIR = embeddings.OUTPUT_DIR
+STORE_DIR = "Vector_Store"
+
+CODES_FILE = "vectors.npy"      # Kodierte Vektoren in Zeilenreihenfolge (per mmap gelesen)
+CODEBOOK_FILE = "codebook.npz"  # Skalierung (int8) bzw. Zentroiden (pq)
+REFINE_FILE = "refine.npy"      # Optional: genauere Vektoren zum Nachbewerten der Kandidaten
+META_FILE = "vector_store.json"  # Codec, Dimension und Chunk-IDs in Zeilenreihenfolge
+
+# Speicherformate pro Vektor (d = Dimension): 4d, 2d, d bzw. PQ_SUBVECTORS Bytes
+CODECS = ("float32", "float16", "int8", "pq")
+PQ_SUBVECTORS = 48        # Teilräume der Produktquantisierung (muss die Dimension teilen)
+PQ_CENTROIDS = 256        # Zentroiden pro Teilraum (ein Byte pro Code)
+PQ_TRAIN_SAMPLE = 20000   # Höchstens so viele Vektoren für das Training der Zentroiden
+PQ_ITERATIONS = 12        # k-Means-Iterationen
+BLOCK_ROWS = 8192         # Zeilen pro Block bei Suche und Dekodierung (begrenzt den Arbeitsspeicher)
+REFINE_FACTOR = 10        # Kandidaten pro Treffer, die mit den Refine-Vektoren nachbewertet werden
+REFINE_CODECS = ("float16", "float32")
+
+# Varianten im Benchmark: (Codec, Refine-Codec)
+BENCHMARK_VARIANTS = [("float32", None), ("float16", None), ("int8", None), ("int8", "float16"),
+                      ("pq", None), ("pq", "float16")]
+
+
+def _kmeans(data, k, iterations, rng):
+    """Einfaches k-Means (Lloyd) in NumPy; liefert die Zentroiden (k x d)."""
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (data ** 2).sum(1)[:, None] - 2 * data @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        assignment = distances.argmin(1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        counts = np.bincount(assignment, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def _pq_assign(vectors, centroids):
+    """Codes (n x m, uint8) für Vektoren bei Zentroiden der Form (m x k x d/m)."""
+    m, _, sub = centroids.shape
+    codes = np.empty((len(vectors), m), dtype=np.uint8)
+    for j in range(m):
+        part = vectors[:, j * sub:(j + 1) * sub]
+        distances = -2 * part @ centroids[j].T + (centroids[j] ** 2).sum(1)[None, :]
+        codes[:, j] = distances.argmin(1)
+    return codes
+
+
+def encode(vectors, codec, pq_subvectors=PQ_SUBVECTORS, seed=0):
+    """
+    Kodiert float32-Vektoren.
+
+    int8 quantisiert jede Dimension linear zwischen ihrem Minimum und Maximum,
+    pq zerlegt jeden Vektor in pq_subvectors Teilvektoren und speichert pro Teilvektor
+    die Nummer des nächsten von PQ_CENTROIDS Zentroiden.
+
+    :return: Tupel (Codes, Codebuch als Dictionary von Arrays).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if codec == "float32":
+        return vectors, {}
+    if codec == "float16":
+        return vectors.astype(np.float16), {}
+    if codec == "int8":
+        low = vectors.min(0) if len(vectors) else np.zeros(vectors.shape[1], dtype=np.float32)
+        high = vectors.max(0) if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+        step = np.maximum(high - low, 1e-12) / 255
+        codes = (np.rint((vectors - low) / step) - 128).astype(np.int8)
+        return codes, {"low": low.astype(np.float32), "step": step.astype(np.float32)}
+    if codec == "pq":
+        dimension = vectors.shape[1]
+        if dimension % pq_subvectors:
+            raise ValueError(f"Die Dimension {dimension} ist nicht durch pq_subvectors={pq_subvectors} teilbar.")
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), PQ_TRAIN_SAMPLE), replace=False)]
+        k = min(PQ_CENTROIDS, len(sample))
+        sub = dimension // pq_subvectors
+        centroids = np.stack([_kmeans(sample[:, j * sub:(j + 1) * sub], k, PQ_ITERATIONS, rng)
+                              for j in range(pq_subvectors)]).astype(np.float32)
+        return _pq_assign(vectors, centroids), {"centroids": centroids}
+    raise ValueError(f"Unbekannter Codec '{codec}', erlaubt sind: {', '.join(CODECS)}")
+
+
+class VectorStore:
+    """
+    Kompakter Vektorspeicher mit ID-Zuordnung über die Chunk-IDs aus Optimized_Chunks.
+
+    Die Codes liegen in einer .npy-Datei und werden per Memory-Mapping gelesen, im
+    Arbeitsspeicher liegen nur die IDs und das Codebuch. Die Suche rechnet blockweise
+    direkt auf den Codes (bei int8 und pq ohne die Vektoren zu dekodieren). Optional
+    werden die besten Kandidaten mit genaueren Refine-Vektoren nachbewertet, von denen
+    per mmap nur die Zeilen der Kandidaten gelesen werden.
+    """
+
+    def __init__(self, codes, ids, codec, dimension, codebook=None, refine=None):
+        self.codes = codes
+        self.ids = ids
+        self.codec = codec
+        self.dimension = dimension
+        self.codebook = codebook or {}
+        self.refine = refine
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, ids, directory=STORE_DIR, codec="float16", pq_subvectors=PQ_SUBVECTORS, refine=None):
+        """
+        Kodiert die Vektoren, speichert den Store in directory und öffnet ihn.
+
+        :param refine: "float16" oder "float32", um zusätzlich Vektoren zum Nachbewerten zu speichern.
+        """
+        if len(vectors) != len(ids):
+            raise ValueError(f"{len(vectors)} Vektoren, aber {len(ids)} IDs.")
+        if refine is not None and refine not in REFINE_CODECS:
+            raise ValueError(f"Unbekannter Refine-Codec '{refine}', erlaubt sind: {', '.join(REFINE_CODECS)}")
+        codes, codebook = encode(vectors, codec, pq_subvectors)
+        os.makedirs(directory, exist_ok=True)
+        codes_path = os.path.join(directory, CODES_FILE)
+        codebook_path = os.path.join(directory, CODEBOOK_FILE)
+        refine_path = os.path.join(directory, REFINE_FILE)
+        meta_path = os.path.join(directory, META_FILE)
+        with open(codes_path + ".tmp", "wb") as file:
+            np.save(file, codes)
+        with open(codebook_path + ".tmp", "wb") as file:
+            np.savez(file, **codebook)
+        paths = [codes_path, codebook_path, meta_path]
+        if refine is not None:
+            with open(refine_path + ".tmp", "wb") as file:
+                np.save(file, encode(vectors, refine)[0])
+            paths.append(refine_path)
+        elif os.path.exists(refine_path):
+            os.remove(refine_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({"codec": codec, "dimension": int(np.shape(vectors)[1]), "refine": refine, "ids": list(ids)},
+                      file)
+        for path in paths:
+            os.replace(path + ".tmp", path)
+        return cls.load(directory)
+
+    @classmethod
+    def load(cls, directory=STORE_DIR, mmap=True):
+        """
+        Öffnet einen gespeicherten Store.
+
+        :param mmap: Codes per Memory-Mapping öffnen statt komplett einzulesen.
+        """
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        codes = np.load(os.path.join(directory, CODES_FILE), mmap_mode="r" if mmap else None)
+        with np.load(os.path.join(directory, CODEBOOK_FILE)) as data:
+            codebook = {name: data[name] for name in data.files}
+        refine = None
+        if meta.get("refine"):
+            # Refine-Vektoren immer per mmap, es werden nur die Zeilen der Kandidaten gelesen
+            refine = np.load(os.path.join(directory, REFINE_FILE), mmap_mode="r")
+        return cls(codes, meta["ids"], meta["codec"], meta["dimension"], codebook, refine)
+
+    def index_bytes(self):
+        """
+        Größe der Codes und des Codebuchs in Bytes (ohne ID-Zuordnung und Refine-Vektoren).
+
+        Das sind die Daten, die jede Suche vollständig liest. Bei Memory-Mapping entspricht
+        das der Dateigröße, nicht dem belegten Arbeitsspeicher (RSS).
+        """
+        return int(self.codes.nbytes + sum(array.nbytes for array in self.codebook.values()))
+
+    def disk_bytes(self):
+        """Größe aller Vektordaten auf der Festplatte einschließlich der Refine-Vektoren."""
+        return self.index_bytes() + (int(self.refine.nbytes) if self.refine is not None else 0)
+
+    def decode(self, rows=None):
+        """Dekodiert Zeilen (Standard: alle) zu float32-Vektoren."""
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.codec in ("float32", "float16"):
+            return np.asarray(codes, dtype=np.float32)
+        if self.codec == "int8":
+            return (codes.astype(np.float32) + 128) * self.codebook["step"] + self.codebook["low"]
+        centroids = self.codebook["centroids"]
+        return np.concatenate([centroids[j][codes[:, j]] for j in range(centroids.shape[0])], axis=1)
+
+    def get(self, chunk_id):
+        """Dekodierter Vektor eines Chunks."""
+        return self.decode([self.rows[chunk_id]])[0]
+
+    def _scores(self, query, start, end):
+        codes = self.codes[start:end]
+        if self.codec in ("float32", "float16"):
+            return np.asarray(codes, dtype=np.float32) @ query
+        if self.codec == "int8":
+            # q·x = q·((c + 128) * step + low) = c·(q * step) + q·(128 * step + low)
+            step, low = self.codebook["step"], self.codebook["low"]
+            return codes.astype(np.float32) @ (query * step) + float(query @ (128 * step + low))
+        # pq: Skalarprodukte der Teilvektoren mit allen Zentroiden einmal berechnen und nachschlagen
+        centroids = self.codebook["centroids"]
+        m, _, sub = centroids.shape
+        tables = np.einsum("mkd,md->mk", centroids, query.reshape(m, sub))
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(m):
+            scores += tables[j][codes[:, j]]
+        return scores
+
+    def search(self, query_vector, k=10, refine_factor=REFINE_FACTOR):
+        """
+        Top-k nach Skalarprodukt (bei normalisierten Vektoren Kosinus).
+
+        :param refine_factor: Bei vorhandenen Refine-Vektoren werden k * refine_factor Kandidaten
+                              über die Codes ermittelt und mit den Refine-Vektoren neu bewertet.
+        :return: Liste von Tupeln (Chunk-ID, Score), absteigend sortiert.
+        """
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        if self.refine is None or refine_factor <= 1:
+            return self._top(query, k)
+        rows = np.sort([self.rows[chunk_id] for chunk_id, _ in self._top(query, k * refine_factor)])
+        scores = np.asarray(self.refine[rows], dtype=np.float32) @ query
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(self.ids[rows[i]], float(scores[i])) for i in order]
+
+    def _top(self, query, k):
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, len(self.ids), BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, len(self.ids))
+            scores = np.concatenate([best_scores, self._scores(query, start, end)])
+            rows = np.concatenate([best_rows, np.arange(start, end)])
+            if len(scores) > k:
+                keep = np.argpartition(-scores, k)[:k]
+                scores, rows = scores[keep], rows[keep]
+            best_scores, best_rows = scores, rows
+        order = np.argsort(-best_scores, kind="stable")
+        return [(self.ids[row], float(best_scores[i])) for i, row in zip(order, best_rows[order])]
+
+
+def baue_store(embeddings_dir=EMBEDDINGS_DIR, store_dir=STORE_DIR, codec="float16", pq_subvectors=PQ_SUBVECTORS,
+               refine=None):
+    """
+    Baut den Vektorspeicher aus den Embeddings (embeddings.npy und embeddings_index.json).
+
+    :param refine: Optional zusätzlich Refine-Vektoren ("float16"/"float32") speichern.
+    :return: Der geöffnete VectorStore.
+    """
+    vectors, entries = embeddings.lade_cache(embeddings_dir)
+    if vectors is None:
+        raise FileNotFoundError(f"Keine Embeddings in '{embeddings_dir}' gefunden.")
+    store = VectorStore.build(vectors, [entry["id"] for entry in entries], store_dir, codec, pq_subvectors, refine)
+    print(f"Vektorspeicher gespeichert unter: {store_dir} ({len(store)} Vektoren, {codec}, "
+          f"{store.index_bytes() / 1024 / 1024:.1f} MB statt {vectors.nbytes / 1024 / 1024:.1f} MB)")
+    return store
+
+
+def _synthetische_vektoren(anzahl, dimension, seed=0, cluster=64, latent=48):
+    """
+    Normalisierte Vektoren mit Clusterstruktur in einem niedrigdimensionalen Unterraum.
+
+    Satz-Embeddings haben eine deutlich geringere intrinsische Dimension als ihre
+    Länge; reines Rauschen in allen Dimensionen würde die Quantisierung unterschätzen.
+    Mit --benchmark-embeddings wird stattdessen mit den echten Embeddings gemessen.
+    """
+    rng = np.random.default_rng(seed)
+    projektion = rng.standard_normal((latent, dimension)).astype(np.float32)
+    zentren = rng.standard_normal((cluster, latent)).astype(np.float32)
+    punkte = zentren[rng.integers(0, cluster, anzahl)] + 0.5 * rng.standard_normal((anzahl, latent))
+    vectors = (punkte @ projektion + 0.5 * rng.standard_normal((anzahl, dimension))).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def benchmark(vectors=None, anzahl=100000, dimension=384, anfragen=200, k=10, varianten=BENCHMARK_VARIANTS,
+              pq_subvectors=PQ_SUBVECTORS, arbeitsverzeichnis=None):
+    """
+    Misst Recall@k, Index- und Festplattengröße sowie Suchzeit jeder Variante gegenüber der exakten float32-Suche.
+
+    :param vectors: Eigene Vektoren (z.B. aus Embeddings); sonst synthetische Vektoren.
+    :param varianten: Liste von (Codec, Refine-Codec oder None).
+    :return: Liste von Dictionaries pro Variante.
+    """
+    import tempfile
+
+    if vectors is None:
+        vectors = _synthetische_vektoren(anzahl, dimension)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), min(anfragen, len(vectors)), replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    ids = [str(i) for i in range(len(vectors))]
+    k = min(k, len(vectors) - 1)
+    wahr = [set(np.argpartition(-(vectors @ q), k)[:k].astype(str)) for q in queries]
+
+    ergebnisse = []
+    print(f"{len(vectors)} Vektoren, Dimension {vectors.shape[1]}, {len(queries)} Anfragen, Recall@{k}")
+    with tempfile.TemporaryDirectory(dir=arbeitsverzeichnis) as verzeichnis:
+        for codec, refine in varianten:
+            name = f"{codec}+{refine}" if refine else codec
+            start = time.perf_counter()
+            store = VectorStore.build(vectors, ids, os.path.join(verzeichnis, name), codec, pq_subvectors, refine)
+            aufbau = time.perf_counter() - start
+            start = time.perf_counter()
+            treffer = [{chunk_id for chunk_id, _ in store.search(q, k)} for q in queries]
+            suche = (time.perf_counter() - start) / len(queries) * 1000
+            recall = float(np.mean([len(t & w) / k for t, w in zip(treffer, wahr)]))
+            ergebnis = {"variant": name, "recall": round(recall, 4), "bytes_per_vector": store.codes[0].nbytes,
+                        "index_mb": round(store.index_bytes() / 1024 / 1024, 2),
+                        "disk_mb": round(store.disk_bytes() / 1024 / 1024, 2),
+                        "build_seconds": round(aufbau, 2), "query_ms": round(suche, 3)}
+            ergebnisse.append(ergebnis)
+            print(f"  {name:<14} Recall {recall:.4f}  {ergebnis['bytes_per_vector']:5d} B/Vektor  "
+                  f"Index {ergebnis['index_mb']:8.2f} MB  Disk {ergebnis['disk_mb']:8.2f} MB  "
+                  f"Aufbau {aufbau:6.2f} s  {suche:8.3f} ms/Anfrage")
+            del store
+    return ergebnisse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kompakten Vektorspeicher aus den Embeddings bauen")
+    parser.add_argument("--codec", choices=CODECS, default="float16", help="Speicherformat der Vektoren")
+    parser.add_argument("--embeddings", default=EMBEDDINGS_DIR, help="Ordner mit den Embeddings")
+    parser.add_argument("--output", default=STORE_DIR, help="Ordner für den Vektorspeicher")
+    parser.add_argument("--pq-subvectors", type=int, default=PQ_SUBVECTORS, help="Teilräume bei --codec pq")
+    parser.add_argument("--refine", choices=REFINE_CODECS, default=None,
+                        help="Zusätzlich Vektoren zum Nachbewerten der Kandidaten speichern (nur auf der Festplatte)")
+    parser.add_argument("--benchmark", type=int, metavar="N", nargs="?", const=100000,
+                        help="Recall und Speicher aller Codecs mit N synthetischen Vektoren messen")
+    parser.add_argument("--benchmark-embeddings", action="store_true",
+                        help="Benchmark mit den vorhandenen Embeddings statt synthetischen Vektoren")
+    args = parser.parse_args(argv)
+
+    if args.benchmark_embeddings:
+        vorhandene, _ = embeddings.lade_cache(args.embeddings)
+        if vorhandene is None:
+            parser.error(f"Keine Embeddings in '{args.embeddings}' gefunden.")
+        benchmark(vorhandene, pq_subvectors=args.pq_subvectors)
+    elif args.benchmark:
+        benchmark(anzahl=args.benchmark, pq_subvectors=args.pq_subvectors)
+    else:
+        baue_store(args.embeddings, args.output, args.codec, args.pq_subvectors, args.refine)
+
+
+if __name__ == "__main__":
+    main()